@@ -1,6 +1,5 @@
 from pathlib import Path
-from typing import List
-from pprint import pprint
+from typing import Callable, Dict, List
 
 BASE_DIR = Path(__file__).parent.parent.parent
 MODELS_DIR = BASE_DIR / "models"
@@ -8,6 +7,12 @@ RESULTS_DIR = BASE_DIR / "results"
 
 N_REPEAT = 5
 
+# benchmark modes: 'cold' loads the model for every repeat, 'warm' loads the
+# model once and repeats only the simulation with a state reset in between
+MODE_COLD = "cold"
+MODE_WARM = "warm"
+BENCHMARK_MODES = [MODE_COLD, MODE_WARM]
+
 
 def bigg_model_paths() -> List[Path]:
     """Get the Bigg model paths"""
@@ -18,14 +23,35 @@ def bigg_model_paths() -> List[Path]:
 
 
 def biomodels_model_paths() -> List[Path]:
-    """Get the biomodels model paths"""
+    """Get the biomodels model paths (.xml, .xml.gz)"""
     bigg_path = MODELS_DIR / "biomodels"
-    paths = bigg_path.glob("*.xml")
+    paths = list(bigg_path.glob("*.xml")) + list(bigg_path.glob("*.xml.gz"))
     paths = sorted(paths, key=lambda x: str(x))
     return list(paths)
 
 
-BIGG_MODEL_PATHS = bigg_model_paths()
-BIOMODELS_MODEL_PATHS = biomodels_model_paths()
-# pprint(BIGG_MODEL_PATHS)
-# pprint(BIOMODELS_MODEL_PATHS)
\ No newline at end of file
+def synthetic_model_paths() -> List[Path]:
+    """Get the synthetic model paths (see `synthetic.generate_models`)"""
+    synthetic_path = MODELS_DIR / "synthetic"
+    paths = synthetic_path.glob("*.xml")
+    paths = sorted(paths, key=lambda x: str(x))
+    return list(paths)
+
+
+# model paths are discovered on first access (not on import of the package),
+# use bigg_model_paths()/biomodels_model_paths()/synthetic_model_paths() for
+# the current files
+_MODEL_PATHS: Dict[str, Callable[[], List[Path]]] = {
+    "BIGG_MODEL_PATHS": bigg_model_paths,
+    "BIOMODELS_MODEL_PATHS": biomodels_model_paths,
+    "SYNTHETIC_MODEL_PATHS": synthetic_model_paths,
+}
+
+
+def __getattr__(name: str) -> List[Path]:
+    """Lazy module attributes BIGG_MODEL_PATHS, BIOMODELS_MODEL_PATHS and SYNTHETIC_MODEL_PATHS."""
+    if name in _MODEL_PATHS:
+        paths = _MODEL_PATHS[name]()
+        globals()[name] = paths
+        return paths
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
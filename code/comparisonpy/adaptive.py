@@ -0,0 +1,137 @@
+"""
+Control of the number of repeats for timing benchmarks.
+
+With a fixed number of repeats stable sub-millisecond simulations are repeated
+unnecessarily, whereas noisy multi-second loads get too few samples. In the
+adaptive mode every model and simulator is repeated until the confidence
+interval of the median time is narrower than a target width (relative to the
+median), or until the time budget or maximal number of repeats is reached.
+
+The confidence interval of the median is distribution free, based on the
+order statistics of the samples.
+"""
+import math
+import time
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+TIME_KEYS = ["load_time", "simulate_time"]
+# columns added to the results for every model and simulator
+SUMMARY_COLUMNS = ("n_samples",) + tuple(
+    f"{key}_ci_{bound}" for key in TIME_KEYS for bound in ("low", "high")
+)
+
+
+class AdaptiveSettings:
+    """Settings for the adaptive number of repeats.
+
+    :param rel_width: target width of the CI of the median relative to the median
+    :param confidence: confidence level of the CI
+    :param max_repeat: maximal number of repeats
+    :param time_budget: wall-clock budget per model and simulator [s]
+    """
+
+    def __init__(self, rel_width: float = 0.05, confidence: float = 0.95,
+                 max_repeat: int = 100, time_budget: float = 60.0):
+        self.rel_width = rel_width
+        self.confidence = confidence
+        self.max_repeat = max_repeat
+        self.time_budget = time_budget
+
+
+def median_ci(samples: Sequence[float], confidence: float = 0.95) -> Tuple[float, float]:
+    """Confidence interval of the median from order statistics.
+
+    The interval [x_(k), x_(n-k+1)] covers the median with probability
+    1 - 2 * P(Binomial(n, 0.5) <= k-1). The narrowest interval with the
+    requested coverage is returned, (NaN, NaN) if there are too few samples.
+    """
+    x = np.sort(np.asarray(samples, dtype=float))
+    x = x[~np.isnan(x)]
+    n = len(x)
+    ci = (np.nan, np.nan)
+    cdf = 0.0
+    for k in range(1, n // 2 + 1):
+        # cdf = P(Binomial(n, 0.5) <= k-1)
+        cdf += math.comb(n, k - 1) / 2 ** n
+        if 1 - 2 * cdf < confidence:
+            break
+        ci = (x[k - 1], x[n - k])
+    return ci
+
+
+class RepeatController:
+    """Yields the repeats for a single model and simulator.
+
+    Without adaptive settings exactly n_repeat repeats are run. In the
+    adaptive mode at least n_repeat repeats are run, afterwards repeats
+    continue until the CIs of the median of all checked keys are narrow
+    enough, or the maximal number of repeats or the time budget is reached.
+
+    The measured times of every repeat have to be added via `add`. Repeats of
+    an interrupted run can be restored via `restore`, iteration then continues
+    with the next repeat.
+    """
+
+    def __init__(self, n_repeat: int, adaptive: AdaptiveSettings = None,
+                 keys: List[str] = TIME_KEYS):
+        self.n_repeat = n_repeat
+        self.adaptive = adaptive
+        self.keys = keys
+        self.samples: Dict[str, List[float]] = {key: [] for key in TIME_KEYS}
+        self.n_restored = 0
+
+    def __iter__(self) -> Iterator[int]:
+        start_time = time.time()
+        repeat = self.n_restored
+        while not self.finished(repeat, start_time):
+            repeat += 1
+            yield repeat
+
+    def finished(self, repeat: int, start_time: float) -> bool:
+        """Check if no further repeat is required after the given repeat."""
+        if repeat == 0:
+            return False
+        if self.adaptive is None:
+            return repeat >= self.n_repeat
+        elif repeat >= self.adaptive.max_repeat:
+            return True
+        elif time.time() - start_time >= self.adaptive.time_budget:
+            return True
+        return repeat >= self.n_repeat and self.converged()
+
+    def add(self, **times: float):
+        """Add the measured times of a repeat."""
+        for key, value in times.items():
+            self.samples[key].append(value)
+
+    def restore(self, rows: List[Dict[str, float]]):
+        """Restore the times of already finished repeats (in order of repeats)."""
+        for row in rows:
+            self.add(**{key: row[key] for key in TIME_KEYS})
+        self.n_restored += len(rows)
+
+    def converged(self) -> bool:
+        """Check if the CIs of all keys are narrower than the target width.
+
+        Keys without any valid sample (e.g. failed simulations) are not checked.
+        """
+        for key in self.keys:
+            samples = np.asarray(self.samples[key], dtype=float)
+            if np.all(np.isnan(samples)):
+                continue
+            low, high = median_ci(samples, confidence=self.adaptive.confidence)
+            if np.isnan(low):
+                return False
+            if high - low > self.adaptive.rel_width * np.nanmedian(samples):
+                return False
+        return True
+
+    def summary(self) -> Tuple:
+        """Number of samples and CI bounds of the median in order of SUMMARY_COLUMNS."""
+        confidence = self.adaptive.confidence if self.adaptive else 0.95
+        res = [len(self.samples[TIME_KEYS[-1]])]
+        for key in TIME_KEYS:
+            res.extend(median_ci(self.samples[key], confidence=confidence))
+        return tuple(res)
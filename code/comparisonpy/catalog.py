@@ -0,0 +1,235 @@
+"""
+Metadata catalog of the model collections.
+
+Every model file is parsed once with libSBML and the metadata (size of the
+model, SBML features like events, delays and algebraic rules) is stored in
+`models/catalog.tsv`. Entries are reused as long as size and modification
+time of the file are unchanged, otherwise the content hash decides if the
+file has to be parsed again. Files which cannot be parsed are kept in the
+catalog with status 'error' (and the error message) and are not selected.
+
+The runners use the catalog to select models, skip models which are not
+supported by a simulator and to schedule the most expensive models first,
+without parsing the models again.
+"""
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Set
+
+import pandas as pd
+
+from code.comparisonpy import (
+    MODELS_DIR, bigg_model_paths, biomodels_model_paths, synthetic_model_paths
+)
+from code.comparisonpy.model_store import file_hash
+
+if TYPE_CHECKING:
+    import libsbml
+
+CATALOG_PATH = MODELS_DIR / "catalog.tsv"
+
+COLLECTIONS: Dict[str, Callable[[], List[Path]]] = {
+    "bigg": bigg_model_paths,
+    "biomodels": biomodels_model_paths,
+    "synthetic": synthetic_model_paths,
+}
+
+# default collection of the datasets
+DATASET_COLLECTIONS = {"fba": "bigg", "ode": "biomodels"}
+
+# models of the dataset in collections with ODE and FBA models (query on the catalog)
+DATASET_QUERIES = {
+    ("synthetic", "fba"): "fbc == True",
+    ("synthetic", "ode"): "fbc == False",
+}
+
+# status of the catalog entries
+STATUS_OK = "ok"
+STATUS_ERROR = "error"  # metadata could not be read, see column 'error'
+
+CATALOG_COLUMNS = [
+    "model", "collection", "path", "sha256", "file_size", "mtime_ns", "status", "error",
+    "level", "version", "n_compartments", "n_species", "n_reactions", "n_parameters",
+    "n_local_parameters", "n_function_definitions", "n_initial_assignments", "n_rules",
+    "n_algebraic_rules", "n_constraints", "n_events", "n_event_delays", "n_delays", "fbc",
+]
+
+# models which cannot be simulated with the simulator (query on the catalog)
+UNSUPPORTED_QUERIES = {
+    "roadrunner": "n_delays > 0",
+}
+
+
+def model_id(path: Path) -> str:
+    """Model id from the model path (without '.xml'/'.xml.gz')."""
+    return path.name.split(".")[0]
+
+
+def _count_delays(node: Optional["libsbml.ASTNode"]) -> int:
+    """Number of delay functions (csymbol delay) in the math."""
+    import libsbml
+
+    if node is None:
+        return 0
+    n = 1 if node.getType() == libsbml.AST_FUNCTION_DELAY else 0
+    return n + sum(_count_delays(node.getChild(k)) for k in range(node.getNumChildren()))
+
+
+def model_metadata(path: Path) -> Dict[str, Any]:
+    """Metadata of the SBML model (single libSBML pass)."""
+    import libsbml
+
+    doc: libsbml.SBMLDocument = libsbml.readSBMLFromFile(str(path))
+    model: libsbml.Model = doc.getModel()
+    if model is None:
+        raise ValueError(f"No model in SBML file: '{path}'")
+
+    # all math which can contain delay functions
+    maths = [r.getMath() for r in model.getListOfRules()]
+    maths += [a.getMath() for a in model.getListOfInitialAssignments()]
+    maths += [f.getMath() for f in model.getListOfFunctionDefinitions()]
+    maths += [r.getKineticLaw().getMath() for r in model.getListOfReactions()
+              if r.isSetKineticLaw()]
+    n_event_delays = 0
+    for event in model.getListOfEvents():
+        if event.isSetTrigger():
+            maths.append(event.getTrigger().getMath())
+        if event.isSetDelay():
+            n_event_delays += 1
+        maths += [a.getMath() for a in event.getListOfEventAssignments()]
+
+    return {
+        "level": doc.getLevel(),
+        "version": doc.getVersion(),
+        "n_compartments": model.getNumCompartments(),
+        "n_species": model.getNumSpecies(),
+        "n_reactions": model.getNumReactions(),
+        "n_parameters": model.getNumParameters(),
+        "n_local_parameters": sum(
+            r.getKineticLaw().getNumLocalParameters() if doc.getLevel() >= 3
+            else r.getKineticLaw().getNumParameters()
+            for r in model.getListOfReactions() if r.isSetKineticLaw()
+        ),
+        "n_function_definitions": model.getNumFunctionDefinitions(),
+        "n_initial_assignments": model.getNumInitialAssignments(),
+        "n_rules": model.getNumRules(),
+        "n_algebraic_rules": sum(1 for r in model.getListOfRules() if r.isAlgebraic()),
+        "n_constraints": model.getNumConstraints(),
+        "n_events": model.getNumEvents(),
+        "n_event_delays": n_event_delays,
+        "n_delays": sum(_count_delays(m) for m in maths),
+        "fbc": model.getPlugin("fbc") is not None,
+    }
+
+
+def build_catalog(collections: Sequence[str] = tuple(COLLECTIONS),
+                  catalog_path: Path = CATALOG_PATH) -> pd.DataFrame:
+    """Create or update the catalog for all models of the collections.
+
+    Only new or changed files are parsed. Removed files are dropped, entries
+    of other collections are kept. Files without readable model are stored
+    with status 'error'.
+    """
+    existing: Dict[str, Dict] = {}
+    if catalog_path.exists():
+        df = pd.read_csv(catalog_path, sep="\t")
+        if "status" not in df.columns:
+            df["status"] = STATUS_OK
+        existing = {row["path"]: row for row in df.to_dict(orient="records")}
+
+    entries = [e for e in existing.values() if e["collection"] not in collections]
+    changed = False
+    for collection in collections:
+        for path in COLLECTIONS[collection]():
+            rel_path = str(path.relative_to(MODELS_DIR))
+            stat = path.stat()
+            entry = existing.get(rel_path)
+            if entry is not None and (entry["file_size"], entry["mtime_ns"]) == (
+                stat.st_size, stat.st_mtime_ns
+            ):
+                entries.append(entry)
+                continue
+
+            sha256 = file_hash(path)
+            if entry is None or entry["sha256"] != sha256:
+                print(f"... catalog '{rel_path}' ...")
+                entry = {
+                    "model": model_id(path), "collection": collection, "path": rel_path,
+                    "sha256": sha256, "status": STATUS_OK,
+                }
+                try:
+                    entry.update(model_metadata(path))
+                except ValueError as err:
+                    print(f"WARNING: '{rel_path}' not cataloged: {err}")
+                    entry.update({"status": STATUS_ERROR, "error": str(err)})
+            entry.update({"file_size": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+            entries.append(entry)
+            changed = True
+
+    df = pd.DataFrame(entries, columns=CATALOG_COLUMNS)
+    if changed or len(entries) != len(existing):
+        df.to_csv(catalog_path, sep="\t", index=False)
+        load_catalog.cache_clear()
+    return df
+
+
+@lru_cache(maxsize=None)
+def load_catalog(catalog_path: Path = CATALOG_PATH) -> pd.DataFrame:
+    """Load the catalog (built if it does not exist or has no entry status)."""
+    if not catalog_path.exists() or "status" not in pd.read_csv(catalog_path, sep="\t", nrows=0):
+        return build_catalog(catalog_path=catalog_path)
+    return pd.read_csv(catalog_path, sep="\t")
+
+
+def catalog_model_paths(collection: str, query: Optional[str] = None,
+                        longest_first: bool = True,
+                        model_ids: Optional[Sequence[str]] = None,
+                        dataset: Optional[str] = None) -> List[Path]:
+    """Paths of the models of the collection from the catalog.
+
+    :param query: pandas query for selecting models, e.g. 'n_reactions < 1000 and n_events == 0'
+    :param model_ids: ids of the selected models, all models if None
+    :param dataset: only models of the dataset ('fba' or 'ode', see `DATASET_QUERIES`)
+    :param longest_first: sort by expected cost (model size) for scheduling the
+        longest jobs first, sorted by model id otherwise
+
+    Models with status 'error' are never selected, also if requested via
+    model_ids (skipped with a warning).
+    """
+    df = load_catalog()
+    df = df[df.collection == collection]
+    errors = df[df.status == STATUS_ERROR]
+    if model_ids is not None:
+        errors = errors[errors.model.isin(model_ids)]
+    for row in errors.itertuples():
+        print(f"WARNING: skip '{row.model}' with catalog error: {row.error}")
+    df = df[df.status == STATUS_OK]
+    if model_ids is not None:
+        missing = sorted(set(model_ids) - set(df.model) - set(errors.model))
+        if missing:
+            raise ValueError(f"Models not in the '{collection}' catalog: {missing}")
+        df = df[df.model.isin(model_ids)]
+    dataset_query = DATASET_QUERIES.get((collection, dataset))
+    if dataset_query:
+        df = df.query(dataset_query)
+    if query:
+        df = df.query(query)
+    if longest_first:
+        cost = df.n_species + df.n_reactions + df.n_rules + df.n_events
+        df = df.assign(cost=cost).sort_values(by=["cost", "file_size"], ascending=False)
+    else:
+        df = df.sort_values(by="model")
+    return [MODELS_DIR / path for path in df.path]
+
+
+def unsupported_models(simulator: str) -> Set[str]:
+    """Ids of models which cannot be simulated with the simulator."""
+    query = UNSUPPORTED_QUERIES.get(simulator)
+    if query is None:
+        return set()
+    return set(load_catalog().query(query).model)
+
+
+if __name__ == "__main__":
+    df = build_catalog()
+    print(df.describe())
@@ -0,0 +1,566 @@
+"""
+Command line interface of the simulator comparison.
+
+Runs the FBA or ODE benchmark for a subset of simulators and models with the
+given settings (repeats, workers, tolerances, output directory), and
+optionally compares and plots the results afterwards, e.g.
+
+    python -m code.comparisonpy.cli ode --simulators roadrunner \
+        --models BIOMD0000000001 BIOMD0000000002 --repeat 3 --atol 1e-8 \
+        --output /tmp/ode_check --compare --plot
+
+    python -m code.comparisonpy.cli fba --simulators cobrapy --query "n_reactions < 1000" \
+        --workers 4 --output /tmp/fba_check --compare
+
+The roadrunner load times with cold compilation and with models restored
+from the compiled model cache are benchmarked side by side via
+
+    python -m code.comparisonpy.cli ode --simulators roadrunner --sources sbml state_cache
+
+Results can be stored as named baseline and later runs are checked for
+performance regressions against the baseline (exit code 1 on regressions):
+
+    python -m code.comparisonpy.cli baseline ode rr-2.0.5 --simulators roadrunner
+    python -m code.comparisonpy.cli regress ode rr-2.0.5 --simulators roadrunner
+
+Work-precision curves of the integrator methods over a tolerance grid (error
+against a tight-tolerance reference solution) with a Pareto summary via
+
+    python -m code.comparisonpy.cli work-precision --query "n_species < 50" --plot
+
+The throughput of ensembles (parameter scans) and of batched FBA scenarios
+(single reaction/gene deletions, random media) is benchmarked via
+
+    python -m code.comparisonpy.cli ensemble --runs 1000 --workers 4
+    python -m code.comparisonpy.cli fba-scenarios --kinds reaction gene --simulators cobrapy
+
+The scaling of load and simulate time with the model size is benchmarked on
+generated models of controlled size (collection 'synthetic'), the scaling
+exponents are fitted after the benchmark
+
+    python -m code.comparisonpy.cli synthetic --sizes 10 100 1000 10000
+    python -m code.comparisonpy.cli ode --collection synthetic --simulators roadrunner copasi
+    python -m code.comparisonpy.cli fba --collection synthetic --simulators cobrapy
+
+The results, ledger and figures are written to the output directory
+(`<output>/fba`, `<output>/ode`). The simulator backends are only imported
+for the selected simulators.
+"""
+import argparse
+import sys
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from code.comparisonpy import BENCHMARK_MODES, MODE_COLD, N_REPEAT, RESULTS_DIR
+
+FBA_SIMULATOR_KEYS = ["cobrapy", "cameo"]
+ODE_SIMULATOR_KEYS = ["roadrunner", "copasi"]
+# SBSCL in a warm/cold JVM, requires the Java harness (see `sbscl`)
+SBSCL_SIMULATOR_KEYS = ["sbscl", "sbscl_cold"]
+# reference results, from the Java mains or the SBSCL harness
+REFERENCE_SIMULATOR = "sbscl"
+
+
+def _adaptive_settings(args: argparse.Namespace):
+    """Adaptive settings from the arguments, None for a fixed number of repeats."""
+    if not args.adaptive:
+        return None
+    from code.comparisonpy.adaptive import AdaptiveSettings
+    return AdaptiveSettings(rel_width=args.rel_width, max_repeat=args.max_repeat,
+                            time_budget=args.time_budget)
+
+
+def _available_simulators(dataset: str, simulators: Sequence[str],
+                          results_dir: Path, collection: Optional[str] = None,
+                          solver: Optional[str] = None) -> List[str]:
+    """Simulators with results in results_dir (including the reference results).
+
+    :param solver: LP backend, simulators (except the reference) need results of
+        the solver (`<collection>_<simulator>_<solver>.tsv`)
+    """
+    from code.comparisonpy.catalog import DATASET_COLLECTIONS
+
+    prefix = collection if collection is not None else DATASET_COLLECTIONS[dataset]
+    available = []
+    for sim in _with_reference(simulators):
+        name = sim if solver is None or sim == REFERENCE_SIMULATOR else f"{sim}_{solver}"
+        if (results_dir / dataset / f"{prefix}_{name}.tsv").exists():
+            available.append(sim)
+    return available
+
+
+def _with_reference(simulators: Sequence[str]) -> List[str]:
+    """Reference simulator followed by the other simulators."""
+    return [REFERENCE_SIMULATOR] + [sim for sim in simulators if sim != REFERENCE_SIMULATOR]
+
+
+def compare(dataset: str, simulators: Sequence[str], results_dir: Path,
+            solvers: Optional[List[str]] = None, collection: Optional[str] = None,
+            source: str = "tsv"):
+    """Compare the results of the simulators (with the reference results).
+
+    :param solvers: LP backends of the FBA results, the results of the first
+        solver are compared with the reference
+    :param collection: model collection of the FBA results, default collection if None
+    :param source: ODE trajectories of the TSV results ('tsv') or of the columnar
+        trajectory dataset ('arrow', 'parquet')
+    """
+    if dataset == "fba":
+        from code.comparisonpy.catalog import DATASET_COLLECTIONS
+        from code.comparisonpy.comparison import compare_fba_results
+        collection = collection if collection is not None else DATASET_COLLECTIONS[dataset]
+        solver = solvers[0] if solvers else None
+        for simulator in _available_simulators(dataset, simulators, results_dir, collection,
+                                               solver=solver):
+            if simulator == REFERENCE_SIMULATOR:
+                continue
+            compare_fba_results(simulator=simulator, results_dir=results_dir, solvers=solvers,
+                                collection=collection)
+    else:
+        from code.comparisonpy.ode_comparison import compare_ode_results
+        if source == "tsv":
+            available = {
+                sim for sim in _with_reference(simulators) if (results_dir / "ode" / sim).exists()
+            }
+        else:
+            from code.comparisonpy.trajectories import list_trajectories
+            available = set(list_trajectories(
+                fmt=source, trajectory_dir=results_dir / "ode" / "trajectories"
+            ).simulator)
+        ode_simulators = [sim for sim in _with_reference(simulators) if sim in available]
+        compare_ode_results(simulators=ode_simulators, source=source, results_dir=results_dir)
+
+
+def plot(dataset: str, simulators: Sequence[str], results_dir: Path, memory: bool = False,
+         show: bool = False, formats: Optional[List[str]] = None,
+         models_per_page: Optional[int] = None, summary_only: bool = False,
+         collection: Optional[str] = None, solver: Optional[str] = None):
+    """Plot the timings (and memory) of the simulators.
+
+    :param formats: figure formats, e.g. ['png'] for raster output
+    :param models_per_page: models per page of the per model figures
+    :param summary_only: only plot the summary views (ECDF, speedup, model size)
+    :param collection: model collection of the results, default collection if None
+    :param solver: LP backend of the FBA results, results of the default solver if None
+    """
+    from code.comparisonpy import visualization
+
+    formats = formats if formats is not None else visualization.FIGURE_FORMATS
+    models_per_page = (models_per_page if models_per_page is not None
+                       else visualization.MODELS_PER_PAGE)
+    plot_simulators = _available_simulators(dataset, simulators, results_dir, collection,
+                                            solver=solver)
+    df = visualization.load_results(dataset, simulators=plot_simulators, results_dir=results_dir,
+                                    collection=collection, solver=solver)
+    if not summary_only:
+        visualization.visualize_timings(df, dataset=dataset, results_dir=results_dir, show=show,
+                                        formats=formats, models_per_page=models_per_page)
+    visualization.visualize_timing_summary(df, dataset=dataset, results_dir=results_dir,
+                                           show=show, formats=formats, collection=collection)
+    if memory:
+        visualization.visualize_memory(df, dataset=dataset, results_dir=results_dir, show=show,
+                                       formats=formats)
+
+
+def run_fba(args: argparse.Namespace):
+    """Run the FBA benchmark."""
+    from code.comparisonpy.fba_simulation import optimize_models
+
+    optimize_models(
+        n_repeat=args.repeat, n_workers=args.workers, isolate_simulators=args.isolate,
+        pin_cpus=not args.no_pin, mode=args.mode, source=args.source,
+        timeout=args.timeout, adaptive=_adaptive_settings(args),
+        track_memory=args.track_memory, resume=not args.no_resume, solvers=args.solvers,
+        query=args.query,
+        simulators=args.simulators, models=args.models, collection=args.collection,
+        results_dir=args.output,
+    )
+
+
+def run_ode(args: argparse.Namespace) -> List[str]:
+    """Run the ODE benchmark for every selected simulator and model source.
+
+    Model sources not supported by a simulator are skipped. If the SBML and
+    the state cache source were run, the load times are compared.
+
+    :return: names of the results (simulator and model source)
+    """
+    from code.comparisonpy.ode_simulation import (
+        ODE_SOURCES, SOURCE_SBML, TimeCourseSettings, result_name, run_models
+    )
+    from code.comparisonpy.state_cache import compare_load_times
+
+    time_course = TimeCourseSettings(
+        start=args.start, end=args.end, steps=args.steps,
+        absolute_tolerance=args.atol, relative_tolerance=args.rtol,
+    )
+    names = []
+    for simulator in args.simulators:
+        sources = [source for source in args.sources if source in ODE_SOURCES[simulator]]
+        for source in sources:
+            run_models(
+                simulator=simulator, n_repeat=args.repeat, n_workers=args.workers,
+                timeout=args.timeout, pin_cpus=not args.no_pin, mode=args.mode,
+                output_format=args.format, adaptive=_adaptive_settings(args),
+                track_memory=args.track_memory, resume=not args.no_resume, query=args.query,
+                models=args.models, time_course=time_course, source=source,
+                collection=args.collection, results_dir=args.output,
+            )
+            names.append(result_name(simulator, source))
+        if SOURCE_SBML in sources:
+            for source in sources:
+                if source != SOURCE_SBML:
+                    compare_load_times(simulator, source=source, collection=args.collection,
+                                       results_dir=args.output)
+    return names
+
+
+def run_work_precision(args: argparse.Namespace):
+    """Run the work-precision benchmark and plot the curves."""
+    from code.comparisonpy.ode_simulation import TimeCourseSettings
+    from code.comparisonpy.work_precision import run_work_precision as run
+
+    df, _ = run(
+        simulators=args.simulators, n_repeat=args.repeat, n_workers=args.workers,
+        timeout=args.timeout, pin_cpus=not args.no_pin, query=args.query,
+        models=args.models, results_dir=args.output,
+        time_course=TimeCourseSettings(start=args.start, end=args.end, steps=args.steps),
+    )
+    if args.plot:
+        from code.comparisonpy import visualization
+        formats = args.formats if args.formats is not None else visualization.FIGURE_FORMATS
+        visualization.visualize_work_precision(df, results_dir=args.output, show=args.show,
+                                               formats=formats)
+
+
+def run_ensemble(args: argparse.Namespace):
+    """Run the ensemble throughput benchmark."""
+    from code.comparisonpy.ensemble import run_ensembles
+
+    run_ensembles(
+        simulators=args.simulators, n_runs=args.runs, rel_sd=args.rel_sd, seed=args.seed,
+        n_workers=args.workers, pin_cpus=not args.no_pin, query=args.query,
+        models=args.models, results_dir=args.output,
+    )
+
+
+def run_fba_scenarios(args: argparse.Namespace):
+    """Run the FBA scenario throughput benchmark for every scenario kind."""
+    from code.comparisonpy.fba_scenarios import optimize_scenarios
+
+    for kind in args.kinds:
+        optimize_scenarios(
+            kind=kind, simulators=args.simulators, source=args.source,
+            n_workers=args.workers, pin_cpus=not args.no_pin, query=args.query,
+            models=args.models, results_dir=args.output,
+        )
+
+
+def _add_selection_arguments(parser: argparse.ArgumentParser):
+    """Model selection and worker arguments of the throughput benchmarks."""
+    parser.add_argument("--models", nargs="+", default=None,
+                        help="model ids (default: all models of the query)")
+    parser.add_argument("--query", default=None,
+                        help="catalog query for selecting models, e.g. 'n_reactions < 1000'")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of parallel worker processes (default: serial)")
+    parser.add_argument("--no-pin", action="store_true",
+                        help="do not pin the workers to single CPUs")
+    _add_output_arguments(parser)
+
+
+def _add_benchmark_arguments(parser: argparse.ArgumentParser, simulators: List[str],
+                             dataset: str):
+    """Arguments shared by the FBA and ODE benchmark."""
+    from code.comparisonpy.catalog import DATASET_COLLECTIONS
+    from code.comparisonpy.synthetic import COLLECTION as SYNTHETIC_COLLECTION
+    parser.add_argument("--simulators", nargs="+", choices=simulators + SBSCL_SIMULATOR_KEYS,
+                        default=simulators,
+                        help=f"simulators to benchmark (default: {' '.join(simulators)}), "
+                             f"'sbscl' runs SBSCL in a warm JVM, 'sbscl_cold' in a fresh "
+                             f"JVM per run")
+    parser.add_argument("--models", nargs="+", default=None,
+                        help="model ids (default: all models of the query)")
+    parser.add_argument("--query", default=None,
+                        help="catalog query for selecting models, e.g. 'n_events == 0'")
+    collection = DATASET_COLLECTIONS[dataset]
+    parser.add_argument("--collection", choices=[collection, SYNTHETIC_COLLECTION],
+                        default=collection,
+                        help=f"model collection (default: {collection}), the scaling exponents "
+                             f"are fitted after the benchmark of the synthetic models")
+    parser.add_argument("--repeat", type=int, default=N_REPEAT,
+                        help="number of repeats per model (minimal number with --adaptive)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of parallel worker processes (default: serial)")
+    parser.add_argument("--no-pin", action="store_true",
+                        help="do not pin the workers to single CPUs")
+    parser.add_argument("--mode", choices=BENCHMARK_MODES, default=MODE_COLD,
+                        help="'cold' loads the model every repeat, 'warm' once")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="repeat until the CI of the median times is narrow enough")
+    parser.add_argument("--rel-width", type=float, default=0.05,
+                        help="target width of the CI relative to the median (--adaptive)")
+    parser.add_argument("--max-repeat", type=int, default=100,
+                        help="maximal number of repeats (--adaptive)")
+    parser.add_argument("--time-budget", type=float, default=60.0,
+                        help="time budget per model and simulator [s] (--adaptive)")
+    parser.add_argument("--track-memory", action="store_true",
+                        help="record peak RSS and tracemalloc peak (slows down timings)")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="start a new sweep instead of continuing the last sweep")
+    _add_output_arguments(parser)
+    parser.add_argument("--compare", action="store_true",
+                        help="compare the results after the benchmark")
+    parser.add_argument("--plot", action="store_true",
+                        help="plot the timings after the benchmark")
+
+
+def _add_output_arguments(parser: argparse.ArgumentParser):
+    """Output directory argument."""
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR,
+                        help=f"output directory of results and ledger (default: {RESULTS_DIR})")
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """Parser of the command line interface."""
+    parser = argparse.ArgumentParser(
+        prog="python -m code.comparisonpy.cli",
+        description="Benchmark, compare and plot FBA and ODE simulators.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fba = subparsers.add_parser("fba", help="FBA benchmark on the BiGG models")
+    _add_benchmark_arguments(fba, FBA_SIMULATOR_KEYS, dataset="fba")
+    from code.comparisonpy.model_store import MODEL_SOURCES, SOURCE_SBML
+    fba.add_argument("--source", choices=MODEL_SOURCES, default=SOURCE_SBML,
+                     help="model source, SBML file or decompressed SBML/pickled model from "
+                          "the model store (default: sbml)")
+    fba.add_argument("--solvers", nargs="+", default=None,
+                     help="LP backends, e.g. 'glpk cplex' (default: default solver)")
+    fba.add_argument("--isolate", action="store_true",
+                     help="run every simulator in its own worker (with --workers)")
+    from code.comparisonpy import fba_simulation as fba_settings
+    fba.add_argument("--timeout", type=float, default=fba_settings.TIMEOUT,
+                     help="wall-clock timeout per model [s] (with --workers)")
+
+    from code.comparisonpy import ode_simulation as ode_settings
+    from code.comparisonpy.trajectories import OUTPUT_FORMATS
+    ode = subparsers.add_parser("ode", help="ODE benchmark on the BioModels")
+    _add_benchmark_arguments(ode, ODE_SIMULATOR_KEYS, dataset="ode")
+    ode.add_argument("--start", type=float, default=ode_settings.START, help="start time")
+    ode.add_argument("--end", type=float, default=ode_settings.END, help="end time")
+    ode.add_argument("--steps", type=int, default=ode_settings.STEPS, help="number of steps")
+    ode.add_argument("--atol", type=float, default=ode_settings.ABSOLUTE_TOLERANCE,
+                     help="absolute tolerance of the integrator")
+    ode.add_argument("--rtol", type=float, default=ode_settings.RELATIVE_TOLERANCE,
+                     help="relative tolerance of the integrator")
+    ode.add_argument("--timeout", type=float, default=ode_settings.TIMEOUT,
+                     help="wall-clock timeout per model [s] (with --workers)")
+    ode.add_argument("--format", choices=OUTPUT_FORMATS, default="tsv",
+                     help="trajectory output format")
+    ode.add_argument("--sources", nargs="+", choices=ode_settings.ODE_SOURCES["roadrunner"],
+                     default=[ode_settings.SOURCE_SBML],
+                     help="model sources, 'state_cache' restores compiled roadrunner models "
+                          "(default: sbml)")
+
+    from code.comparisonpy import work_precision
+    wp = subparsers.add_parser("work-precision",
+                               help="work-precision benchmark of the ODE integrator methods")
+    wp.add_argument("--simulators", nargs="+", choices=list(work_precision.METHODS),
+                    default=list(work_precision.METHODS),
+                    help="simulators, all integrator methods of a simulator are run "
+                         f"(default: {' '.join(work_precision.METHODS)})")
+    wp.add_argument("--models", nargs="+", default=None,
+                    help="model ids (default: all models of the query)")
+    wp.add_argument("--query", default=None,
+                    help="catalog query for selecting models, e.g. 'n_events == 0'")
+    wp.add_argument("--repeat", type=int, default=work_precision.N_REPEAT,
+                    help="number of repeats per tolerance (median time)")
+    wp.add_argument("--workers", type=int, default=None,
+                    help="number of parallel worker processes (default: serial)")
+    wp.add_argument("--timeout", type=float, default=None,
+                    help="wall-clock timeout per model [s] (with --workers)")
+    wp.add_argument("--no-pin", action="store_true",
+                    help="do not pin the workers to single CPUs")
+    wp.add_argument("--start", type=float, default=ode_settings.START, help="start time")
+    wp.add_argument("--end", type=float, default=ode_settings.END, help="end time")
+    wp.add_argument("--steps", type=int, default=ode_settings.STEPS, help="number of steps")
+    _add_output_arguments(wp)
+    wp.add_argument("--plot", action="store_true",
+                    help="plot the work-precision curves per model")
+    wp.add_argument("--show", action="store_true", help="display the figures")
+    wp.add_argument("--formats", nargs="+", default=None,
+                    help="figure formats, e.g. 'png' for raster output (default: svg pdf)")
+
+    from code.comparisonpy import ensemble
+    ens = subparsers.add_parser("ensemble",
+                                help="ensemble throughput (parameter scans) on the BioModels")
+    ens.add_argument("--simulators", nargs="+", choices=list(ensemble.ENSEMBLE_SIMULATORS),
+                     default=list(ensemble.ENSEMBLE_SIMULATORS),
+                     help=f"simulators (default: {' '.join(ensemble.ENSEMBLE_SIMULATORS)})")
+    ens.add_argument("--runs", type=int, default=ensemble.N_RUNS,
+                     help="number of runs (parameter sets) per model")
+    ens.add_argument("--rel-sd", type=float, default=ensemble.REL_SD,
+                     help="relative standard deviation of the sampled parameters")
+    ens.add_argument("--seed", type=int, default=ensemble.SEED,
+                     help="seed of the parameter sampling")
+    _add_selection_arguments(ens)
+
+    from code.comparisonpy import fba_scenarios
+    scenarios = subparsers.add_parser(
+        "fba-scenarios", help="FBA scenario throughput (knockouts, media) on the BiGG models"
+    )
+    scenarios.add_argument("--kinds", nargs="+", choices=fba_scenarios.SCENARIO_KINDS,
+                           default=fba_scenarios.SCENARIO_KINDS,
+                           help="scenario kinds, single reaction/gene deletions or random "
+                                "media (default: all)")
+    scenarios.add_argument("--simulators", nargs="+", choices=list(fba_scenarios.FBA_OPTIMIZE),
+                           default=list(fba_scenarios.FBA_OPTIMIZE),
+                           help=f"simulators (default: {' '.join(fba_scenarios.FBA_OPTIMIZE)})")
+    scenarios.add_argument("--source", choices=MODEL_SOURCES, default=SOURCE_SBML,
+                           help="model source (default: sbml)")
+    _add_selection_arguments(scenarios)
+
+    from code.comparisonpy import synthetic
+    syn = subparsers.add_parser("synthetic", help="generate the synthetic models")
+    syn.add_argument("--kinds", nargs="+", choices=synthetic.KINDS, default=synthetic.KINDS,
+                     help="model families (default: all)")
+    syn.add_argument("--sizes", nargs="+", type=int, default=synthetic.SIZES,
+                     help="number of reactions of the models (default: 10 to 100000)")
+    syn.add_argument("--seed", type=int, default=synthetic.SEED,
+                     help="seed of the random networks")
+    syn.add_argument("--overwrite", action="store_true", help="regenerate existing models")
+
+    scaling = subparsers.add_parser("scaling",
+                                    help="fit scaling exponents of existing synthetic results")
+    scaling.add_argument("dataset", choices=["fba", "ode"])
+    scaling.add_argument("--simulators", nargs="+", default=None,
+                         help="simulators (default: all simulators of the dataset)")
+    _add_output_arguments(scaling)
+
+    for command, help_text in [("compare", "compare existing results"),
+                               ("plot", "plot existing results")]:
+        sub = subparsers.add_parser(command, help=help_text)
+        sub.add_argument("dataset", choices=["fba", "ode"])
+        sub.add_argument("--simulators", nargs="+", default=None,
+                         help="simulators (default: all simulators of the dataset)")
+        _add_output_arguments(sub)
+        if command == "plot":
+            sub.add_argument("--memory", action="store_true", help="plot the memory footprint")
+            sub.add_argument("--show", action="store_true", help="display the figures")
+            sub.add_argument("--formats", nargs="+", default=None,
+                             help="figure formats, e.g. 'png' for raster output "
+                                  "(default: svg pdf)")
+            sub.add_argument("--per-page", type=int, default=None,
+                             help="models per page of the per model figures (default: 100)")
+            sub.add_argument("--summary-only", action="store_true",
+                             help="only plot ECDF, speedup and model size views")
+        else:
+            sub.add_argument("--solvers", nargs="+", default=None,
+                             help="compare the FBA results of the LP backends")
+            sub.add_argument("--format", choices=OUTPUT_FORMATS, default="tsv",
+                             help="trajectory source of the ODE comparison, TSV results "
+                                  "or trajectory dataset (default: tsv)")
+
+    from code.comparisonpy import regression
+    from code.comparisonpy.catalog import COLLECTIONS, DATASET_COLLECTIONS
+    for command, help_text in [("baseline", "store results as named baseline"),
+                               ("regress", "check results for regressions against a baseline")]:
+        sub = subparsers.add_parser(command, help=help_text)
+        sub.add_argument("dataset", choices=["fba", "ode"])
+        sub.add_argument("name", help="name of the baseline")
+        sub.add_argument("--simulators", nargs="+", default=None,
+                         help="simulators (default: all simulators of the dataset)")
+        sub.add_argument("--baselines", type=Path, default=regression.BASELINES_DIR,
+                         help=f"directory of the baselines (default: {regression.BASELINES_DIR})")
+        sub.add_argument("--collection", choices=list(COLLECTIONS), default=None,
+                         help="model collection of the results (default: "
+                              f"{DATASET_COLLECTIONS['fba']} for fba, "
+                              f"{DATASET_COLLECTIONS['ode']} for ode)")
+        _add_output_arguments(sub)
+        if command == "regress":
+            sub.add_argument("--threshold", type=float, default=regression.THRESHOLD,
+                             help="relative change of the median time to flag a model")
+            sub.add_argument("--alpha", type=float, default=regression.ALPHA,
+                             help="significance level of the Mann-Whitney U test")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Entry point of the command line interface.
+
+    :return: exit code, 1 if regressions were found ('regress'), 0 otherwise
+    """
+    args = create_parser().parse_args(argv)
+    if args.command in ("fba", "ode"):
+        dataset = args.command
+        if args.command == "fba":
+            run_fba(args)
+            names = args.simulators
+        else:
+            names = run_ode(args)
+        from code.comparisonpy.catalog import DATASET_COLLECTIONS
+        if args.collection != DATASET_COLLECTIONS[dataset]:
+            from code.comparisonpy.synthetic import fit_scaling
+            fit_scaling(dataset, names, results_dir=args.output)
+            if args.compare and dataset == "fba":
+                compare(dataset, args.simulators, results_dir=args.output,
+                        solvers=args.solvers, collection=args.collection)
+            elif args.compare:
+                print("Comparison is only available for the "
+                      f"'{DATASET_COLLECTIONS[dataset]}' models.")
+            if args.plot:
+                print("Plots are only available for the "
+                      f"'{DATASET_COLLECTIONS[dataset]}' models.")
+            return 0
+        if args.compare:
+            compare(dataset, args.simulators, results_dir=args.output,
+                    solvers=getattr(args, "solvers", None),
+                    source=getattr(args, "format", "tsv"))
+        if args.plot:
+            solvers = getattr(args, "solvers", None)
+            plot(dataset, names, results_dir=args.output, memory=args.track_memory,
+                 solver=solvers[0] if solvers else None)
+    elif args.command == "work-precision":
+        run_work_precision(args)
+    elif args.command == "ensemble":
+        run_ensemble(args)
+    elif args.command == "fba-scenarios":
+        run_fba_scenarios(args)
+    elif args.command == "synthetic":
+        from code.comparisonpy.synthetic import generate_models
+        generate_models(kinds=args.kinds, sizes=args.sizes, seed=args.seed,
+                        overwrite=args.overwrite)
+    else:
+        dataset = args.dataset
+        simulators = args.simulators
+        if simulators is None:
+            simulators = FBA_SIMULATOR_KEYS if dataset == "fba" else ODE_SIMULATOR_KEYS
+            if args.command in ("compare", "plot", "scaling"):
+                # results of the SBSCL harness are used if available
+                simulators = simulators + SBSCL_SIMULATOR_KEYS
+        if args.command == "scaling":
+            from code.comparisonpy.synthetic import fit_scaling
+            fit_scaling(dataset, simulators, results_dir=args.output)
+        elif args.command == "compare":
+            compare(dataset, simulators, results_dir=args.output, solvers=args.solvers,
+                    source=args.format)
+        elif args.command == "plot":
+            plot(dataset, simulators, results_dir=args.output, memory=args.memory,
+                 show=args.show, formats=args.formats, models_per_page=args.per_page,
+                 summary_only=args.summary_only)
+        elif args.command == "baseline":
+            from code.comparisonpy.regression import save_baseline
+            path = save_baseline(args.name, dataset, simulators, results_dir=args.output,
+                                 baselines_dir=args.baselines, collection=args.collection)
+            print(f"... stored baseline '{args.name}' in '{path}' ...")
+        else:
+            from code.comparisonpy.regression import check_regressions
+            return check_regressions(args.name, dataset, simulators, results_dir=args.output,
+                                     baselines_dir=args.baselines, threshold=args.threshold,
+                                     alpha=args.alpha, collection=args.collection)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
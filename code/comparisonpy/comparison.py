@@ -1,10 +1,66 @@
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from code.comparisonpy import RESULTS_DIR
+
 EPS_COMPARISON = 1E-4
 
-def compare_results(cobrapy_path, sbscl_path, output_path):
+
+def compare_solvers(solver_paths: Dict[str, Path], df_reference: pd.DataFrame) -> pd.DataFrame:
+    """Objective agreement and solve times of the LP backends.
+
+    :param solver_paths: solver -> FBA results with the solver (e.g. `bigg_cobrapy_glpk.tsv`)
+    :param df_reference: reference results with columns 'mid' and 'objective_value'
+    :return: median results per model and solver
+    """
+    reference = df_reference.groupby("mid").objective_value.first()
+    dfs = []
+    for solver, path in solver_paths.items():
+        df = pd.read_csv(path, sep="\t")
+        df["mid"] = df.model.str.split(".").str[0]
+        df_solver = df.groupby("mid").agg(
+            objective_value=("objective_value", "median"),
+            status=("status", "first"),
+            iterations=("iterations", "median"),
+            solve_time=("solve_time", "median"),
+            simulate_time=("simulate_time", "median"),
+        ).reset_index()
+        df_solver.insert(1, "solver", solver)
+        df_solver["objective_reference"] = df_solver.mid.map(reference)
+        df_solver["identical"] = (
+            np.abs(df_solver.objective_value - df_solver.objective_reference) < EPS_COMPARISON
+        )
+        dfs.append(df_solver)
+    return pd.concat(dfs, ignore_index=True)
+
+
+def summarize_solvers(df_solvers: pd.DataFrame) -> pd.DataFrame:
+    """Summary per LP backend, correct solvers sorted by total solve time first."""
+    df = df_solvers.groupby("solver").agg(
+        n_models=("mid", "count"),
+        n_identical=("identical", "sum"),
+        n_optimal=("status", lambda x: (x == "optimal").sum()),
+        solve_time_total=("solve_time", "sum"),
+        solve_time_median=("solve_time", "median"),
+    ).reset_index()
+    df["correct"] = df.n_identical == df.n_models
+    return df.sort_values(by=["correct", "solve_time_total"], ascending=[False, True])
+
+
+def compare_results(cobrapy_path, sbscl_path, output_path,
+                    solver_paths: Optional[Dict[str, Path]] = None):
     """ Compare the FBA results.
 
+    With solver_paths the objective agreement of every LP backend with the
+    SBSCL results is stored in `<output>_solvers.tsv` and the summary per
+    backend (fastest correct solver first) in `<output>_solvers_summary.tsv`.
+
     :param cobrapy_file:
     :param sbscl_file:
+    :param solver_paths: solver -> FBA results with the solver
     :return:
     """
     df_cobra = pd.read_csv(cobrapy_path, sep="\t")
@@ -13,22 +69,55 @@ def compare_results(cobrapy_path, sbscl_path, output_path):
     df_sbscl['mid'] = df_sbscl.model.str.split('.').str[0]
     df = pd.merge(left=df_cobra, right=df_sbscl, on=['mid'])
     df['identical'] = np.abs(df.objective_value_x - df.objective_value_y) < EPS_COMPARISON
-    del df['target']
-    del df['model_x']
-    del df['model_y']
+    df.drop(columns=['target', 'model_x', 'model_y'], errors="ignore", inplace=True)
     print(df[df.identical == False])
     df.to_csv(output_path, sep="\t", index=False)
 
+    if solver_paths is not None:
+        output_path = Path(output_path)
+        df_solvers = compare_solvers(solver_paths, df_reference=df_sbscl)
+        df_solvers.to_csv(output_path.with_name(f"{output_path.stem}_solvers.tsv"),
+                          sep="\t", index=False)
+        df_summary = summarize_solvers(df_solvers)
+        df_summary.to_csv(output_path.with_name(f"{output_path.stem}_solvers_summary.tsv"),
+                          sep="\t", index=False)
+        print(df_summary)
 
-if __name__ == "__main__":
-    # simulation
-    cobrapy_path = os.path.join(DIRECTORY, 'results', "bigg-fba-{}_cobrapy.tsv".format(BIGG_VERSION))
-    results_path = os.path.join(DIRECTORY, 'results')
-    # optimize_models(model_dir=BIGG_MODELS_PATH, results_path=results_path)
 
-    # comparison of results
-    sbscl_path = os.path.join(DIRECTORY, 'results', "bigg-fba-{}_sbscl.tsv".format(BIGG_VERSION))
-    comparison_path = os.path.join(DIRECTORY, 'results', "bigg-fba-{}_comparison.tsv".format(BIGG_VERSION))
-    compare_results(cobrapy_path=cobrapy_path, sbscl_path=sbscl_path, output_path=comparison_path)
+def compare_fba_results(simulator: str = "cobrapy", results_dir: Path = RESULTS_DIR,
+                        solvers: Optional[List[str]] = None,
+                        sbscl_path: Optional[Path] = None,
+                        collection: str = "bigg") -> Path:
+    """Compare the FBA results of the simulator with the SBSCL results.
+
+    The comparison is stored in `<results_dir>/fba/<collection>_<simulator>_comparison.tsv`.
+    With solvers the results of the first solver are compared with the SBSCL
+    results (instead of the results of the default solver).
 
+    :param solvers: LP backends with results `<collection>_<simulator>_<solver>.tsv`
+    :param sbscl_path: SBSCL results, `<collection>_sbscl.tsv` in results_dir
+        (or in the repository results if not available) if None
+    :param collection: model collection of the results, e.g. 'bigg' or 'synthetic'
+    :return: path of the comparison
+    """
+    fba_dir = results_dir / "fba"
+    if sbscl_path is None:
+        sbscl_path = fba_dir / f"{collection}_sbscl.tsv"
+        if not sbscl_path.exists():
+            sbscl_path = RESULTS_DIR / "fba" / f"{collection}_sbscl.tsv"
+    solver_paths = None
+    if solvers:
+        solver_paths = {
+            solver: fba_dir / f"{collection}_{simulator}_{solver}.tsv" for solver in solvers
+        }
+
+    cobrapy_path = (solver_paths[solvers[0]] if solvers
+                    else fba_dir / f"{collection}_{simulator}.tsv")
+    output_path = fba_dir / f"{collection}_{simulator}_comparison.tsv"
+    compare_results(cobrapy_path=cobrapy_path, sbscl_path=sbscl_path,
+                    output_path=output_path, solver_paths=solver_paths)
+    return output_path
 
+
+if __name__ == "__main__":
+    compare_fba_results(simulator="cobrapy")
@@ -1,8 +1,13 @@
+from typing import Tuple
+
 import COPASI
 from COPASI import CDataModel
 from basico import model_io
 from basico.task_timecourse import __method_name_to_type, __build_result_from_ts
 
+from code.comparisonpy.extraction import ResultArray, extract_copasi
+from code.comparisonpy.timing import PhaseTimer
+
 
 def run_time_course(*args, **kwargs):
     """Simulates the current or given model, returning a data frame with the results
@@ -61,12 +66,62 @@ def run_time_course(*args, **kwargs):
 
      - | `use_numbers` (bool): return all elements collected
 
+     - | `timer` (PhaseTimer): records the phases 'setup', 'solve' and 'extract'
+
     :return: data frame with simulation results
     :rtype: pandas.DataFrame
     """
-    num_args = len(args)
+    task, use_concentrations, timer = _run_time_course(args, kwargs)
+    with timer.phase("extract"):
+        return __build_result_from_ts(task.getTimeSeries(), use_concentrations)
+
+
+def run_time_course_array(*args, **kwargs) -> ResultArray:
+    """Simulates the model, returning the results as array, see `run_time_course`.
+
+    The DataFrame of `run_time_course` is not created, the time series is
+    extracted into a (timepoints x columns) array with the time as first
+    column (named 'time').
+
+    :param kwargs: additional arguments, see `run_time_course`
+
+     - | `out` (numpy.ndarray): preallocated (timepoints x columns) array for the results
+
+    :return: result array
+    """
+    task, use_concentrations, timer = _run_time_course(args, kwargs)
+    with timer.phase("extract"):
+        return extract_copasi(task.getTimeSeries(), use_concentrations=use_concentrations,
+                              out=kwargs.get('out'))
+
+
+def _run_time_course(args: tuple,
+                     kwargs: dict) -> Tuple[COPASI.CTrajectoryTask, bool, PhaseTimer]:
+    """Setup and run the time course task, see `run_time_course`.
+
+    :return: task, use_concentrations, timer
+    """
     model = kwargs.get('model', model_io.get_current_model())
     use_initial_values = kwargs.get('use_initial_values', True)
+    timer = kwargs.get('timer', PhaseTimer())
+    with timer.phase("setup"):
+        task = _setup_time_course(model, args, kwargs)
+
+    with timer.phase("solve"):
+        result = task.processRaw(use_initial_values)
+        if not result:
+            raise RuntimeError("Error while running the simulation: " +
+                          COPASI.CCopasiMessage.getLastMessage().getText())
+
+    use_concentrations = kwargs.get('use_concentrations', True)
+    if 'use_numbers' in kwargs and kwargs['use_numbers']:
+        use_concentrations = False
+    return task, use_concentrations, timer
+
+
+def _setup_time_course(model: CDataModel, args: tuple, kwargs: dict) -> COPASI.CTrajectoryTask:
+    """Setup and initialize the time course task, see `run_time_course`."""
+    num_args = len(args)
 
     task = model.getTask('Time-Course')
     assert (isinstance(task, COPASI.CTrajectoryTask))
@@ -132,17 +187,7 @@ def run_time_course(*args, **kwargs):
     if not result:
         raise RuntimeError("Error while initializing the simulation: " +
                       COPASI.CCopasiMessage.getLastMessage().getText())
-    else:
-        result = task.processRaw(use_initial_values)
-        if not result:
-            raise RuntimeError("Error while running the simulation: " +
-                          COPASI.CCopasiMessage.getLastMessage().getText())
-
-    use_concentrations = kwargs.get('use_concentrations', True)
-    if 'use_numbers' in kwargs and kwargs['use_numbers']:
-        use_concentrations = False
-
-    return __build_result_from_ts(task.getTimeSeries(), use_concentrations)
+    return task
 
 
 if __name__ == "__main__":
@@ -1,74 +1,313 @@
+"""
+Download of the curated BioModels.
+
+The search pages and models are fetched concurrently with a bounded number of
+in-flight requests, sharing the connection pool of a single session (with
+retries on connection errors and server errors).
+
+A local manifest (`models/biomodels/manifest.json`) stores for every model
+the filename, checksum and Last-Modified/ETag of the download. Models are
+only refetched if the local file is missing or changed, or if the server
+reports a change for the conditional request.
+
+Downloads are streamed in chunks to a temporary file next to the target,
+the size and checksum are checked and the file is renamed atomically, so the
+memory stays flat independent of the model size and no partial files are
+left behind. Optionally the files are gzipped on the fly (`.xml.gz` like the
+BiGG models).
+
+The base URL of the BioModels API can be set, e.g. to a local stand-in
+server serving a fake BioModels API.
+"""
+import gzip
+import hashlib
+import json
 import logging
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Dict, List, Optional
 
 import requests
-from typing import List
-import math
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from code.comparisonpy import MODELS_DIR
+from code.comparisonpy.model_store import file_hash
 
 logger = logging.getLogger(__name__)
 
+BIOMODELS_URL = "https://www.ebi.ac.uk/biomodels"
+BIOMODELS_DIR = MODELS_DIR / "biomodels"
+MANIFEST_FILENAME = "manifest.json"
+
+CURATED_QUERY = 'curationstatus:"Manually curated"'
+PAGE_SIZE = 100
+MAX_WORKERS = 8  # maximal number of in-flight requests
+RETRIES = 5
+TIMEOUT = 60.0  # [s] connect/read timeout of requests
+CHUNK_SIZE = 2**16  # [bytes] chunk size of streamed downloads
+
+
+def create_session(max_workers: int = MAX_WORKERS, retries: int = RETRIES) -> requests.Session:
+    """Session with a connection pool for max_workers concurrent requests.
 
-def query_curated_biomodels() -> List[str]:
+    Failed connections and server errors (429, 5xx) are retried with
+    exponential backoff.
+    """
+    session = requests.Session()
+    retry = Retry(
+        total=retries, backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+    )
+    adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers,
+                          max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _search(session: requests.Session, base_url: str, num_results: int,
+            offset: int = 0) -> dict:
+    """Search page of curated models."""
+    response = session.get(
+        f"{base_url}/search",
+        params={"query": CURATED_QUERY, "numResults": num_results, "offset": offset,
+                "format": "json"},
+        timeout=TIMEOUT,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def query_curated_biomodels(session: Optional[requests.Session] = None,
+                            base_url: str = BIOMODELS_URL,
+                            max_workers: int = MAX_WORKERS) -> List[str]:
     """Query curated biomodels.
 
+    The search pages are fetched concurrently.
+
     :return List of biomodel identifiers
     """
+    session = session if session is not None else create_session(max_workers)
+
     # query number of matches
-    url = "https://www.ebi.ac.uk/biomodels/search?query=curationstatus%3A%22Manually%20curated%22&numResults=1&format=json"
-    response = requests.get(url)
-    response.raise_for_status()
-    json = response.json()
-    matches = json["matches"]
-
-    # query all SBML files
-    pages = math.ceil(matches/100)
-    num_results = 100
-    biomodel_ids = []
-    for k in range(pages):
-        offset = k * num_results
-        url = f"https://www.ebi.ac.uk/biomodels/search?query=curationstatus%3A%22Manually%20curated%22&numResults=100&offset={offset}&format=json"
-        print(url)
-        response = requests.get(url)
-        response.raise_for_status()
-        json = response.json()
-        ids = [model["id"] for model in json["models"]]
-        biomodel_ids.extend(ids)
+    matches = _search(session, base_url, num_results=1)["matches"]
 
-    return sorted(biomodel_ids)
+    # query all pages
+    pages = math.ceil(matches / PAGE_SIZE)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(
+            lambda k: _search(session, base_url, num_results=PAGE_SIZE, offset=k * PAGE_SIZE),
+            range(pages),
+        )
+        biomodel_ids = [model["id"] for json in results for model in json["models"]]
 
+    return sorted(set(biomodel_ids))
 
-def download_biomodel_sbml(mid: str, model_path: Path):
-    """Get SBML string from given BioModels identifier."""
-    # query file information
-    print(f"... download '{mid}' ...")
-    url = f"https://www.ebi.ac.uk/biomodels/{mid}?format=json"
-    r = requests.get(url)
-    r.raise_for_status()
 
-    # query main file
-    json = r.json()
+def read_manifest(models_dir: Path = BIOMODELS_DIR) -> Dict[str, Dict]:
+    """Read manifest of downloaded models, empty if it does not exist."""
+    path = models_dir / MANIFEST_FILENAME
+    if not path.exists():
+        return {}
+    with open(path, "r") as f_in:
+        return json.load(f_in)
+
+
+def write_manifest(manifest: Dict[str, Dict], models_dir: Path = BIOMODELS_DIR):
+    """Write manifest of downloaded models (atomic replace)."""
+    path = models_dir / MANIFEST_FILENAME
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f_out:
+        json.dump(manifest, f_out, indent=2, sort_keys=True)
+    tmp_path.replace(path)
+
+
+def _is_current(entry: Optional[Dict], model_path: Path) -> bool:
+    """Check if the local file is the file of the manifest entry."""
+    if entry is None or not model_path.exists():
+        return False
+    return entry.get("sha256") == file_hash(model_path, decompress=True)
+
+
+def _expected_size(file_info: Dict, response: requests.Response) -> Optional[int]:
+    """Expected size of the downloaded content [bytes], None if unknown.
+
+    The Content-Length refers to the encoded content, so it is only used for
+    responses without content encoding.
+    """
+    if file_info.get("fileSize") is not None:
+        return int(file_info["fileSize"])
+    if "Content-Length" in response.headers and "Content-Encoding" not in response.headers:
+        return int(response.headers["Content-Length"])
+    return None
+
+
+def _expected_sha256(file_info: Dict, entry: Optional[Dict], filename: str,
+                     response: requests.Response) -> Optional[str]:
+    """Expected sha256 of the downloaded content, None if unknown.
+
+    The checksum of the file information is used if the server reports one,
+    otherwise the checksum of the manifest entry if the server sends the
+    same file (filename and ETag) as for the previous download.
+    """
+    if file_info.get("sha256"):
+        return file_info["sha256"]
+    etag = response.headers.get("ETag")
+    same_file = entry is not None and entry.get("filename") == filename
+    if same_file and etag and entry.get("etag") == etag:
+        return entry.get("sha256")
+    return None
+
+
+def stream_to_file(response: requests.Response, path: Path,
+                   expected_size: Optional[int] = None,
+                   expected_sha256: Optional[str] = None) -> Dict:
+    """Stream the response content to path, gzipped if path ends with '.gz'.
+
+    The chunks are written to a temporary file, which is renamed to path
+    after the size and checksum (of the uncompressed content) are checked.
+
+    :return: size and sha256 of the content
+    """
+    tmp_path = path.with_name(path.name + ".part")
+    sha = hashlib.sha256()
+    size = 0
+    open_file = gzip.open if path.suffix == ".gz" else open
     try:
-        filename = json["files"]["main"][0]["name"]
-        url = (
-            f"https://www.ebi.ac.uk/biomodels/model/download/{mid}?filename={filename}"
-        )
-        response = requests.get(url, allow_redirects=True)
-        response.raise_for_status()
-        model_str = response.content
+        with open_file(tmp_path, "wb") as f_out:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                sha.update(chunk)
+                size += len(chunk)
+                f_out.write(chunk)
 
-        # bytes array in py3
-        with open(model_path, "w") as f_out:
-            sbml_str = model_str.decode("utf-8")
-            f_out.write(sbml_str)
+        if expected_size is not None and size != expected_size:
+            raise ValueError(f"Size of '{path.name}' is '{size}', expected '{expected_size}'")
+        if expected_sha256 is not None and sha.hexdigest() != expected_sha256:
+            raise ValueError(f"Checksum mismatch for '{path.name}'")
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
 
-    except (TypeError, KeyError) as err:
+    return {"size": size, "sha256": sha.hexdigest()}
+
+
+def download_biomodel_sbml(mid: str, model_path: Path,
+                           session: Optional[requests.Session] = None,
+                           base_url: str = BIOMODELS_URL,
+                           entry: Optional[Dict] = None) -> Dict:
+    """Download the SBML file of the given BioModels identifier.
+
+    If the local file matches the manifest entry, a conditional request
+    (If-None-Match/If-Modified-Since) is sent and the file is only written if
+    the model changed on the server. The file is streamed to disk (gzipped
+    if model_path ends with '.gz') and checked against the checksum of the
+    file information or the manifest entry (see `_expected_sha256`).
+
+    :param entry: manifest entry of the previous download
+    :return: manifest entry of the model
+    """
+    session = session if session is not None else create_session()
+
+    # query file information
+    r = session.get(f"{base_url}/{mid}", params={"format": "json"}, timeout=TIMEOUT)
+    r.raise_for_status()
+    json = r.json()
+    try:
+        file_info = json["files"]["main"][0]
+        filename = file_info["name"]
+    except (TypeError, KeyError, IndexError) as err:
         logger.error(
             f"Filename of 'main' file could not be resolved from response: " f"'{json}'"
         )
         raise err
 
+    # query main file (conditional if local file is current)
+    headers = {}
+    if _is_current(entry, model_path) and entry.get("filename") == filename:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = session.get(
+        f"{base_url}/model/download/{mid}", params={"filename": filename},
+        headers=headers, allow_redirects=True, timeout=TIMEOUT, stream=True,
+    )
+    with response:
+        if response.status_code == requests.codes.not_modified:
+            print(f"... '{mid}' not modified ...")
+            return entry
+        response.raise_for_status()
+
+        print(f"... download '{mid}' ...")
+        content = stream_to_file(
+            response, model_path, expected_size=_expected_size(file_info, response),
+            expected_sha256=_expected_sha256(file_info, entry, filename, response),
+        )
+    # remove the file of the previous download in the other format (.xml/.xml.gz)
+    if entry is not None and entry.get("path") not in (None, model_path.name):
+        (model_path.parent / entry["path"]).unlink(missing_ok=True)
+
+    return {
+        "id": mid,
+        "filename": filename,
+        "path": model_path.name,
+        "size": content["size"],
+        "sha256": content["sha256"],
+        "last_modified": response.headers.get("Last-Modified"),
+        "etag": response.headers.get("ETag"),
+    }
+
+
+def download_biomodels(model_ids: Optional[List[str]] = None,
+                       models_dir: Path = BIOMODELS_DIR,
+                       base_url: str = BIOMODELS_URL,
+                       max_workers: int = MAX_WORKERS,
+                       session: Optional[requests.Session] = None,
+                       compress: bool = False) -> Dict[str, Dict]:
+    """Download (or update) the given models concurrently into models_dir.
+
+    The manifest in models_dir is updated with all downloaded models, also if
+    the download is interrupted. Failed downloads are logged and keep their
+    previous manifest entry.
+
+    :param model_ids: BioModels identifiers, all curated models if None
+    :param compress: store gzipped SBML files ('.xml.gz')
+    :return: manifest
+    """
+    session = session if session is not None else create_session(max_workers)
+    if model_ids is None:
+        model_ids = query_curated_biomodels(session=session, base_url=base_url,
+                                            max_workers=max_workers)
+
+    models_dir.mkdir(parents=True, exist_ok=True)
+    suffix = ".xml.gz" if compress else ".xml"
+    manifest = read_manifest(models_dir)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    download_biomodel_sbml, mid=mid, model_path=models_dir / f"{mid}{suffix}",
+                    session=session, base_url=base_url, entry=manifest.get(mid),
+                ): mid
+                for mid in model_ids
+            }
+            for future in as_completed(futures):
+                mid = futures[future]
+                try:
+                    manifest[mid] = future.result()
+                except (requests.RequestException, ValueError, KeyError,
+                        TypeError, IndexError) as err:
+                    logger.error(f"Download of '{mid}' failed: {err}")
+    finally:
+        write_manifest(manifest, models_dir)
+
+    return manifest
+
 
 if __name__ == "__main__":
     biomodel_ids = query_curated_biomodels()
@@ -76,8 +315,4 @@ if __name__ == "__main__":
     pprint(biomodel_ids)
     pprint(len(biomodel_ids))
 
-    for mid in biomodel_ids:
-        download_biomodel_sbml(
-            mid=mid,
-            model_path=MODELS_DIR / "biomodels" / f"{mid}.xml"
-        )
\ No newline at end of file
+    download_biomodels(biomodel_ids)
@@ -0,0 +1,373 @@
+"""
+Ensemble simulations (parameter scans) with roadrunner and COPASI.
+
+An ensemble is defined by a parameter matrix (runs x parameters) with values
+for global parameters or species (initial concentrations) given by SBML id.
+The model is loaded and compiled once per worker; for every run the values of
+the run are set as initial values, the state is reset (re-evaluating initial
+assignments) and the model is simulated with the settings of the ODE
+benchmark (`START`, `END`, `STEPS`, tolerances).
+
+Trajectories are written in a preallocated array of shape
+(runs, timepoints, species) as concentrations with the SBML ids of the
+species as columns, no DataFrames are created per run. The throughput of
+the simulators is reported in simulations per second.
+"""
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from code.comparisonpy import RESULTS_DIR
+from code.comparisonpy.catalog import (
+    build_catalog, catalog_model_paths, model_id as path_model_id, unsupported_models
+)
+from code.comparisonpy.extraction import (
+    allocate, copasi_species_ids, extract_copasi, species_columns
+)
+from code.comparisonpy.ode_simulation import (
+    START, END, STEPS, ABSOLUTE_TOLERANCE, RELATIVE_TOLERANCE, SIMULATOR_MODULES
+)
+from code.comparisonpy.model_store import read_sbml
+from code.comparisonpy.parallel import import_modules, run_tasks
+from code.comparisonpy.timing import PhaseTimer
+
+if TYPE_CHECKING:
+    import libsbml
+
+N_RUNS = 1000
+REL_SD = 0.1  # relative standard deviation of the sampled parameters
+SEED = 42
+
+
+class EnsembleResult:
+    """Trajectories (runs x timepoints x species) and timings of an ensemble.
+
+    :param load_time: time for loading the model(s) [s]
+    :param simulate_time: time for all runs (setup, solve, extract) [s],
+        summed over the workers
+    :param wall_time: wall time of the ensemble including loading [s]
+    """
+
+    def __init__(self, time: np.ndarray, data: np.ndarray, columns: List[str],
+                 load_time: float, simulate_time: float, wall_time: float):
+        self.time = time
+        self.data = data
+        self.columns = columns
+        self.load_time = load_time
+        self.simulate_time = simulate_time
+        self.wall_time = wall_time
+
+    @property
+    def n_runs(self) -> int:
+        return self.data.shape[0]
+
+    @property
+    def sims_per_second(self) -> float:
+        """Throughput of the ensemble (wall time)."""
+        return self.n_runs / self.wall_time
+
+    @property
+    def sims_per_second_core(self) -> float:
+        """Throughput of a single worker (without loading)."""
+        return self.n_runs / self.simulate_time
+
+
+def sample_parameter_matrix(path: Path, n_runs: int = N_RUNS, rel_sd: float = REL_SD,
+                            seed: Optional[int] = SEED) -> Tuple[List[str], np.ndarray]:
+    """Log-normal perturbations of the constant global parameters of the model.
+
+    Parameters which are zero or targets of rules/initial assignments are not
+    perturbed.
+
+    :return: parameter ids, parameter matrix (runs x parameters)
+    """
+    import libsbml
+
+    doc: libsbml.SBMLDocument = libsbml.readSBMLFromFile(str(path))
+    model: libsbml.Model = doc.getModel()
+    targets = {model.getRule(k).getVariable() for k in range(model.getNumRules())}
+    targets |= {
+        model.getInitialAssignment(k).getSymbol()
+        for k in range(model.getNumInitialAssignments())
+    }
+    parameters = [
+        p for p in model.getListOfParameters()
+        if p.getConstant() and p.isSetValue() and p.getValue() != 0.0
+        and p.getId() not in targets
+    ]
+    parameter_ids = [p.getId() for p in parameters]
+    base = np.array([p.getValue() for p in parameters], dtype=np.float64)
+
+    rng = np.random.default_rng(seed)
+    factors = rng.lognormal(mean=0.0, sigma=rel_sd, size=(n_runs, len(parameters)))
+    return parameter_ids, base * factors
+
+
+def _check_matrix(parameter_ids: List[str], values: np.ndarray) -> np.ndarray:
+    """Check the parameter matrix (runs x parameters)."""
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim != 2 or values.shape[1] != len(parameter_ids):
+        raise ValueError(
+            f"Parameter matrix must have shape (runs, {len(parameter_ids)}), "
+            f"but has shape '{values.shape}'"
+        )
+    return values
+
+
+def run_ensemble_roadrunner(path: Path, parameter_ids: List[str], values: np.ndarray,
+                            out: Optional[np.ndarray] = None) -> EnsembleResult:
+    """Ensemble with a single compiled roadrunner model.
+
+    For every run the values of the run are set as initial values
+    (`init(p)`, species as initial concentrations `init([S])`) and the model
+    is reset, so that initial assignments depending on them are re-evaluated
+    as in the COPASI ensemble.
+    """
+    import roadrunner
+
+    start_time = time.perf_counter()
+    values = _check_matrix(parameter_ids, values)
+    timer = PhaseTimer()
+    with timer.phase("read"):
+        sbml_str = read_sbml(path)
+    # SBML parsing and JIT compilation are not separable
+    with timer.phase("compile"):
+        rr: roadrunner.RoadRunner = roadrunner.RoadRunner(sbml_str)
+
+    with timer.phase("setup"):
+        model: roadrunner.ExecutableModel = rr.model
+        integrator: roadrunner.Integrator = rr.integrator
+        integrator.setValue("absolute_tolerance", ABSOLUTE_TOLERANCE)
+        integrator.setValue("relative_tolerance", RELATIVE_TOLERANCE)
+        species_ids = list(model.getFloatingSpeciesIds()) + list(model.getBoundarySpeciesIds())
+        rr.selections = ["time"] + [f"[{sid}]" for sid in species_ids]
+        columns = species_columns(rr.selections[1:])
+        species = set(species_ids)
+        keys = [f"init([{pid}])" if pid in species else f"init({pid})" for pid in parameter_ids]
+        out = allocate(out, (values.shape[0], STEPS + 1, len(columns)))
+
+    s = None
+    for k, row in enumerate(values):
+        with timer.phase("setup"):
+            for key, value in zip(keys, row):
+                rr.setValue(key, value)
+            # resets parameters to their initial values, recomputes initial assignments
+            rr.resetAll()
+        with timer.phase("solve"):
+            s = rr.simulate(start=START, end=END, steps=STEPS)
+        with timer.phase("extract"):
+            out[k] = s[:, 1:]
+
+    time_vector = np.array(s[:, 0]) if s is not None else np.linspace(START, END, STEPS + 1)
+    return EnsembleResult(
+        time=time_vector, data=out, columns=columns, load_time=timer.load_time,
+        simulate_time=timer.simulate_time, wall_time=time.perf_counter() - start_time,
+    )
+
+
+def run_ensemble_copasi(path: Path, parameter_ids: List[str], values: np.ndarray,
+                        out: Optional[np.ndarray] = None) -> EnsembleResult:
+    """Ensemble with a single compiled COPASI model.
+
+    The time course task is initialized once; for every run the initial
+    values are changed and the simulation starts from the initial state.
+    Species values are set as initial concentrations.
+    """
+    import COPASI
+    from basico import load_model_from_string, remove_datamodel
+    from code.comparisonpy.copasi_example import _setup_time_course
+
+    start_time = time.perf_counter()
+    values = _check_matrix(parameter_ids, values)
+    timer = PhaseTimer()
+    with timer.phase("read"):
+        sbml_str = read_sbml(path)
+    # SBML import includes the model compilation
+    with timer.phase("parse"):
+        dm: COPASI.CDataModel = load_model_from_string(sbml_str)
+    if dm is None:
+        raise RuntimeError(f"COPASI model could not be loaded: '{path_model_id(path)}'")
+    try:
+        with timer.phase("compile"):
+            dm.getModel().compileIfNecessary()
+
+        with timer.phase("setup"):
+            task = _setup_time_course(dm, args=(), kwargs=dict(
+                start_time=START, duration=END - START, step_number=STEPS,
+                a_tol=ABSOLUTE_TOLERANCE, r_tol=RELATIVE_TOLERANCE,
+            ))
+            model: COPASI.CModel = dm.getModel()
+            metabolites = [model.getMetabolite(k) for k in range(model.getNumMetabs())]
+            entities = {m.getSBMLId(): m for m in metabolites}
+            for k in range(model.getNumModelValues()):
+                model_value = model.getModelValue(k)
+                entities[model_value.getSBMLId()] = model_value
+            missing = [pid for pid in parameter_ids if pid not in entities]
+            if missing:
+                raise ValueError(
+                    f"Parameters not in COPASI model '{path_model_id(path)}': {missing}"
+                )
+            objects = [entities[pid] for pid in parameter_ids]
+            is_species = [isinstance(obj, COPASI.CMetab) for obj in objects]
+
+        species_ids = copasi_species_ids(model)
+        indices = None
+        columns = []
+        time_vector = np.linspace(START, END, STEPS + 1)
+        for k, row in enumerate(values):
+            with timer.phase("setup"):
+                for obj, species, value in zip(objects, is_species, row):
+                    if species:
+                        obj.setInitialConcentration(float(value))
+                        model.updateInitialValues(obj.getInitialConcentrationReference())
+                    else:
+                        obj.setInitialValue(float(value))
+                        model.updateInitialValues(obj.getInitialValueReference())
+            with timer.phase("solve"):
+                if not task.processRaw(True):
+                    raise RuntimeError("Error while running the simulation: " +
+                                       COPASI.CCopasiMessage.getLastMessage().getText())
+            with timer.phase("extract"):
+                ts: COPASI.CTimeSeries = task.getTimeSeries()
+                if indices is None:
+                    titles = [ts.getTitle(i) for i in range(ts.getNumVariables())]
+                    indices = [i for i, title in enumerate(titles) if title in species_ids]
+                    columns = species_columns([titles[i] for i in indices], species_ids)
+                    out = allocate(out, (values.shape[0], ts.getRecordedSteps(), len(indices)))
+                    time_vector = extract_copasi(ts, indices=[0]).data[:, 0]
+                extract_copasi(ts, indices=indices, out=out[k])
+    finally:
+        remove_datamodel(dm)
+
+    if out is None:
+        out = np.empty((0, STEPS + 1, 0))
+    return EnsembleResult(
+        time=time_vector, data=out, columns=columns, load_time=timer.load_time,
+        simulate_time=timer.simulate_time, wall_time=time.perf_counter() - start_time,
+    )
+
+
+ENSEMBLE_SIMULATORS = {
+    "roadrunner": run_ensemble_roadrunner,
+    "copasi": run_ensemble_copasi,
+}
+
+
+def ensemble_task(simulator: str, path: Path, parameter_ids: List[str], values: np.ndarray,
+                  chunk_path: Path) -> pd.DataFrame:
+    """Simulate a chunk of the runs in a worker process.
+
+    The trajectories are stored in chunk_path (.npz), the timings are returned.
+    """
+    result = ENSEMBLE_SIMULATORS[simulator](path, parameter_ids, values)
+    np.savez(chunk_path, data=result.data, time=result.time, columns=np.array(result.columns))
+    return pd.DataFrame([{
+        "chunk_path": str(chunk_path),
+        "load_time": result.load_time,
+        "simulate_time": result.simulate_time,
+    }])
+
+
+def run_ensemble(simulator: str, path: Path, parameter_ids: List[str], values: np.ndarray,
+                 n_workers: Optional[int] = None, pin_cpus: bool = True) -> EnsembleResult:
+    """Run the ensemble for the model with the simulator.
+
+    In the parallel mode (n_workers is not None) the runs are split in
+    n_workers chunks, every worker compiles the model once and simulates its
+    chunk. The chunks are copied in the preallocated result array. The
+    simulator backend is imported in the worker startup.
+    """
+    values = _check_matrix(parameter_ids, values)
+    if n_workers is None:
+        return ENSEMBLE_SIMULATORS[simulator](path, parameter_ids, values)
+
+    start_time = time.perf_counter()
+    chunks = [c for c in np.array_split(np.arange(values.shape[0]), n_workers) if len(c)]
+    tmp_dir = Path(tempfile.mkdtemp(prefix="ensemble_"))
+    try:
+        tasks = [
+            (simulator, path, parameter_ids, values[chunk], tmp_dir / f"chunk_{k}.npz")
+            for k, chunk in enumerate(chunks)
+        ]
+        dfs = run_tasks(ensemble_task, tasks, n_workers=n_workers, pin_cpus=pin_cpus,
+                        initializer=import_modules, initargs=(SIMULATOR_MODULES[simulator],))
+        out, time_vector, columns = None, None, []
+        for chunk, df in zip(chunks, dfs):
+            with np.load(df.chunk_path.iloc[0]) as npz:
+                if out is None:
+                    time_vector = npz["time"]
+                    columns = [str(c) for c in npz["columns"]]
+                    out = np.empty((values.shape[0],) + npz["data"].shape[1:], dtype=np.float64)
+                out[chunk] = npz["data"]
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    df = pd.concat(dfs)
+    return EnsembleResult(
+        time=time_vector, data=out, columns=columns,
+        load_time=df.load_time.max(), simulate_time=df.simulate_time.sum(),
+        wall_time=time.perf_counter() - start_time,
+    )
+
+
+def run_ensembles(simulators: List[str] = ("roadrunner", "copasi"),
+                  model_paths: Optional[List[Path]] = None,
+                  n_runs: int = N_RUNS, rel_sd: float = REL_SD, seed: Optional[int] = SEED,
+                  n_workers: Optional[int] = None, pin_cpus: bool = True,
+                  query: Optional[str] = None, models: Optional[List[str]] = None,
+                  results_dir: Path = RESULTS_DIR) -> pd.DataFrame:
+    """Benchmark the ensemble throughput of the simulators for all models.
+
+    Every simulator runs the identical parameter matrix of a model. The
+    throughput is stored in `<results_dir>/ode/ensemble_throughput.tsv`.
+
+    :param model_paths: SBML files, the BioModels of the query if None
+    :param query: catalog query for selecting models, all models if None
+    :param models: BioModels ids, all models (of the query) if None
+    """
+    if model_paths is None:
+        build_catalog(["biomodels"])
+        model_paths = catalog_model_paths("biomodels", query=query, model_ids=models)
+    results: List[Dict] = []
+    unsupported = {simulator: unsupported_models(simulator) for simulator in simulators}
+    for k, path in enumerate(model_paths):
+        model_id = path_model_id(path)
+        parameter_ids, values = sample_parameter_matrix(path, n_runs=n_runs, rel_sd=rel_sd,
+                                                        seed=seed)
+        for simulator in simulators:
+            res = {"model": model_id, "simulator": simulator, "n_runs": n_runs,
+                   "n_parameters": len(parameter_ids), "n_workers": n_workers}
+            if model_id in unsupported[simulator]:
+                results.append({**res, "status": "skipped"})
+                continue
+            try:
+                result = run_ensemble(simulator, path, parameter_ids, values,
+                                      n_workers=n_workers, pin_cpus=pin_cpus)
+                res.update({
+                    "status": "success",
+                    "n_species": len(result.columns),
+                    "load_time": result.load_time,
+                    "simulate_time": result.simulate_time,
+                    "wall_time": result.wall_time,
+                    "sims_per_second": result.sims_per_second,
+                    "sims_per_second_core": result.sims_per_second_core,
+                })
+            except (RuntimeError, ValueError) as err:
+                print(f"ERROR in '{model_id}' ({simulator})", err)
+                res["status"] = "failure"
+            results.append(res)
+            print("[{}/{}]".format(k, len(model_paths)), res)
+
+    df = pd.DataFrame(results)
+    (results_dir / "ode").mkdir(parents=True, exist_ok=True)
+    df.to_csv(results_dir / "ode" / "ensemble_throughput.tsv", sep="\t", index=False)
+    return df
+
+
+if __name__ == "__main__":
+    run_ensembles(n_runs=N_RUNS)
@@ -0,0 +1,142 @@
+"""
+Extraction of simulation results as NumPy arrays.
+
+The results of the simulators are extracted as a single contiguous float64
+array (timepoints x columns) with the column names; the time column is named
+'time'. DataFrames are only created on demand when the results are written
+(`ResultArray.to_frame`), so the 'extract' phase of the timings contains only
+the copy out of the simulator.
+
+roadrunner returns the result as NamedArray (ndarray subclass), which is
+viewed without copy. The COPASI bindings only provide element access to the
+time series, the values are written column by column directly into the
+(preallocated) array without intermediate Python lists.
+
+Species columns of all simulators are named by SBML id and contain
+concentrations: roadrunner concentration selections ('[S1]') and the COPASI
+titles (object names) are renamed via `species_columns`.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# title of the time column in COPASI time series
+COPASI_TIME_TITLE = "Time"
+
+
+class ResultArray:
+    """Simulation result as (timepoints x columns) float64 array with column index.
+
+    :param data: contiguous float64 array (timepoints x columns)
+    :param columns: column names, the time column is named 'time'
+    """
+
+    def __init__(self, data: np.ndarray, columns: Sequence[str]):
+        if data.ndim != 2 or data.shape[1] != len(columns):
+            raise ValueError(
+                f"Result array must have shape (timepoints, {len(columns)}), "
+                f"but has shape '{data.shape}'"
+            )
+        self.data = data
+        self.columns: List[str] = [str(c) for c in columns]
+        self.index: Dict[str, int] = {c: k for k, c in enumerate(self.columns)}
+
+    @property
+    def time(self) -> Optional[np.ndarray]:
+        """Time vector (view), None if the result has no time column."""
+        k = self.index.get("time")
+        return self.data[:, k] if k is not None else None
+
+    def column(self, name: str) -> np.ndarray:
+        """Values of the column (view)."""
+        return self.data[:, self.index[name]]
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame of the result (copies the data)."""
+        return pd.DataFrame(self.data, columns=self.columns, copy=True)
+
+
+def copasi_species_ids(model) -> Dict[str, str]:
+    """SBML ids of the species of the COPASI model by time series title.
+
+    The titles are the object names or, for names which are not unique, the
+    compartment qualified display names ('A{cytosol}'), both are mapped.
+
+    :param model: COPASI model (`dm.getModel()`)
+    """
+    ids = {}
+    for k in range(model.getNumMetabs()):
+        metabolite = model.getMetabolite(k)
+        sid = metabolite.getSBMLId()
+        if sid:
+            ids[metabolite.getObjectName()] = sid
+            ids[metabolite.getObjectDisplayName()] = sid
+    return ids
+
+
+def species_columns(columns: Sequence[str], ids: Optional[Dict[str, str]] = None) -> List[str]:
+    """Column names as SBML ids.
+
+    Concentration selections of roadrunner ('[S1]') are unwrapped, other
+    columns are renamed via ids (see `copasi_species_ids`) if given.
+    """
+    columns = [c[1:-1] if c.startswith("[") and c.endswith("]") else c for c in columns]
+    if ids:
+        columns = [ids.get(c, c) for c in columns]
+    return columns
+
+
+def allocate(out: Optional[np.ndarray], shape: Tuple[int, ...]) -> np.ndarray:
+    """Preallocate a float64 result array or check the given array."""
+    if out is None:
+        return np.empty(shape, dtype=np.float64)
+    if out.shape != tuple(shape):
+        raise ValueError(f"Result array must have shape '{tuple(shape)}', but has shape '{out.shape}'")
+    if out.dtype != np.float64:
+        raise ValueError(f"Result array must have dtype 'float64', but has dtype '{out.dtype}'")
+    return out
+
+
+def extract_roadrunner(s: np.ndarray, out: Optional[np.ndarray] = None) -> ResultArray:
+    """Result of `rr.simulate` as result array.
+
+    Without out the NamedArray is viewed without copy (the result stays valid
+    until the array is released), otherwise it is copied into out.
+
+    :param s: NamedArray returned by `rr.simulate` (with 'time' selection)
+    :param out: preallocated (timepoints x columns) array
+    """
+    columns = list(s.colnames)
+    if out is None:
+        data = np.ascontiguousarray(s, dtype=np.float64)
+    else:
+        data = allocate(out, s.shape)
+        np.copyto(data, s)
+    return ResultArray(data, columns=columns)
+
+
+def extract_copasi(ts, indices: Optional[Sequence[int]] = None,
+                   use_concentrations: bool = True,
+                   out: Optional[np.ndarray] = None) -> ResultArray:
+    """COPASI time series as result array.
+
+    :param ts: time series of the time course task (`task.getTimeSeries()`)
+    :param indices: indices of the time series variables, all variables
+        (time is variable 0) if None
+    :param use_concentrations: concentrations instead of particle numbers for species
+    :param out: preallocated (timepoints x len(indices)) array
+    """
+    if indices is None:
+        indices = range(ts.getNumVariables())
+    n_steps = ts.getRecordedSteps()
+    titles = [ts.getTitle(i) for i in indices]
+    columns = ["time" if title == COPASI_TIME_TITLE else title for title in titles]
+
+    data = allocate(out, (n_steps, len(titles)))
+    get_data = ts.getConcentrationData if use_concentrations else ts.getData
+    steps = range(n_steps)
+    for j, i in enumerate(indices):
+        data[:, j] = np.fromiter((get_data(step, i) for step in steps),
+                                 dtype=np.float64, count=n_steps)
+    return ResultArray(data, columns=columns)
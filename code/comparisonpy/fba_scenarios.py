@@ -0,0 +1,248 @@
+"""
+Batched FBA scenarios (knockout screens, media variations) on BiGG models.
+
+Every model is loaded once per worker. The scenarios only change bounds,
+which are applied inside `with model:` contexts, i.e. the changes are written
+to the solver problem and reverted after the optimization. The solver
+problem is never rebuilt, so successive LPs are warm-started from the basis
+of the previous solve (optlang keeps the solver instance and its basis).
+
+Single gene and single reaction deletion sweeps are split in chunks which
+run in parallel worker processes. The throughput is reported in LPs per
+second next to the time of the one-shot optimization (`simulate_time`).
+"""
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from code.comparisonpy import RESULTS_DIR
+from code.comparisonpy.catalog import build_catalog, catalog_model_paths
+from code.comparisonpy.fba_simulation import SIMULATOR_MODULES, bigg_model_id
+from code.comparisonpy.model_store import (
+    SOURCE_SBML, build_model_store, load_cobra_model, model_source_path
+)
+from code.comparisonpy.parallel import import_modules, run_tasks
+from code.comparisonpy.timing import PhaseTimer
+
+if TYPE_CHECKING:
+    import cobra
+
+SCENARIO_KINDS = ["reaction", "gene", "medium"]
+N_MEDIA = 1000  # number of random media
+SEED = 42
+
+
+class Scenario:
+    """Bound changes and gene knockouts of a single LP.
+
+    :param name: name of the scenario (e.g. deleted reaction/gene)
+    :param bounds: reaction id -> (lower bound, upper bound)
+    :param genes: ids of knocked out genes
+    """
+
+    def __init__(self, name: str, bounds: Optional[Dict[str, Tuple[float, float]]] = None,
+                 genes: Optional[List[str]] = None):
+        self.name = name
+        self.bounds = bounds if bounds is not None else {}
+        self.genes = genes if genes is not None else []
+
+    def apply(self, model: "cobra.Model"):
+        """Apply the scenario, has to be called within a model context."""
+        for rid, bounds in self.bounds.items():
+            model.reactions.get_by_id(rid).bounds = bounds
+        for gid in self.genes:
+            model.genes.get_by_id(gid).knock_out()
+
+
+def reaction_deletion_scenarios(model: "cobra.Model") -> List[Scenario]:
+    """Single reaction deletions."""
+    return [Scenario(r.id, bounds={r.id: (0.0, 0.0)}) for r in model.reactions]
+
+
+def gene_deletion_scenarios(model: "cobra.Model") -> List[Scenario]:
+    """Single gene deletions."""
+    return [Scenario(g.id, genes=[g.id]) for g in model.genes]
+
+
+def medium_scenarios(model: "cobra.Model", n_media: int = N_MEDIA,
+                     seed: Optional[int] = SEED) -> List[Scenario]:
+    """Random media, the uptake bounds of the exchange reactions are scaled by U(0, 1)."""
+    rng = np.random.default_rng(seed)
+    exchanges = [r for r in model.exchanges if r.lower_bound < 0.0]
+    factors = rng.uniform(0.0, 1.0, size=(n_media, len(exchanges)))
+    return [
+        Scenario(f"medium_{k}", bounds={
+            r.id: (r.lower_bound * f, r.upper_bound) for r, f in zip(exchanges, factors[k])
+        })
+        for k in range(n_media)
+    ]
+
+
+def create_scenarios(model: "cobra.Model", kind: str) -> List[Scenario]:
+    """Scenarios of the given kind for the model."""
+    if kind == "reaction":
+        return reaction_deletion_scenarios(model)
+    elif kind == "gene":
+        return gene_deletion_scenarios(model)
+    elif kind == "medium":
+        return medium_scenarios(model)
+    raise ValueError(f"Unsupported scenario kind '{kind}', use one of {SCENARIO_KINDS}")
+
+
+def optimize_cobrapy(model: "cobra.Model") -> float:
+    """Objective value, NaN if infeasible."""
+    return model.slim_optimize(error_value=np.nan)
+
+
+def optimize_cameo(model: "cobra.Model") -> float:
+    """Objective value, NaN if infeasible."""
+    from cameo import fba
+    from cobra.exceptions import OptimizationError
+
+    try:
+        return fba(model).objective_value
+    except OptimizationError:
+        return np.nan
+
+
+FBA_OPTIMIZE: Dict[str, Callable[["cobra.Model"], float]] = {
+    "cobrapy": optimize_cobrapy,
+    "cameo": optimize_cameo,
+}
+
+
+def scenario_task(simulator: str, source_path: Path, scenarios: List[Scenario]) -> pd.DataFrame:
+    """Optimize all scenarios with a single loaded model.
+
+    :return: objective value per scenario with the load time, the time of the
+        one-shot optimization (simulate_time) and of all scenarios
+    """
+    optimize = FBA_OPTIMIZE[simulator]
+    timer = PhaseTimer()
+    model = load_cobra_model(source_path, timer=timer)
+
+    # one-shot optimization of the unchanged model
+    with timer.phase("solve"):
+        optimize(model)
+
+    objective_values = np.empty(len(scenarios))
+    start_time = time.perf_counter_ns()
+    for k, scenario in enumerate(scenarios):
+        with model:
+            scenario.apply(model)
+            objective_values[k] = optimize(model)
+    scenario_time = (time.perf_counter_ns() - start_time) * 1E-9
+
+    return pd.DataFrame({
+        "scenario": [scenario.name for scenario in scenarios],
+        "objective_value": objective_values,
+        "load_time": timer.load_time,
+        "simulate_time": timer.simulate_time,
+        "scenario_time": scenario_time,
+    })
+
+
+def run_scenarios(simulator: str, path: Path, kind: str, source: str = SOURCE_SBML,
+                  n_workers: Optional[int] = None,
+                  pin_cpus: bool = True) -> Tuple[pd.DataFrame, Dict]:
+    """Run all scenarios of the kind for the model.
+
+    In the parallel mode (n_workers is not None) the scenarios are split in
+    n_workers chunks, every worker loads the model once. The simulator
+    backend is imported in the worker startup.
+
+    :return: objective values per scenario, benchmark summary
+    """
+    source_path = model_source_path(path, source=source)
+    scenarios = create_scenarios(load_cobra_model(source_path), kind=kind)
+
+    start_time = time.perf_counter()
+    if n_workers is None:
+        df = scenario_task(simulator, source_path, scenarios)
+        dfs = [df]
+    else:
+        chunks = [c for c in np.array_split(np.arange(len(scenarios)), n_workers) if len(c)]
+        tasks = [
+            (simulator, source_path, [scenarios[i] for i in chunk]) for chunk in chunks
+        ]
+        dfs = run_tasks(scenario_task, tasks, n_workers=n_workers, pin_cpus=pin_cpus,
+                        initializer=import_modules, initargs=(SIMULATOR_MODULES[simulator],))
+        df = pd.concat(dfs)
+    wall_time = time.perf_counter() - start_time
+
+    # timings are constant per chunk
+    chunk_timings = pd.DataFrame([d.iloc[0][["load_time", "simulate_time", "scenario_time"]]
+                                  for d in dfs if len(d)])
+    n_lps = len(scenarios)
+    summary = {
+        "model": bigg_model_id(path),
+        "simulator": simulator,
+        "kind": kind,
+        "status": "success",
+        "n_lps": n_lps,
+        "n_workers": n_workers,
+        "n_infeasible": int(df.objective_value.isna().sum()),
+        "load_time": chunk_timings.load_time.max(),
+        "simulate_time": chunk_timings.simulate_time.median(),
+        "scenario_time": chunk_timings.scenario_time.sum(),
+        "wall_time": wall_time,
+        "lps_per_second": n_lps / wall_time,
+        "lps_per_second_core": n_lps / chunk_timings.scenario_time.sum(),
+    }
+    return df[["scenario", "objective_value"]], summary
+
+
+def optimize_scenarios(kind: str = "reaction", simulators: List[str] = ("cobrapy", "cameo"),
+                       model_paths: Optional[List[Path]] = None, source: str = SOURCE_SBML,
+                       n_workers: Optional[int] = None, pin_cpus: bool = True,
+                       query: Optional[str] = None, models: Optional[List[str]] = None,
+                       results_dir: Path = RESULTS_DIR) -> pd.DataFrame:
+    """Benchmark the scenario throughput for all models and simulators.
+
+    The summary is stored in `<results_dir>/fba/scenarios_<kind>.tsv`.
+
+    :param model_paths: SBML files, the BiGG models of the query if None
+    :param query: catalog query for selecting models, all models if None
+    :param models: BiGG model ids, all models (of the query) if None
+
+    Models which cannot be loaded or optimized are stored with status
+    'failure', the sweep continues with the next model.
+    """
+    from cobra.exceptions import OptimizationError
+    from cobra.io.sbml import CobraSBMLError
+
+    if model_paths is None:
+        build_catalog(["bigg"])
+        model_paths = catalog_model_paths("bigg", query=query, model_ids=models)
+    if source != SOURCE_SBML:
+        # build model store once before the benchmark
+        build_model_store(model_paths)
+
+    results = []
+    for k, path in enumerate(model_paths):
+        for simulator in simulators:
+            try:
+                _, summary = run_scenarios(simulator, path, kind=kind, source=source,
+                                           n_workers=n_workers, pin_cpus=pin_cpus)
+            except (RuntimeError, ValueError, OSError, CobraSBMLError,
+                    OptimizationError) as err:
+                print(f"ERROR in '{bigg_model_id(path)}' ({simulator})", err)
+                summary = {
+                    "model": bigg_model_id(path), "simulator": simulator, "kind": kind,
+                    "status": "failure", "n_workers": n_workers,
+                }
+            results.append(summary)
+            print("[{}/{}]".format(k, len(model_paths)), summary)
+
+    df = pd.DataFrame(results)
+    (results_dir / "fba").mkdir(parents=True, exist_ok=True)
+    df.to_csv(results_dir / "fba" / f"scenarios_{kind}.tsv", sep="\t", index=False)
+    return df
+
+
+if __name__ == "__main__":
+    for kind in SCENARIO_KINDS:
+        optimize_scenarios(kind=kind)
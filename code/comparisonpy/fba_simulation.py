@@ -1,100 +1,563 @@
 """
 Script for running FBA on all BiGG models.
 """
-import os
+import math
 from pathlib import Path
-from typing import List
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
 
-import cobra
-import numpy as np
 import pandas as pd
-from cobra.io.sbml import read_sbml_model
-from cameo import fba
-from cobra.util.solver import linear_reaction_coefficients
 
+from code.comparisonpy import N_REPEAT, RESULTS_DIR, MODE_COLD, BENCHMARK_MODES
+from code.comparisonpy.adaptive import SUMMARY_COLUMNS, AdaptiveSettings, RepeatController
+from code.comparisonpy.catalog import build_catalog, catalog_model_paths
+from code.comparisonpy.ledger import LEDGER_PATH, RunLedger
+from code.comparisonpy.memory import MEMORY_COLUMNS, MemoryTracker
+from code.comparisonpy.model_store import (
+    SOURCE_SBML, SOURCE_STORE_SBML, build_model_store, load_cobra_model, model_source_path
+)
+from code.comparisonpy.parallel import import_modules, run_tasks
+from code.comparisonpy.regression import VERSIONS_COLUMN, package_versions, versions_value
+from code.comparisonpy.solvers import check_solvers, solver_iterations, solver_name
+from code.comparisonpy.timing import PHASE_COLUMNS, PhaseTimer
 
-from code.comparisonpy import N_REPEAT, RESULTS_DIR, BIGG_MODEL_PATHS
-import time
+if TYPE_CHECKING:
+    import cobra
 
+TIMEOUT = 600.0  # [s] wall-clock timeout per model task (all simulators) in parallel mode
+
+RESULT_COLUMNS = (
+    "model", "objective_value", "load_time", "simulate_time", "repeat", "mode", "source",
+    "solver", "status", "iterations",
+) + PHASE_COLUMNS + MEMORY_COLUMNS + SUMMARY_COLUMNS
+
+# backend modules of the simulators, only imported if the simulator is used
+SIMULATOR_MODULES = {
+    "cobrapy": ["cobra"],
+    "cameo": ["cobra", "cameo"],
+    "sbscl": ["code.comparisonpy.sbscl"],
+    "sbscl_cold": ["code.comparisonpy.sbscl"],
+}
+
+
+def bigg_model_id(path: Path) -> str:
+    """Model id from the BiGG model path."""
+    return path.name.split(".")[0]
+
+
+def _optimize_models(model_paths: List[Path], optimize: Callable[["cobra.Model", PhaseTimer], float],
+                     simulator: str, n_repeat: int, mode: str, source: str,
+                     adaptive: Optional[AdaptiveSettings] = None,
+                     track_memory: bool = False,
+                     ledger: Optional[RunLedger] = None,
+                     solver: Optional[str] = None) -> pd.DataFrame:
+    """FBA optimization for all given models with the given optimize function.
+
+    In the 'cold' mode the model is loaded for every repeat, in the 'warm'
+    mode the model is loaded once and only the optimization is repeated. The
+    load_time is only available for repeats which loaded the model.
+
+    The load is timed in the phases 'read' and 'parse' (including the
+    creation of the solver problem), the optimize function has to time the
+    phases 'solve' and 'extract' with the given timer.
+
+    The model is loaded from the given model source, i.e. the original SBML
+    or the decompressed SBML/pickled model from the model store. With a
+    solver the solver problem is created for the solver (part of 'parse'),
+    otherwise the default solver is used. The solver, status and iteration
+    count are stored for every optimization.
+
+    With adaptive settings n_repeat is the minimal number of repeats, which
+    are continued until the CI of the median times is narrow enough. The
+    number of samples and the CIs are stored for every model.
+
+    With track_memory the peak RSS and tracemalloc peak of the load and
+    optimization are recorded (slows down the timings).
+
+    With a ledger every repeat is committed to the ledger when finished, and
+    models of an interrupted sweep continue with the next repeat (loading the
+    model again in warm mode).
+
+    Repeats in which the model cannot be loaded or optimized are stored with
+    status 'failure', the sweep continues with the next repeat.
+    """
+    from cobra.exceptions import OptimizationError
+    from cobra.io.sbml import CobraSBMLError
+
+    if mode not in BENCHMARK_MODES:
+        raise ValueError(f"Unsupported benchmark mode '{mode}', use one of {BENCHMARK_MODES}")
 
-def optimize_models_cobrapy(model_paths: List[Path]) -> pd.DataFrame:
-    """FBA optimization for all given models."""
     results = []
     n_models = len(model_paths)
     for k, path in enumerate(model_paths):
-        # load model
-        start_time = time.time()
-        model = read_sbml_model(str(path))
-        load_time = time.time() - start_time  # [s]
+        # resolve (and build) store entry outside of timings
+        source_path = model_source_path(path, source=source)
+        model_id = bigg_model_id(path)
+        model = None
+        model_results = []
+        repeats = RepeatController(
+            n_repeat, adaptive=adaptive,
+            keys=["load_time", "simulate_time"] if mode == MODE_COLD else ["simulate_time"],
+        )
+        if ledger is not None:
+            repeats.restore(ledger.repeats(model_id, simulator))
+        for repeat in repeats:
+            timer = PhaseTimer()
+            memory = MemoryTracker(enabled=track_memory)
+            try:
+                if mode == MODE_COLD or model is None:
+                    # load model (release previous model first)
+                    model = None
+                    with memory.measure("load"):
+                        model = load_cobra_model(source_path, timer=timer)
+                        if solver is not None:
+                            with timer.phase("parse"):
+                                model.solver = solver
+
+                # run optimization (does not change the model, no reset required)
+                with memory.measure("simulate"):
+                    objective_value = optimize(model, timer)
+                simulate_time = timer.simulate_time  # [s]
+                status = model.solver.status
+                solver_info = (solver_name(model), solver_iterations(model))
+            except (RuntimeError, ValueError, OSError, CobraSBMLError,
+                    OptimizationError) as err:
+                print(f"ERROR in '{model_id}'", err)
+                # load the model again in the next repeat
+                model = None
+                objective_value, simulate_time = math.nan, math.nan
+                status = "failure"
+                solver_info = (solver, math.nan)
+
+            load_time = timer.load_time  # [s]
+            repeats.add(load_time=load_time, simulate_time=simulate_time)
 
-        # run optimization
-        start_time = time.time()
-        solution = model.optimize()
-        simulate_time = time.time() - start_time  # [s]
+            res = (model_id, objective_value, load_time, simulate_time, repeat, mode, source,
+                   solver_info[0], status, solver_info[1])
+            row = res + timer.row() + memory.row()
+            model_results.append(row)
+            if ledger is not None:
+                # summary columns are added on completion of the model
+                ledger.add(model_id, simulator, repeat, dict(zip(RESULT_COLUMNS, row)))
 
-        objective_value = solution.objective_value
-        filename = path.name
-        model = filename.split(".")[0]
-        res = (model, objective_value, load_time, simulate_time)
-        results.append(res)
+            print("[{}/{}]".format(k, n_models), res)
 
-        print("[{}/{}]".format(k, n_models), res)
+        summary = repeats.summary()
+        results.extend(res + summary for res in model_results)
+        if ledger is not None:
+            ledger.complete(model_id, simulator, dict(zip(SUMMARY_COLUMNS, summary)))
 
-    return pd.DataFrame(data=results, columns=("model", "objective_value", "load_time", "simulate_time"))
+    return pd.DataFrame(data=results, columns=RESULT_COLUMNS)
 
 
-def optimize_models_cameo(model_paths: List[Path]) -> pd.DataFrame:
+def optimize_models_cobrapy(model_paths: List[Path], n_repeat: int = 1,
+                            mode: str = MODE_COLD, source: str = SOURCE_SBML,
+                            adaptive: Optional[AdaptiveSettings] = None,
+                            track_memory: bool = False,
+                            ledger: Optional[RunLedger] = None,
+                            solver: Optional[str] = None) -> pd.DataFrame:
     """FBA optimization for all given models."""
+    from cobra.core.solution import get_solution
+
+    def optimize(model: "cobra.Model", timer: PhaseTimer) -> float:
+        # split of model.optimize() in solve and extract
+        with timer.phase("solve"):
+            model.slim_optimize()
+        with timer.phase("extract"):
+            solution = get_solution(model)
+        return solution.objective_value
+
+    return _optimize_models(model_paths, optimize=optimize, simulator="cobrapy",
+                            n_repeat=n_repeat, mode=mode, source=source, adaptive=adaptive,
+                            track_memory=track_memory, ledger=ledger, solver=solver)
+
+
+def optimize_models_cameo(model_paths: List[Path], n_repeat: int = 1,
+                          mode: str = MODE_COLD, source: str = SOURCE_SBML,
+                          adaptive: Optional[AdaptiveSettings] = None,
+                          track_memory: bool = False,
+                          ledger: Optional[RunLedger] = None,
+                          solver: Optional[str] = None) -> pd.DataFrame:
+    """FBA optimization for all given models."""
+    from cameo import fba
+
+    def optimize(model: "cobra.Model", timer: PhaseTimer) -> float:
+        # cameo extracts the fluxes within fba
+        with timer.phase("solve"):
+            result = fba(model)
+        with timer.phase("extract"):
+            objective_value = result.objective_value
+        return objective_value
+
+    return _optimize_models(model_paths, optimize=optimize, simulator="cameo",
+                            n_repeat=n_repeat, mode=mode, source=source, adaptive=adaptive,
+                            track_memory=track_memory, ledger=ledger, solver=solver)
+
+
+def _optimize_models_sbscl(model_paths: List[Path], simulator: str, fresh_jvm: bool,
+                          warmup: int, n_repeat: int, mode: str, source: str,
+                          adaptive: Optional[AdaptiveSettings] = None,
+                          ledger: Optional[RunLedger] = None,
+                          solver: Optional[str] = None) -> pd.DataFrame:
+    """FBA optimization for all given models with the SBSCL harness.
+
+    With fresh_jvm every repeat runs in a new JVM, otherwise all models run
+    in a single long-lived JVM and the repeats of every model follow warmup
+    unrecorded optimizations of the model. A JVM which died is restarted.
+    """
+    from code.comparisonpy.sbscl import SbsclHarness
+
+    if mode not in BENCHMARK_MODES:
+        raise ValueError(f"Unsupported benchmark mode '{mode}', use one of {BENCHMARK_MODES}")
+    if source not in [SOURCE_SBML, SOURCE_STORE_SBML]:
+        raise ValueError(f"Unsupported model source '{source}' for '{simulator}', "
+                         f"use one of {[SOURCE_SBML, SOURCE_STORE_SBML]}")
+    if solver is not None:
+        raise ValueError(f"LP backends are not supported by '{simulator}', use solver None")
+
+    harness = None
     results = []
     n_models = len(model_paths)
-    for k, path in enumerate(model_paths):
-        # load model
-        start_time = time.time()
-        model = read_sbml_model(str(path))
-        load_time = time.time() - start_time  # [s]
+    try:
+        for k, path in enumerate(model_paths):
+            source_path = model_source_path(path, source=source)
+            model_id = bigg_model_id(path)
+            loaded = False
+            warmed_up = fresh_jvm or warmup == 0
+            model_results = []
+            repeats = RepeatController(
+                n_repeat, adaptive=adaptive,
+                keys=["load_time", "simulate_time"] if mode == MODE_COLD else ["simulate_time"],
+            )
+            if ledger is not None:
+                repeats.restore(ledger.repeats(model_id, simulator))
+            for repeat in repeats:
+                timer = PhaseTimer()
+                # the memory of the JVM is not tracked
+                memory = MemoryTracker(enabled=False)
+                try:
+                    if fresh_jvm or harness is None or not harness.alive:
+                        if harness is not None:
+                            harness.close()
+                        harness = SbsclHarness()
+                        # new JVM: load and warm up the model again
+                        loaded = False
+                        warmed_up = fresh_jvm or warmup == 0
+                    if not warmed_up:
+                        harness.warmup(source_path, n_runs=warmup)
+                        warmed_up = True
+                    status, objective_value = harness.optimize(
+                        source_path, reload=mode == MODE_COLD or not loaded, timer=timer
+                    )
+                    loaded = True
+                except RuntimeError as err:
+                    print(f"ERROR in '{model_id}'", err)
+                    loaded = False
+                    status, objective_value = "failure", math.nan
+                finally:
+                    if fresh_jvm and harness is not None:
+                        harness.close()
+                        harness = None
+
+                load_time = timer.load_time  # [s]
+                simulate_time = timer.simulate_time  # [s]
+                repeats.add(load_time=load_time, simulate_time=simulate_time)
+                res = (model_id, objective_value, load_time, simulate_time, repeat, mode, source,
+                       None, status, math.nan)
+                row = res + timer.row() + memory.row()
+                model_results.append(row)
+                if ledger is not None:
+                    ledger.add(model_id, simulator, repeat, dict(zip(RESULT_COLUMNS, row)))
+
+                print("[{}/{}]".format(k, n_models), res)
+
+            summary = repeats.summary()
+            results.extend(res + summary for res in model_results)
+            if ledger is not None:
+                ledger.complete(model_id, simulator, dict(zip(SUMMARY_COLUMNS, summary)))
+    finally:
+        if harness is not None:
+            harness.close()
 
-        # run optimization
-        start_time = time.time()
-        result = fba(model)
-        simulate_time = time.time() - start_time  # [s]
-        objective_value = result.objective_value
-        filename = path.name
-        model = filename.split(".")[0]
-        res = (model, objective_value, load_time, simulate_time)
-        results.append(res)
+    return pd.DataFrame(data=results, columns=RESULT_COLUMNS)
 
-        print("[{}/{}]".format(k, n_models), res)
 
-    return pd.DataFrame(data=results, columns=("model", "objective_value", "load_time", "simulate_time"))
+def optimize_models_sbscl(model_paths: List[Path], n_repeat: int = 1,
+                          mode: str = MODE_COLD, source: str = SOURCE_SBML,
+                          adaptive: Optional[AdaptiveSettings] = None,
+                          track_memory: bool = False,
+                          ledger: Optional[RunLedger] = None,
+                          solver: Optional[str] = None,
+                          warmup: Optional[int] = None) -> pd.DataFrame:
+    """FBA optimization for all given models with SBSCL in a warm JVM.
 
+    All models run in a single long-lived JVM (see `sbscl`). Before the
+    repeats of a model the model is optimized warmup times (default
+    `sbscl.WARMUP_RUNS`) without recording, so the JIT compilation is not
+    part of the timings.
 
-def optimize_models(n_repeat: int=N_REPEAT):
-    """Optimize the models repeatidly."""
-    model_paths = BIGG_MODEL_PATHS
+    The phases are timed in the JVM: 'read' (file read and decompression),
+    'parse' (JSBML and creation of the LP problem), 'solve' and 'extract'
+    (objective value). Only the SBML sources are supported and the LP
+    backend of SBSCL is used (solver must be None). The memory of the JVM is
+    not tracked (track_memory is ignored).
+    """
+    from code.comparisonpy.sbscl import WARMUP_RUNS
+
+    return _optimize_models_sbscl(
+        model_paths, simulator="sbscl", fresh_jvm=False,
+        warmup=warmup if warmup is not None else WARMUP_RUNS, n_repeat=n_repeat, mode=mode,
+        source=source, adaptive=adaptive, ledger=ledger, solver=solver,
+    )
+
+
+def optimize_models_sbscl_cold(model_paths: List[Path], n_repeat: int = 1,
+                               mode: str = MODE_COLD, source: str = SOURCE_SBML,
+                               adaptive: Optional[AdaptiveSettings] = None,
+                               track_memory: bool = False,
+                               ledger: Optional[RunLedger] = None,
+                               solver: Optional[str] = None) -> pd.DataFrame:
+    """FBA optimization for all given models with SBSCL in a cold JVM.
+
+    Every repeat runs in a fresh JVM without warm-up, i.e. the timings include
+    class loading and JIT compilation (the JVM startup is not part of the load
+    time). See `optimize_models_sbscl` for the phases.
+    """
+    return _optimize_models_sbscl(
+        model_paths, simulator="sbscl_cold", fresh_jvm=True, warmup=0, n_repeat=n_repeat,
+        mode=mode, source=source, adaptive=adaptive, ledger=ledger, solver=solver,
+    )
+
+
+FBA_SIMULATORS = {
+    "cobrapy": optimize_models_cobrapy,
+    "cameo": optimize_models_cameo,
+    "sbscl": optimize_models_sbscl,
+    "sbscl_cold": optimize_models_sbscl_cold,
+}
+# simulators of the default benchmark, the SBSCL simulators require the Java harness
+DEFAULT_SIMULATORS = ["cobrapy", "cameo"]
+
+
+def simulator_modules(simulators: List[str]) -> List[str]:
+    """Backend modules of the simulators."""
+    return sorted({module for simulator in simulators for module in SIMULATOR_MODULES[simulator]})
+
+
+def optimize_model_repeats(simulators: List[str], path: Path, n_repeat: int,
+                           mode: str = MODE_COLD, source: str = SOURCE_SBML,
+                           adaptive: Optional[AdaptiveSettings] = None,
+                           track_memory: bool = False,
+                           ledger: Optional[RunLedger] = None,
+                           solver: Optional[str] = None) -> pd.DataFrame:
+    """Optimize a single model repeatedly with the given simulators.
+
+    Used as task in the parallel mode, so that all repeats of a model run
+    in the same worker process.
+    """
+    dfs = []
+    for simulator in simulators:
+        df = FBA_SIMULATORS[simulator](
+            [path], n_repeat=n_repeat, mode=mode, source=source, adaptive=adaptive,
+            track_memory=track_memory, ledger=ledger, solver=solver,
+        )
+        df["simulator"] = simulator
+        dfs.append(df)
+    return pd.concat(dfs)
+
+
+def failed_model_repeats(task: tuple, status: str) -> pd.DataFrame:
+    """Results for a model task which timed out or crashed the worker.
+
+    Results are only created for the repeats which were not finished before
+    the timeout or crash (all repeats without ledger). They are committed to
+    the ledger of the task and the simulators of the task which were not
+    completed are marked as completed.
+    """
+    simulators, path, n_repeat, mode, source, _, _, ledger, solver = task
+    model_id = bigg_model_id(path)
+    dfs = []
+    for simulator in simulators:
+        missing = list(range(1, n_repeat + 1))
+        n_finished = 0
+        if ledger is not None:
+            if ledger.is_complete(model_id, simulator):
+                continue
+            missing = ledger.missing_repeats(model_id, simulator, n_repeat)
+            n_finished = len(ledger.repeats(model_id, simulator))
+        df = pd.DataFrame({
+            "model": model_id,
+            "objective_value": math.nan,
+            "load_time": math.nan,
+            "simulate_time": math.nan,
+            "repeat": missing,
+            "mode": mode,
+            "source": source,
+            "solver": solver,
+            "status": status,
+            "iterations": math.nan,
+        })
+        for column in PHASE_COLUMNS + MEMORY_COLUMNS + SUMMARY_COLUMNS:
+            df[column] = math.nan
+        df["n_samples"] = n_finished
+        if ledger is not None:
+            for data in df[list(RESULT_COLUMNS)].to_dict(orient="records"):
+                ledger.add(model_id, simulator, data["repeat"], data)
+            summary = {column: math.nan for column in SUMMARY_COLUMNS}
+            summary["n_samples"] = n_finished
+            ledger.complete(model_id, simulator, summary)
+        df["simulator"] = simulator
+        dfs.append(df)
+    return pd.concat(dfs) if dfs else pd.DataFrame(columns=RESULT_COLUMNS + ("simulator",))
+
+
+def optimize_models_parallel(model_paths: List[Path], simulators: List[str],
+                             n_repeat: int, n_workers: int,
+                             isolate_simulators: bool = False,
+                             pin_cpus: bool = True,
+                             timeout: Optional[float] = TIMEOUT,
+                             mode: str = MODE_COLD,
+                             source: str = SOURCE_SBML,
+                             adaptive: Optional[AdaptiveSettings] = None,
+                             track_memory: bool = False,
+                             ledger: Optional[RunLedger] = None,
+                             solver: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    """Optimize the models repeatedly in n_workers parallel processes.
+
+    Every model is pinned to one worker process. With isolate_simulators
+    every simulator runs in its own worker process, otherwise all simulators
+    for a model share the worker. Models completed in the ledger are skipped.
+    Tasks exceeding the timeout or crashing the worker are stored with status
+    'timeout' or 'crash' (see `failed_model_repeats`).
+
+    The backends of the simulators are imported in the worker startup.
+    """
+    def pending(path: Path) -> List[str]:
+        """Simulators which have to be run for the model."""
+        if ledger is None:
+            return simulators
+        return [sim for sim in simulators if not ledger.is_complete(bigg_model_id(path), sim)]
+
+    if isolate_simulators:
+        tasks = [
+            ([simulator], path, n_repeat, mode, source, adaptive, track_memory, ledger, solver)
+            for path in model_paths for simulator in pending(path)
+        ]
+    else:
+        tasks = [
+            (pending(path), path, n_repeat, mode, source, adaptive, track_memory, ledger, solver)
+            for path in model_paths if pending(path)
+        ]
+
+    results = run_tasks(
+        optimize_model_repeats, tasks, n_workers=n_workers, pin_cpus=pin_cpus,
+        timeout=timeout, on_error=failed_model_repeats,
+        initializer=import_modules, initargs=(simulator_modules(simulators),),
+    )
+    df = pd.concat(results) if results else pd.DataFrame(columns=RESULT_COLUMNS + ("simulator",))
+    dfs = {}
+    for simulator in simulators:
+        df_sim = df[df.simulator == simulator].copy()
+        del df_sim["simulator"]
+        dfs[simulator] = df_sim
+    return dfs
+
+
+def optimize_models(n_repeat: int=N_REPEAT, n_workers: Optional[int]=None,
+                    isolate_simulators: bool=False, pin_cpus: bool=True,
+                    timeout: Optional[float]=TIMEOUT,
+                    mode: str=MODE_COLD, source: str=SOURCE_SBML,
+                    adaptive: Optional[AdaptiveSettings]=None, track_memory: bool=False,
+                    resume: bool=True, solvers: Optional[List[str]]=None,
+                    query: Optional[str]=None, simulators: Optional[List[str]]=None,
+                    models: Optional[List[str]]=None, collection: str="bigg",
+                    results_dir: Path=RESULTS_DIR):
+    """Optimize the models repeatidly.
+
+    Every repeat is committed to the run ledger, the result TSVs are generated
+    from the ledger. An interrupted sweep is continued by rerunning with the
+    same settings.
+
+    With solvers every model is optimized with every LP backend, the results
+    are stored per simulator and solver (`bigg_<simulator>_<solver>.tsv`).
+
+    The models are selected from the model catalog and run in the order of
+    decreasing model size (longest jobs first).
+
+    Only the backends of the selected simulators are imported, before the
+    benchmark in serial mode and in the worker startup in parallel mode (the
+    startup time of every worker is stored with the results).
+
+    :param n_repeat: number of repeats per model (minimal number in adaptive mode)
+    :param mode: benchmark mode, 'cold' (load every repeat) or 'warm' (load once)
+    :param source: model source, original SBML or decompressed SBML/pickle from the model store
+    :param adaptive: settings for adaptive number of repeats, fixed n_repeat if None
+    :param track_memory: record peak RSS and tracemalloc peak (slows down timings)
+    :param n_workers: number of parallel worker processes, runs serially if None
+    :param isolate_simulators: run every simulator in its own worker (parallel mode)
+    :param pin_cpus: pin every worker to a single CPU (parallel mode)
+    :param timeout: wall-clock timeout per model task [s] (parallel mode)
+    :param resume: continue the last sweep with identical settings (and package versions),
+        start a new sweep otherwise
+    :param solvers: LP backends (see `solvers.available_solvers`), default solver if None
+    :param query: catalog query for selecting models, e.g. 'n_reactions < 5000', all models if None
+    :param simulators: simulator keys (see `FBA_SIMULATORS`), `DEFAULT_SIMULATORS` if None
+    :param models: BiGG model ids, all models (of the query) if None
+    :param collection: model collection, 'bigg' or the FBA models of 'synthetic',
+        results are stored as `<collection>_<simulator>.tsv`
+    :param results_dir: output directory of the results (`<results_dir>/fba`) and the ledger
+    """
+    simulators = list(simulators) if simulators is not None else list(DEFAULT_SIMULATORS)
+    unknown = [sim for sim in simulators if sim not in FBA_SIMULATORS]
+    if unknown:
+        raise ValueError(f"Unsupported simulators {unknown}, use any of {list(FBA_SIMULATORS)}")
+
+    build_catalog([collection])
+    model_paths = catalog_model_paths(collection, query=query, model_ids=models, dataset="fba")
     print("model_paths", model_paths)
-    cobrapy_path = RESULTS_DIR / "fba" / "bigg_cobrapy.tsv"
-    cameo_path = RESULTS_DIR / "fba" / "bigg_cameo.tsv"
-
-    dfs_cobrapy = []
-    dfs_cameo = []
-    for k in range(n_repeat):
-        df_cobrapy = optimize_models_cobrapy(model_paths)
-        df_cameo = optimize_models_cameo(model_paths)
-        for df in df_cobrapy, df_cameo:
-            df["repeat"] = k + 1
-        dfs_cobrapy.append(df_cobrapy)
-        dfs_cameo.append(df_cameo)
-
-    df_cobrapy = pd.concat(dfs_cobrapy)
-    df_cameo = pd.concat(dfs_cameo)
-    for df in df_cobrapy, df_cameo:
-        df.sort_values(by=["model", "repeat"], inplace=True)
-
-    # save dfs
-    # cobrapy_path.parent.mkdir(parents=True, exist_ok=True)
-    # cameo_path.parent.mkdir(parents=True, exist_ok=True)
-    df_cobrapy.to_csv(cobrapy_path, sep="\t", index=False)
-    df_cameo.to_csv(cameo_path, sep="\t", index=False)
+    (results_dir / "fba").mkdir(parents=True, exist_ok=True)
+    if source != SOURCE_SBML:
+        # build model store once before the benchmark
+        build_model_store(model_paths)
+
+    if solvers is not None:
+        check_solvers(solvers)
+
+    # sweeps are only resumed for the installed package versions of the simulators
+    versions = {}
+    for simulator in simulators:
+        versions.update(package_versions(simulator))
+
+    for solver in solvers if solvers is not None else [None]:
+        ledger = RunLedger.open(config={
+            "dataset": "fba", "n_repeat": n_repeat, "mode": mode, "source": source,
+            "collection": collection, "adaptive": adaptive, "track_memory": track_memory,
+            "solver": solver, "versions": versions,
+        }, resume=resume, path=results_dir / LEDGER_PATH.name)
+
+        if n_workers is None:
+            import_modules(simulator_modules(simulators))
+            for simulator in simulators:
+                paths = [p for p in model_paths
+                         if not ledger.is_complete(bigg_model_id(p), simulator)]
+                FBA_SIMULATORS[simulator](
+                    paths, n_repeat=n_repeat, mode=mode, source=source, adaptive=adaptive,
+                    track_memory=track_memory, ledger=ledger, solver=solver,
+                )
+        else:
+            optimize_models_parallel(
+                model_paths, simulators=simulators, n_repeat=n_repeat,
+                n_workers=n_workers, isolate_simulators=isolate_simulators,
+                pin_cpus=pin_cpus, timeout=timeout, mode=mode, source=source,
+                adaptive=adaptive, track_memory=track_memory, ledger=ledger, solver=solver,
+            )
+
+        # save results from ledger
+        for simulator in simulators:
+            df = ledger.to_dataframe(simulator, columns=RESULT_COLUMNS)
+            df[VERSIONS_COLUMN] = versions_value(simulator)
+            name = (f"{collection}_{simulator}" if solver is None
+                    else f"{collection}_{simulator}_{solver}")
+            df.to_csv(results_dir / "fba" / f"{name}.tsv", sep="\t", index=False)
 
 
 if __name__ == "__main__":
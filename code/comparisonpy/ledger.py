@@ -0,0 +1,200 @@
+"""
+Persistent ledger of benchmark runs.
+
+A sweep over all models and simulators takes hours, so the results are not
+only collected in memory but every repeat is committed to an append-only
+SQLite ledger as soon as it finishes. A restarted sweep with the same
+configuration continues where the interrupted sweep stopped: finished
+models are skipped and partially finished models continue with the next
+repeat. The runners include the package versions of the simulators in the
+configuration, so a rerun after an upgrade starts a new sweep instead of
+resuming the completed sweep of the old versions. The result TSVs are
+generated from the ledger.
+
+    sweeps      (sweep_id, config_id, config, created)
+    runs        (sweep_id, model, simulator, repeat, data)   one entry per repeat
+    completed   (sweep_id, model, simulator, data)           summary of a finished model
+
+The ledger only stores its path and the sweep id and opens a connection per
+write, so it can be passed to the parallel worker processes, which write to
+the ledger concurrently.
+"""
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence
+
+import pandas as pd
+
+from code.comparisonpy import RESULTS_DIR
+from code.comparisonpy.parallel import current_worker
+
+LEDGER_PATH = RESULTS_DIR / "ledger.sqlite"
+SQLITE_TIMEOUT = 60.0  # [s] wait for locks of concurrent writers
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sweeps (
+    sweep_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    config_id TEXT NOT NULL,
+    config TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    sweep_id INTEGER NOT NULL,
+    model TEXT NOT NULL,
+    simulator TEXT NOT NULL,
+    repeat INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (sweep_id, model, simulator, repeat)
+);
+CREATE TABLE IF NOT EXISTS completed (
+    sweep_id INTEGER NOT NULL,
+    model TEXT NOT NULL,
+    simulator TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (sweep_id, model, simulator)
+);
+"""
+
+
+def _json_default(value: Any) -> Any:
+    """JSON representation of numpy scalars and settings objects."""
+    if hasattr(value, "item"):
+        return value.item()
+    if hasattr(value, "__dict__"):
+        return vars(value)
+    return str(value)
+
+
+def config_id(config: Dict[str, Any]) -> str:
+    """Hash of the sweep configuration."""
+    content = json.dumps(config, sort_keys=True, default=_json_default)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+
+class RunLedger:
+    """Append-only ledger of the repeats of a single sweep.
+
+    Use `RunLedger.open` to continue the last sweep with the configuration
+    or to start a new sweep.
+    """
+
+    def __init__(self, path: Path, sweep_id: int):
+        self.path = path
+        self.sweep_id = sweep_id
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        with closing(sqlite3.connect(self.path, timeout=SQLITE_TIMEOUT)) as con:
+            with con:
+                yield con
+
+    @staticmethod
+    def open(config: Dict[str, Any], resume: bool = True,
+             path: Path = LEDGER_PATH) -> "RunLedger":
+        """Open the ledger for the sweep configuration.
+
+        :param config: configuration of the sweep (dataset, mode, repeats,
+            tolerances, settings objects, package versions, ...), sweeps are
+            only resumed for an identical configuration
+        :param resume: continue the last sweep with the configuration, start a
+            new sweep otherwise
+        :param path: path of the SQLite ledger
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        cid = config_id(config)
+        with closing(sqlite3.connect(path, timeout=SQLITE_TIMEOUT)) as con:
+            # write ahead log allows reads during the writes of the workers
+            con.execute("PRAGMA journal_mode=WAL")
+            with con:
+                con.executescript(_SCHEMA)
+                row = con.execute(
+                    "SELECT max(sweep_id) FROM sweeps WHERE config_id = ?", (cid,)
+                ).fetchone()
+                sweep_id = row[0] if resume else None
+                if sweep_id is None:
+                    content = json.dumps(config, sort_keys=True, default=_json_default)
+                    cursor = con.execute(
+                        "INSERT INTO sweeps (config_id, config, created) VALUES (?, ?, ?)",
+                        (cid, content, time.time()),
+                    )
+                    sweep_id = cursor.lastrowid
+                    print(f"... new sweep '{sweep_id}' in ledger '{path}' ...")
+                else:
+                    print(f"... resume sweep '{sweep_id}' from ledger '{path}' ...")
+        return RunLedger(path=path, sweep_id=sweep_id)
+
+    def add(self, model: str, simulator: str, repeat: int, data: Dict[str, Any]):
+        """Commit the results of a finished repeat.
+
+        The worker id and CPU affinity are added in parallel worker processes
+        (and for the results of failed workers, see `parallel.run_tasks`).
+        """
+        content = json.dumps({**data, **current_worker()}, default=_json_default)
+        with self._connect() as con:
+            con.execute(
+                "INSERT OR IGNORE INTO runs VALUES (?, ?, ?, ?, ?)",
+                (self.sweep_id, model, simulator, int(repeat), content),
+            )
+
+    def complete(self, model: str, simulator: str, data: Dict[str, Any]):
+        """Commit the summary of a model, all repeats of the model are finished."""
+        with self._connect() as con:
+            con.execute(
+                "INSERT OR IGNORE INTO completed VALUES (?, ?, ?, ?)",
+                (self.sweep_id, model, simulator, json.dumps(data, default=_json_default)),
+            )
+
+    def repeats(self, model: str, simulator: str) -> List[Dict[str, Any]]:
+        """Results of the finished repeats of the model in order of repeats."""
+        with self._connect() as con:
+            rows = con.execute(
+                "SELECT data FROM runs WHERE sweep_id = ? AND model = ? AND simulator = ? "
+                "ORDER BY repeat",
+                (self.sweep_id, model, simulator),
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def missing_repeats(self, model: str, simulator: str, n_repeat: int) -> List[int]:
+        """Repeats 1 ... n_repeat of the model which are not finished."""
+        finished = {data["repeat"] for data in self.repeats(model, simulator)}
+        return [repeat for repeat in range(1, n_repeat + 1) if repeat not in finished]
+
+    def is_complete(self, model: str, simulator: str) -> bool:
+        """Check if all repeats of the model are finished."""
+        with self._connect() as con:
+            row = con.execute(
+                "SELECT 1 FROM completed WHERE sweep_id = ? AND model = ? AND simulator = ?",
+                (self.sweep_id, model, simulator),
+            ).fetchone()
+        return row is not None
+
+    def to_dataframe(self, simulator: str, columns: Sequence[str]) -> pd.DataFrame:
+        """Results of all repeats of the simulator with the model summaries.
+
+        Summary columns are NaN for models which are not completed. Additional
+        columns (e.g. worker information) are appended after columns.
+        """
+        with self._connect() as con:
+            rows = con.execute(
+                "SELECT runs.data, completed.data FROM runs LEFT JOIN completed "
+                "ON runs.sweep_id = completed.sweep_id AND runs.model = completed.model "
+                "AND runs.simulator = completed.simulator "
+                "WHERE runs.sweep_id = ? AND runs.simulator = ? "
+                "ORDER BY runs.model, runs.repeat",
+                (self.sweep_id, simulator),
+            ).fetchall()
+        records = []
+        for data, summary in rows:
+            record = json.loads(data)
+            if summary is not None:
+                record.update(json.loads(summary))
+            records.append(record)
+
+        df = pd.DataFrame(records)
+        extra_columns = [c for c in df.columns if c not in columns]
+        return df.reindex(columns=list(columns) + extra_columns)
+
@@ -0,0 +1,104 @@
+"""
+Memory footprint of the load and simulate phases.
+
+For every phase the peak resident set size (RSS) above the RSS at the start of
+the phase and the peak of the Python allocations (tracemalloc) are recorded.
+The RSS includes native allocations (libSBML, LLVM JIT of roadrunner, COPASI,
+LP solvers), tracemalloc only the allocations of the Python interpreter.
+
+On Linux the peak RSS (VmHWM) is reset at the start of every phase via
+`/proc/self/clear_refs`, so the peak of every phase is measured. Otherwise
+the increase of the process lifetime peak (`ru_maxrss`) is used, which is a
+lower bound.
+
+tracemalloc slows down Python allocations considerably, so timings measured
+with memory tracking should not be compared against timings without.
+"""
+import math
+import resource
+import sys
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+MEMORY_PHASES = ["load", "simulate"]
+
+# columns of the memory footprint in the results [bytes]
+MEMORY_COLUMNS = tuple(
+    f"{phase}_{key}" for phase in MEMORY_PHASES for key in ("rss_peak", "tracemalloc_peak")
+)
+
+_PROC_STATUS = Path("/proc/self/status")
+_PROC_CLEAR_REFS = Path("/proc/self/clear_refs")
+
+
+def _proc_status(key: str) -> float:
+    """Value of key from /proc/self/status [bytes], NaN if not available."""
+    try:
+        for line in _PROC_STATUS.read_text().splitlines():
+            if line.startswith(f"{key}:"):
+                return float(line.split()[1]) * 1024  # [kB] -> [bytes]
+    except OSError:
+        pass
+    return math.nan
+
+
+def _maxrss() -> float:
+    """Process lifetime peak RSS [bytes]."""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kB on Linux
+    return float(maxrss) if sys.platform == "darwin" else float(maxrss) * 1024
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the peak RSS of the process to the current RSS (Linux only)."""
+    try:
+        _PROC_CLEAR_REFS.write_text("5")
+        return True
+    except OSError:
+        return False
+
+
+class MemoryTracker:
+    """Records the memory footprint of the phases of a single run.
+
+    A disabled tracker does not measure anything and reports NaN.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.rss_peak: Dict[str, float] = {}
+        self.tracemalloc_peak: Dict[str, float] = {}
+
+    @contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        """Measure the memory footprint of the enclosed code as phase."""
+        if phase not in MEMORY_PHASES:
+            raise ValueError(f"Unsupported phase '{phase}', use one of {MEMORY_PHASES}")
+        if not self.enabled:
+            yield
+            return
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc_start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+
+        resettable = _reset_peak_rss()
+        rss_start = _proc_status("VmRSS") if resettable else _maxrss()
+        try:
+            yield
+        finally:
+            _, tracemalloc_peak = tracemalloc.get_traced_memory()
+            rss_peak = _proc_status("VmHWM") if resettable else _maxrss()
+            self.rss_peak[phase] = max(rss_peak - rss_start, 0.0)
+            self.tracemalloc_peak[phase] = float(tracemalloc_peak - tracemalloc_start)
+
+    def row(self) -> Tuple[float, ...]:
+        """Memory footprint of all phases [bytes] in order of MEMORY_COLUMNS."""
+        res = []
+        for phase in MEMORY_PHASES:
+            res.append(self.rss_peak.get(phase, math.nan))
+            res.append(self.tracemalloc_peak.get(phase, math.nan))
+        return tuple(res)
@@ -0,0 +1,150 @@
+"""
+Local store of preprocessed BiGG models.
+
+The BiGG models are stored as `.xml.gz`, so every load has to inflate the
+file and parse the SBML with libSBML. The store keeps for every model the
+decompressed SBML and the pickled cobra model, keyed by the content hash of
+the source file. Entries are rebuilt automatically if the source changes.
+
+    models/store/<model>/<sha256>/model.xml
+    models/store/<model>/<sha256>/model.pickle
+
+Loading from the store is benchmarked as its own model source, which allows
+to separate the parse cost from the solver cost.
+"""
+import gzip
+import hashlib
+import pickle
+import shutil
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Union
+
+from code.comparisonpy import MODELS_DIR
+from code.comparisonpy.timing import PhaseTimer
+
+if TYPE_CHECKING:
+    import cobra
+
+MODEL_STORE_DIR = MODELS_DIR / "store"
+SBML_FILENAME = "model.xml"
+PICKLE_FILENAME = "model.pickle"
+
+# model sources for loading models
+SOURCE_SBML = "sbml"  # original SBML file (.xml.gz)
+SOURCE_STORE_SBML = "store_sbml"  # decompressed SBML from store
+SOURCE_STORE_PICKLE = "store_pickle"  # pickled cobra model from store
+MODEL_SOURCES = [SOURCE_SBML, SOURCE_STORE_SBML, SOURCE_STORE_PICKLE]
+
+
+def file_hash(path: Path, decompress: bool = False, chunk_size: int = 2**20) -> str:
+    """SHA256 hex digest of the file content.
+
+    :param decompress: hash the uncompressed content of '.gz' files
+    """
+    sha = hashlib.sha256()
+    open_file = gzip.open if decompress and path.suffix == ".gz" else open
+    with open_file(path, "rb") as f_in:
+        for chunk in iter(lambda: f_in.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def read_sbml(path: Path) -> str:
+    """SBML of the model file (.xml, .xml.gz) as string."""
+    open_file = gzip.open if path.suffix == ".gz" else open
+    with open_file(path, "rb") as f_in:
+        return f_in.read().decode("utf-8")
+
+
+def model_store_entry(path: Path, store_dir: Path = MODEL_STORE_DIR) -> Path:
+    """Get the store entry directory for the given model file.
+
+    The entry is created if it does not exist. Outdated entries of the model
+    (i.e. for a different content hash) are removed.
+    """
+    from cobra.io.sbml import read_sbml_model
+
+    model_id = path.name.split(".")[0]
+    model_dir = store_dir / model_id
+    entry_dir = model_dir / file_hash(path)
+    if (entry_dir / PICKLE_FILENAME).exists():
+        return entry_dir
+
+    # remove outdated entries
+    if model_dir.exists():
+        shutil.rmtree(model_dir)
+
+    # build entry in temporary directory, rename when complete
+    tmp_dir = model_dir / "tmp"
+    tmp_dir.mkdir(parents=True)
+    sbml_path = tmp_dir / SBML_FILENAME
+    open_source = gzip.open if path.suffix == ".gz" else open
+    with open_source(path, "rb") as f_in, open(sbml_path, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+
+    model = read_sbml_model(str(sbml_path))
+    with open(tmp_dir / PICKLE_FILENAME, "wb") as f_out:
+        pickle.dump(model, f_out, protocol=pickle.HIGHEST_PROTOCOL)
+
+    tmp_dir.rename(entry_dir)
+    print(f"... stored '{model_id}' in '{entry_dir}' ...")
+    return entry_dir
+
+
+def build_model_store(model_paths: List[Path], store_dir: Path = MODEL_STORE_DIR) -> List[Path]:
+    """Create or update the store entries for all given models."""
+    return [model_store_entry(path, store_dir=store_dir) for path in model_paths]
+
+
+def model_source_path(path: Path, source: str, store_dir: Path = MODEL_STORE_DIR) -> Path:
+    """Resolve the file to load for the model and model source.
+
+    Resolving store entries requires hashing the source file (and building
+    the entry if required), so this should be called outside of timings.
+    """
+    if source == SOURCE_SBML:
+        return path
+    elif source == SOURCE_STORE_SBML:
+        return model_store_entry(path, store_dir=store_dir) / SBML_FILENAME
+    elif source == SOURCE_STORE_PICKLE:
+        return model_store_entry(path, store_dir=store_dir) / PICKLE_FILENAME
+    raise ValueError(f"Unsupported model source '{source}', use one of {MODEL_SOURCES}")
+
+
+def read_model_source(source_path: Path) -> Union[str, bytes]:
+    """Read (and decompress) the model file.
+
+    :return: SBML string or pickled bytes
+    """
+    if source_path.suffix == ".pickle":
+        with open(source_path, "rb") as f_in:
+            return f_in.read()
+    open_source = gzip.open if source_path.suffix == ".gz" else open
+    with open_source(source_path, "rb") as f_in:
+        return f_in.read().decode("utf-8")
+
+
+def parse_model_source(content: Union[str, bytes]) -> "cobra.Model":
+    """Create cobra model from SBML string or pickled bytes."""
+    from cobra.io.sbml import read_sbml_model
+
+    if isinstance(content, bytes):
+        return pickle.loads(content)
+    return read_sbml_model(content)
+
+
+def load_cobra_model(source_path: Path, timer: Optional[PhaseTimer] = None) -> "cobra.Model":
+    """Load cobra model from SBML (.xml, .xml.gz) or pickle file.
+
+    The 'read' and 'parse' phases are recorded with the optional timer.
+    """
+    timer = timer if timer is not None else PhaseTimer()
+    with timer.phase("read"):
+        content = read_model_source(source_path)
+    with timer.phase("parse"):
+        return parse_model_source(content)
+
+
+if __name__ == "__main__":
+    from code.comparisonpy import bigg_model_paths
+    build_model_store(bigg_model_paths())
@@ -0,0 +1,245 @@
+"""
+Numerical comparison of ODE trajectories between simulators.
+
+The trajectories of the simulators are aligned on the common columns (species
+by SBML id, concentrations; see `extraction.species_columns`) and on a common
+time vector. Absolute and relative errors are calculated
+vectorized with numpy for all species and timepoints of a model; the results
+are summarized as max and RMS error per model and simulator pair.
+"""
+import itertools
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from code.comparisonpy import RESULTS_DIR
+from code.comparisonpy.extraction import species_columns
+from code.comparisonpy.trajectories import (
+    TRAJECTORY_FORMATS, list_trajectories, read_trajectory_array
+)
+
+SIMULATORS = ["sbscl", "roadrunner", "copasi"]
+
+# absolute error below which values are considered identical, also used as
+# floor for the denominator of the relative error
+ABSOLUTE_EPS = 1E-10
+RELATIVE_EPS = 1E-4
+
+
+class Trajectory:
+    """Time vector with (timepoints x species) values of a simulation."""
+
+    def __init__(self, time: Optional[np.ndarray], values: np.ndarray, columns: List[str]):
+        self.time = time
+        self.values = values
+        self.columns = columns
+
+    @staticmethod
+    def from_array(data: np.ndarray, columns: List[str]) -> "Trajectory":
+        """Create trajectory from array, splitting the 'time' column (if any).
+
+        Concentration selections ('[S1]') are named by the SBML id.
+        """
+        columns = species_columns([str(c) for c in columns])
+        if "time" in columns:
+            k = columns.index("time")
+            time_vector = data[:, k]
+            data = np.delete(data, k, axis=1)
+            columns = columns[:k] + columns[k + 1:]
+        else:
+            time_vector = None
+        return Trajectory(time=time_vector, values=data, columns=columns)
+
+
+def load_trajectory(model_id: str, simulator: str, source: str = "tsv", repeat: int = 1,
+                    results_dir: Path = RESULTS_DIR) -> Optional[Trajectory]:
+    """Load trajectory from TSV results or the columnar trajectory dataset.
+
+    :return: trajectory or None if no results exist for the model
+    """
+    if source == "tsv":
+        path = results_dir / "ode" / simulator / f"{model_id}.tsv"
+        if not path.exists():
+            return None
+        df = pd.read_csv(path, sep="\t", dtype=np.float64)
+        return Trajectory.from_array(df.values, columns=list(df.columns))
+    elif source in TRAJECTORY_FORMATS:
+        try:
+            data, columns = read_trajectory_array(
+                model_id, simulator, repeat=repeat, fmt=source,
+                trajectory_dir=results_dir / "ode" / "trajectories",
+            )
+        except FileNotFoundError:
+            return None
+        return Trajectory.from_array(data, columns=columns)
+    raise ValueError(f"Unsupported trajectory source '{source}', use one of {['tsv'] + TRAJECTORY_FORMATS}")
+
+
+def _interpolate(t_new: np.ndarray, t: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Linear interpolation of all columns of y (timepoints x columns) to t_new.
+
+    Timepoints outside of the time range of t are not extrapolated (NaN), so
+    all values are NaN for an empty t.
+    """
+    if len(t) < 2:
+        values = np.full((len(t_new), y.shape[1]), np.nan)
+        if len(t) == 1:
+            values[t_new == t[0]] = y[0]
+        return values
+    idx = np.clip(np.searchsorted(t, t_new, side="right") - 1, 0, len(t) - 2)
+    dt = t[idx + 1] - t[idx]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w = np.where(dt > 0, (t_new - t[idx]) / dt, 0.0)
+    values = y[idx] + w[:, np.newaxis] * (y[idx + 1] - y[idx])
+    values[(t_new < t[0]) | (t_new > t[-1])] = np.nan
+    return values
+
+
+def align_trajectories(a: Trajectory, b: Trajectory) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+    """Align two trajectories on common columns and the time vector of a.
+
+    A missing time vector (e.g. COPASI TSV results) is taken from the other
+    trajectory, which requires an identical number of timepoints. If the time
+    vectors differ, b is linearly interpolated on the time vector of a
+    (timepoints of a outside of the time range of b are NaN).
+
+    :return: time, values a, values b, columns
+    """
+    columns_b = set(b.columns)
+    columns = [c for c in a.columns if c in columns_b]
+    ka = [a.columns.index(c) for c in columns]
+    kb = [b.columns.index(c) for c in columns]
+    ya = a.values[:, ka]
+    yb = b.values[:, kb]
+
+    ta, tb = a.time, b.time
+    if ta is None and tb is None:
+        raise ValueError("Time vector missing in both trajectories")
+    if ta is None or tb is None:
+        if ya.shape[0] != yb.shape[0]:
+            raise ValueError("Time vector missing and number of timepoints differs")
+        time_vector = ta if ta is not None else tb
+    else:
+        time_vector = ta
+        if ta.shape != tb.shape or not np.allclose(ta, tb):
+            yb = _interpolate(ta, tb, yb)
+
+    return time_vector, ya, yb, columns
+
+
+def trajectory_errors(ya: np.ndarray, yb: np.ndarray) -> Dict[str, np.ndarray]:
+    """Per species max and RMS of absolute and relative errors.
+
+    :return: dictionary of arrays with one entry per column
+    """
+    abs_err = np.abs(ya - yb)
+    scale = np.maximum(np.maximum(np.abs(ya), np.abs(yb)), ABSOLUTE_EPS)
+    rel_err = abs_err / scale
+    # errors below the absolute eps are no relative errors
+    rel_err[abs_err < ABSOLUTE_EPS] = 0.0
+    return {
+        "max_abs_error": np.nanmax(abs_err, axis=0),
+        "rms_abs_error": np.sqrt(np.nanmean(abs_err ** 2, axis=0)),
+        "max_rel_error": np.nanmax(rel_err, axis=0),
+        "rms_rel_error": np.sqrt(np.nanmean(rel_err ** 2, axis=0)),
+    }
+
+
+def compare_trajectories(model_ids: List[str], simulators: List[str] = SIMULATORS,
+                         source: str = "tsv", repeat: int = 1,
+                         results_dir: Path = RESULTS_DIR) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Compare trajectories of all simulator pairs for all models.
+
+    Pairs which cannot be aligned ('error') or have no common species
+    ('no_common_species') are reported in the summary with NaN errors.
+
+    :return: summary per model and pair, errors per model, pair and species
+    """
+    summary = []
+    species_dfs = []
+    for model_id in model_ids:
+        trajectories = {
+            simulator: load_trajectory(model_id, simulator, source=source, repeat=repeat,
+                                       results_dir=results_dir)
+            for simulator in simulators
+        }
+        for sim_a, sim_b in itertools.combinations(simulators, 2):
+            a, b = trajectories[sim_a], trajectories[sim_b]
+            if a is None or b is None:
+                continue
+            res = {"model": model_id, "simulator_a": sim_a, "simulator_b": sim_b}
+            try:
+                _, ya, yb, columns = align_trajectories(a, b)
+            except ValueError as err:
+                print(f"ERROR in '{model_id}' ({sim_a}, {sim_b})", err)
+                summary.append({**res, "status": "error"})
+                continue
+
+            n_timepoints, n_species = ya.shape
+            res.update({"n_species": n_species, "n_timepoints": n_timepoints})
+            if n_species == 0:
+                print(f"WARNING: no common species in '{model_id}' ({sim_a}, {sim_b})")
+                summary.append({**res, "status": "no_common_species"})
+                continue
+
+            errors = trajectory_errors(ya, yb)
+            species_dfs.append(pd.DataFrame({
+                "model": model_id, "simulator_a": sim_a, "simulator_b": sim_b,
+                "species": columns, **errors
+            }))
+            res.update({
+                "max_abs_error": np.nanmax(errors["max_abs_error"]),
+                "rms_abs_error": np.sqrt(np.nanmean(errors["rms_abs_error"] ** 2)),
+                "max_rel_error": np.nanmax(errors["max_rel_error"]),
+                "rms_rel_error": np.sqrt(np.nanmean(errors["rms_rel_error"] ** 2)),
+            })
+            res["identical"] = bool(
+                res["max_abs_error"] < ABSOLUTE_EPS or res["max_rel_error"] < RELATIVE_EPS
+            )
+            res["status"] = "compared"
+            summary.append(res)
+
+    df_summary = pd.DataFrame(summary, columns=[
+        "model", "simulator_a", "simulator_b", "status", "n_species", "n_timepoints",
+        "max_abs_error", "rms_abs_error", "max_rel_error", "rms_rel_error", "identical",
+    ])
+    df_species = pd.concat(species_dfs) if species_dfs else pd.DataFrame()
+    return df_summary, df_species
+
+
+def compare_ode_results(simulators: List[str] = SIMULATORS, source: str = "tsv",
+                        results_dir: Path = RESULTS_DIR) -> pd.DataFrame:
+    """Compare the ODE trajectories of all models and store the comparison.
+
+    :param source: trajectories of the TSV results ('tsv') or of the columnar
+        trajectory dataset ('arrow', 'parquet'), the models are taken from
+        the results of the simulators in the source
+    """
+    start_time = time.time()
+    if source == "tsv":
+        paths = [p for sim in simulators for p in (results_dir / "ode" / sim).glob("*.tsv")]
+        model_ids = sorted({path.stem for path in paths})
+    elif source in TRAJECTORY_FORMATS:
+        df = list_trajectories(fmt=source, trajectory_dir=results_dir / "ode" / "trajectories")
+        model_ids = sorted(set(df[df.simulator.isin(simulators)].model))
+    else:
+        raise ValueError(f"Unsupported trajectory source '{source}', use one of {['tsv'] + TRAJECTORY_FORMATS}")
+    df_summary, df_species = compare_trajectories(
+        model_ids, simulators=simulators, source=source, results_dir=results_dir
+    )
+    df_summary.to_csv(results_dir / "ode" / "comparison_trajectories.tsv", sep="\t", index=False)
+    df_species.to_csv(results_dir / "ode" / "comparison_species.tsv", sep="\t", index=False)
+    print(f"compared {len(model_ids)} models in {time.time() - start_time:.2f} [s]")
+    print(df_summary[df_summary.identical == False])
+    not_compared = df_summary[df_summary.status != "compared"]
+    if len(not_compared):
+        print(f"WARNING: {len(not_compared)} model pairs not compared")
+        print(not_compared.groupby(["simulator_a", "simulator_b", "status"]).size())
+    return df_summary
+
+
+if __name__ == "__main__":
+    compare_ode_results()
@@ -1,138 +1,679 @@
 """
-Script for running FBA on all BiGG models.
+Script for running the ODE time courses of all BioModels.
 """
 import os
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 import numpy as np
 import pandas as pd
-import roadrunner
-from COPASI import CDataModel
 
-from code.comparisonpy import N_REPEAT, RESULTS_DIR, BIOMODELS_MODEL_PATHS
-from code.comparisonpy.copasi_example import run_time_course as run_copasi_time_course
-from basico import load_model
-
-import time
+from code.comparisonpy import N_REPEAT, RESULTS_DIR, MODE_COLD, BENCHMARK_MODES
+from code.comparisonpy.adaptive import SUMMARY_COLUMNS, AdaptiveSettings, RepeatController
+from code.comparisonpy.catalog import (
+    build_catalog, catalog_model_paths, model_id as path_model_id, unsupported_models
+)
+from code.comparisonpy.extraction import (
+    ResultArray, copasi_species_ids, extract_roadrunner, species_columns
+)
+from code.comparisonpy.ledger import LEDGER_PATH, RunLedger
+from code.comparisonpy.memory import MEMORY_COLUMNS, MemoryTracker
+from code.comparisonpy.model_store import read_sbml
+from code.comparisonpy.parallel import import_modules, run_tasks
+from code.comparisonpy.regression import VERSIONS_COLUMN, package_versions, versions_value
+from code.comparisonpy.state_cache import (
+    SOURCE_STATE_CACHE, STATE_CACHE_DIR, load_roadrunner_state, state_cache_entry
+)
+from code.comparisonpy.timing import PHASE_COLUMNS, PhaseTimer
+from code.comparisonpy.trajectories import OUTPUT_FORMATS, TRAJECTORY_DIR, write_trajectory
 
 START = 0.0
 END = 100.0
 STEPS = 100
 ABSOLUTE_TOLERANCE = 1E-10
 RELATIVE_TOLERANCE = 1E-6
+TIMEOUT = 300.0  # [s] wall-clock timeout per model (all repeats) in parallel mode
+
+
+class TimeCourseSettings:
+    """Settings of the time course simulations.
+
+    :param start: start time
+    :param end: end time
+    :param steps: number of steps (steps + 1 timepoints)
+    :param absolute_tolerance: absolute tolerance of the integrator
+    :param relative_tolerance: relative tolerance of the integrator
+    """
+
+    def __init__(self, start: float = START, end: float = END, steps: int = STEPS,
+                 absolute_tolerance: float = ABSOLUTE_TOLERANCE,
+                 relative_tolerance: float = RELATIVE_TOLERANCE):
+        if end <= start:
+            raise ValueError(f"end '{end}' must be larger than start '{start}'")
+        if steps < 1:
+            raise ValueError(f"steps must be >= 1, but is '{steps}'")
+        self.start = start
+        self.end = end
+        self.steps = steps
+        self.absolute_tolerance = absolute_tolerance
+        self.relative_tolerance = relative_tolerance
+
+
+RESULT_COLUMNS = (
+    "model", "status", "load_time", "simulate_time", "repeat", "mode", "source"
+) + PHASE_COLUMNS + MEMORY_COLUMNS + SUMMARY_COLUMNS
+
+# backend modules of the simulators, only imported if the simulator is used
+SIMULATOR_MODULES = {
+    "roadrunner": ["roadrunner"],
+    "copasi": ["COPASI", "basico", "code.comparisonpy.copasi_example"],
+    "sbscl": ["code.comparisonpy.sbscl"],
+    "sbscl_cold": ["code.comparisonpy.sbscl"],
+}
+
+# model sources: 'sbml' loads (and compiles) the SBML file, 'state_cache'
+# restores the compiled model from the state cache (roadrunner only)
+SOURCE_SBML = "sbml"
+ODE_SOURCES = {
+    "roadrunner": [SOURCE_SBML, SOURCE_STATE_CACHE],
+    "copasi": [SOURCE_SBML],
+    "sbscl": [SOURCE_SBML],
+    "sbscl_cold": [SOURCE_SBML],
+}
+
+
+def _check_options(mode: str, output_format: str, simulator: str = None,
+                   source: str = SOURCE_SBML):
+    """Check benchmark mode, output format and model source of the simulator."""
+    if mode not in BENCHMARK_MODES:
+        raise ValueError(f"Unsupported benchmark mode '{mode}', use one of {BENCHMARK_MODES}")
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format '{output_format}', use one of {OUTPUT_FORMATS}")
+    if simulator is not None and source not in ODE_SOURCES[simulator]:
+        raise ValueError(f"Unsupported model source '{source}' for '{simulator}', "
+                         f"use one of {ODE_SOURCES[simulator]}")
+
+
+def result_name(simulator: str, source: str = SOURCE_SBML) -> str:
+    """Name of the results of the simulator and model source (`biomodels_<name>.tsv`)."""
+    return simulator if source == SOURCE_SBML else f"{simulator}_{source}"
+
+
+def _write_result(result: ResultArray, output_dir: Path, model_id: str, simulator: str,
+                  repeat: int, output_format: str, trajectory_dir: Path):
+    """Write the trajectory as TSV or to the columnar trajectory dataset.
+
+    The DataFrame is only created for the TSV output.
+    """
+    if output_format == "tsv":
+        result.to_frame().to_csv(output_dir / f"{model_id}.tsv", sep="\t", index=False)
+    else:
+        write_trajectory(result.data, columns=result.columns, model_id=model_id,
+                         simulator=simulator, repeat=repeat, fmt=output_format,
+                         trajectory_dir=trajectory_dir)
+
+
+def _repeat_controller(n_repeat: int, mode: str,
+                       adaptive: Optional[AdaptiveSettings],
+                       ledger: Optional[RunLedger] = None,
+                       model_id: str = None, simulator: str = None) -> RepeatController:
+    """Repeat controller for a model, load time is only checked in cold mode.
+
+    Repeats of the model and simulator finished in the ledger are restored.
+    """
+    keys = ["load_time", "simulate_time"] if mode == MODE_COLD else ["simulate_time"]
+    repeats = RepeatController(n_repeat, adaptive=adaptive, keys=keys)
+    if ledger is not None:
+        repeats.restore(ledger.repeats(model_id, simulator))
+    return repeats
+
+
+def _add_result(model_results: List[tuple], row: tuple, ledger: Optional[RunLedger],
+                simulator: str):
+    """Add result row of a repeat, commit to ledger (without summary columns)."""
+    model_results.append(row)
+    if ledger is not None:
+        data = dict(zip(RESULT_COLUMNS, row))
+        ledger.add(data["model"], simulator, data["repeat"], data)
+
 
+def _complete_model(results: List[tuple], model_results: List[tuple], model_id: str,
+                    repeats: RepeatController, ledger: Optional[RunLedger], simulator: str):
+    """Add the result rows of a model with the summary of all repeats."""
+    summary = repeats.summary()
+    results.extend(res + summary for res in model_results)
+    if ledger is not None:
+        ledger.complete(model_id, simulator, dict(zip(SUMMARY_COLUMNS, summary)))
+
+
+def run_models_roadrunner(model_paths: List[Path], output_dir: Path, n_repeat: int = 1,
+                          mode: str = MODE_COLD, output_format: str = "tsv",
+                          adaptive: Optional[AdaptiveSettings] = None,
+                          track_memory: bool = False,
+                          ledger: Optional[RunLedger] = None,
+                          time_course: Optional[TimeCourseSettings] = None,
+                          trajectory_dir: Path = TRAJECTORY_DIR,
+                          source: str = SOURCE_SBML,
+                          state_cache_dir: Path = STATE_CACHE_DIR) -> pd.DataFrame:
+    """ODE optimization for all given models.
+
+    In the 'cold' mode the model is loaded for every repeat, in the 'warm'
+    mode the model is loaded once and reset via `rr.reset()` between the
+    repeated simulations. With adaptive settings n_repeat is the minimal
+    number of repeats (see `run_models`).
+
+    The SBML parsing is part of the 'compile' phase (not separable in
+    roadrunner), the reset in warm mode is part of the 'setup' phase. The
+    result is extracted as array view without copy (see `extraction`).
+
+    With the 'state_cache' source the compiled model is restored from the
+    state cache instead (see `state_cache`), the restore is the 'parse' phase
+    and no compilation is required. Missing cache entries are created before
+    the first repeat of the model (not part of the timings).
+
+    Trajectories are written as TSV to output_dir (last repeat) or for every
+    repeat to the columnar trajectory dataset ('arrow', 'parquet') in
+    trajectory_dir. With a ledger every repeat is committed when finished
+    (see `run_models`). The time course settings default to the module
+    settings (`START`, `END`, `STEPS`, tolerances).
+    """
+    import roadrunner
+
+    _check_options(mode, output_format, simulator="roadrunner", source=source)
+    tc = time_course if time_course is not None else TimeCourseSettings()
 
-def run_models_roadrunner(model_paths: List[Path], output_dir: Path) -> pd.DataFrame:
-    """ODE optimization for all given models."""
     results = []
     n_models = len(model_paths)
+    unsupported = unsupported_models("roadrunner")
     for k, path in enumerate(model_paths):
-        model_id = path.stem
-        try:
-            # load model
-            start_time = time.time()
-            rr: roadrunner.RoadRunner = roadrunner.RoadRunner(str(path))
-            load_time = time.time() - start_time  # [s]
-
-            model: roadrunner.ExecutableModel = rr.model
-            # set tolerances
-            integrator: roadrunner.Integrator = rr.integrator
-            integrator.setValue("absolute_tolerance", ABSOLUTE_TOLERANCE)
-            integrator.setValue("relative_tolerance", RELATIVE_TOLERANCE)
-
-            # set selections
-            rr.selections = ["time"] + model.getFloatingSpeciesIds() + model.getBoundarySpeciesIds()
-
-            # run optimization
-            start_time = time.time()
-            s = rr.simulate(start=START, end=END, steps=STEPS)
-            simulate_time = time.time() - start_time  # [s]
-
-            # filter models with delay
-            if model_id in ["BIOMD0000000024", "BIOMD0000000025", "BIOMD0000000034"]:
-                raise RuntimeError("delays not supported")
-            status = "success"
-        except (RuntimeError) as err:
-            print(f"ERROR in '{model_id}'", err)
-            simulate_time = np.NaN
-            status = "failure"
-
-        # store result
-        df = pd.DataFrame(s, columns=s.colnames)
-        df.to_csv(output_dir / f"{model_id}.tsv", sep="\t",
-                  index=False)
-        res = (model_id, status, load_time, simulate_time)
-        results.append(res)
-
-        print("[{}/{}]".format(k, n_models), res)
-
-    df = pd.DataFrame(data=results, columns=("model", "status", "load_time", "simulate_time"))
+        model_id = path_model_id(path)
+        rr = None
+        state_path = None
+        model_results = []
+        repeats = _repeat_controller(n_repeat, mode=mode, adaptive=adaptive, ledger=ledger,
+                                     model_id=model_id, simulator="roadrunner")
+        for repeat in repeats:
+            timer = PhaseTimer()
+            memory = MemoryTracker(enabled=track_memory)
+            if model_id in unsupported:
+                repeats.add(load_time=np.NaN, simulate_time=np.NaN)
+                res = (model_id, "skipped", np.NaN, np.NaN, repeat, mode, source)
+                _add_result(model_results, res + timer.row() + memory.row(), ledger, "roadrunner")
+                print("[{}/{}]".format(k, n_models), res)
+                continue
+
+            try:
+                if source == SOURCE_STATE_CACHE and state_path is None:
+                    state_path = state_cache_entry(path, cache_dir=state_cache_dir)
+
+                loaded = False
+                if mode == MODE_COLD or rr is None:
+                    # load model (release previous model first)
+                    rr = None
+                    with memory.measure("load"):
+                        if source == SOURCE_STATE_CACHE:
+                            rr: roadrunner.RoadRunner = load_roadrunner_state(state_path, timer)
+                        else:
+                            with timer.phase("read"):
+                                sbml_str = read_sbml(path)
+                            # SBML parsing and JIT compilation are not separable
+                            with timer.phase("compile"):
+                                rr: roadrunner.RoadRunner = roadrunner.RoadRunner(sbml_str)
+                    loaded = True
+
+                with memory.measure("simulate"):
+                    with timer.phase("setup"):
+                        if loaded:
+                            model: roadrunner.ExecutableModel = rr.model
+                            # set tolerances
+                            integrator: roadrunner.Integrator = rr.integrator
+                            integrator.setValue("absolute_tolerance", tc.absolute_tolerance)
+                            integrator.setValue("relative_tolerance", tc.relative_tolerance)
+
+                            # set selections (concentrations, as COPASI and SBSCL)
+                            rr.selections = ["time"] + [
+                                f"[{sid}]" for sid in
+                                model.getFloatingSpeciesIds() + model.getBoundarySpeciesIds()
+                            ]
+                        else:
+                            # reset state of loaded model
+                            rr.reset()
+
+                    # run optimization
+                    with timer.phase("solve"):
+                        s = rr.simulate(start=tc.start, end=tc.end, steps=tc.steps)
+                    with timer.phase("extract"):
+                        result = extract_roadrunner(s)
+                        result = ResultArray(result.data, columns=species_columns(result.columns))
+                simulate_time = timer.simulate_time  # [s]
+                status = "success"
+
+                # store result
+                _write_result(result, output_dir, model_id, "roadrunner", repeat,
+                              output_format, trajectory_dir)
+            except (RuntimeError) as err:
+                print(f"ERROR in '{model_id}'", err)
+                simulate_time = np.NaN
+                status = "failure"
+
+            load_time = timer.load_time  # [s]
+            repeats.add(load_time=load_time, simulate_time=simulate_time)
+            res = (model_id, status, load_time, simulate_time, repeat, mode, source)
+            _add_result(model_results, res + timer.row() + memory.row(), ledger, "roadrunner")
+
+            print("[{}/{}]".format(k, n_models), res)
+
+        _complete_model(results, model_results, model_id, repeats, ledger, "roadrunner")
+
+    df = pd.DataFrame(data=results, columns=RESULT_COLUMNS)
     return df
 
 
-def run_models_copasi(model_paths: List[Path], output_dir: Path) -> pd.DataFrame:
-    """ODE optimization for all given models."""
+def run_models_copasi(model_paths: List[Path], output_dir: Path, n_repeat: int = 1,
+                      mode: str = MODE_COLD, output_format: str = "tsv",
+                      adaptive: Optional[AdaptiveSettings] = None,
+                      track_memory: bool = False,
+                      ledger: Optional[RunLedger] = None,
+                      time_course: Optional[TimeCourseSettings] = None,
+                      trajectory_dir: Path = TRAJECTORY_DIR,
+                      source: str = SOURCE_SBML) -> pd.DataFrame:
+    """ODE optimization for all given models.
+
+    In the 'cold' mode the model is loaded for every repeat, in the 'warm'
+    mode the model is loaded once and every repeated simulation starts from
+    the initial values of the model. With adaptive settings n_repeat is the
+    minimal number of repeats (see `run_models`).
+
+    The compilation of the model is part of the 'parse' phase (the SBML import
+    compiles the model), setup/solve/extract are timed in the time course.
+    The time series is extracted into an array which is reused by all repeats
+    of the model (see `extraction`).
+
+    Trajectories are written as TSV to output_dir (last repeat) or for every
+    repeat to the columnar trajectory dataset ('arrow', 'parquet') in
+    trajectory_dir. With a ledger every repeat is committed when finished
+    (see `run_models`). The time course settings default to the module
+    settings (`START`, `END`, `STEPS`, tolerances).
+    """
+    from COPASI import CDataModel
+    from basico import load_model_from_string, remove_datamodel
+    from code.comparisonpy.copasi_example import run_time_course_array
+
+    _check_options(mode, output_format, simulator="copasi", source=source)
+    tc = time_course if time_course is not None else TimeCourseSettings()
+
     results = []
     n_models = len(model_paths)
     for k, path in enumerate(model_paths):
-        model_id = path.stem
-        try:
-            # load model
-            start_time = time.time()
-            model: CDataModel = load_model(str(path))
-            load_time = time.time() - start_time  # [s]
-            if model is None:
-                raise RuntimeError(f"COPASI model could not be loaded: '{model_id}'")
-
-            # run optimization
-            start_time = time.time()
-            df = run_copasi_time_course(
-                model=model,
-                start_time=START,
-                duration=END-START,
-                step_number=STEPS,
-                a_tol=ABSOLUTE_TOLERANCE,
-                r_tol=RELATIVE_TOLERANCE,
-            )
-            simulate_time = time.time() - start_time  # [s]
-            status = "success"
-        except (ValueError, RuntimeError) as err:
-            print(f"ERROR in '{model_id}'", err)
-            simulate_time = np.NaN
-            status = "failure"
-
-        # store result
-        df.to_csv(output_dir / f"{model_id}.tsv", sep="\t", index=False)
-        res = (model_id, status, load_time, simulate_time)
-        results.append(res)
-
-        print("[{}/{}]".format(k, n_models), res)
-
-    df = pd.DataFrame(data=results, columns=("model", "status", "load_time", "simulate_time"))
+        model_id = path_model_id(path)
+        model = None
+        # result buffer reused by all repeats of the model
+        buffer = None
+        model_results = []
+        repeats = _repeat_controller(n_repeat, mode=mode, adaptive=adaptive, ledger=ledger,
+                                     model_id=model_id, simulator="copasi")
+        for repeat in repeats:
+            timer = PhaseTimer()
+            memory = MemoryTracker(enabled=track_memory)
+            try:
+                if mode == MODE_COLD or model is None:
+                    # load model (release previous model first)
+                    if model is not None:
+                        remove_datamodel(model)
+                    model = None
+                    with memory.measure("load"):
+                        with timer.phase("read"):
+                            sbml_str = read_sbml(path)
+                        # SBML import includes the model compilation
+                        with timer.phase("parse"):
+                            model: CDataModel = load_model_from_string(sbml_str)
+                        if model is None:
+                            raise RuntimeError(f"COPASI model could not be loaded: '{model_id}'")
+                        with timer.phase("compile"):
+                            model.getModel().compileIfNecessary()
+                    species_ids = copasi_species_ids(model.getModel())
+
+                # run optimization (starting from initial values)
+                with memory.measure("simulate"):
+                    result = run_time_course_array(
+                        model=model,
+                        start_time=tc.start,
+                        duration=tc.end - tc.start,
+                        step_number=tc.steps,
+                        a_tol=tc.absolute_tolerance,
+                        r_tol=tc.relative_tolerance,
+                        use_initial_values=True,
+                        timer=timer,
+                        out=buffer,
+                    )
+                    buffer = result.data
+                simulate_time = timer.simulate_time  # [s]
+                status = "success"
+
+                # store result (species by SBML id)
+                result = ResultArray(result.data, columns=species_columns(result.columns,
+                                                                          species_ids))
+                _write_result(result, output_dir, model_id, "copasi", repeat,
+                              output_format, trajectory_dir)
+            except (ValueError, RuntimeError) as err:
+                print(f"ERROR in '{model_id}'", err)
+                simulate_time = np.NaN
+                status = "failure"
+
+            load_time = timer.load_time  # [s]
+            repeats.add(load_time=load_time, simulate_time=simulate_time)
+            res = (model_id, status, load_time, simulate_time, repeat, mode, source)
+            _add_result(model_results, res + timer.row() + memory.row(), ledger, "copasi")
+
+            print("[{}/{}]".format(k, n_models), res)
+
+        _complete_model(results, model_results, model_id, repeats, ledger, "copasi")
+
+    df = pd.DataFrame(data=results, columns=RESULT_COLUMNS)
+    return df
+
+
+def _run_models_sbscl(model_paths: List[Path], output_dir: Path, simulator: str,
+                      fresh_jvm: bool, warmup: int, n_repeat: int = 1,
+                      mode: str = MODE_COLD, output_format: str = "tsv",
+                      adaptive: Optional[AdaptiveSettings] = None,
+                      ledger: Optional[RunLedger] = None,
+                      time_course: Optional[TimeCourseSettings] = None,
+                      trajectory_dir: Path = TRAJECTORY_DIR,
+                      source: str = SOURCE_SBML) -> pd.DataFrame:
+    """ODE simulation for all given models with the SBSCL harness.
+
+    With fresh_jvm every repeat runs in a new JVM, otherwise all models run
+    in a single long-lived JVM and the repeats of every model follow warmup
+    unrecorded runs of the model. A JVM which died is restarted.
+    """
+    from code.comparisonpy.sbscl import SbsclHarness
+
+    _check_options(mode, output_format, simulator=simulator, source=source)
+    tc = time_course if time_course is not None else TimeCourseSettings()
+    settings = dict(start=tc.start, end=tc.end, steps=tc.steps,
+                    absolute_tolerance=tc.absolute_tolerance,
+                    relative_tolerance=tc.relative_tolerance)
+
+    harness = None
+    results = []
+    n_models = len(model_paths)
+    try:
+        for k, path in enumerate(model_paths):
+            model_id = path_model_id(path)
+            tsv_path = output_dir / f"{model_id}.tsv"
+            loaded = False
+            warmed_up = fresh_jvm or warmup == 0
+            model_results = []
+            repeats = _repeat_controller(n_repeat, mode=mode, adaptive=adaptive, ledger=ledger,
+                                         model_id=model_id, simulator=simulator)
+            for repeat in repeats:
+                timer = PhaseTimer()
+                # the memory of the JVM is not tracked
+                memory = MemoryTracker(enabled=False)
+                try:
+                    if fresh_jvm or harness is None or not harness.alive:
+                        if harness is not None:
+                            harness.close()
+                        harness = SbsclHarness()
+                        # new JVM: load and warm up the model again
+                        loaded = False
+                        warmed_up = fresh_jvm or warmup == 0
+                    if not warmed_up:
+                        harness.warmup(path, n_runs=warmup, **settings)
+                        warmed_up = True
+
+                    status = harness.simulate(
+                        path, reload=mode == MODE_COLD or not loaded, output_path=tsv_path,
+                        timer=timer, **settings
+                    )
+                    loaded = True
+                    simulate_time = timer.simulate_time  # [s]
+
+                    if output_format != "tsv":
+                        df = pd.read_csv(tsv_path, sep="\t", dtype=np.float64)
+                        write_trajectory(df.values, columns=df.columns, model_id=model_id,
+                                         simulator=simulator, repeat=repeat,
+                                         fmt=output_format, trajectory_dir=trajectory_dir)
+                except RuntimeError as err:
+                    print(f"ERROR in '{model_id}'", err)
+                    loaded = False
+                    simulate_time = np.NaN
+                    status = "failure"
+                finally:
+                    if fresh_jvm and harness is not None:
+                        harness.close()
+                        harness = None
+
+                load_time = timer.load_time  # [s]
+                repeats.add(load_time=load_time, simulate_time=simulate_time)
+                res = (model_id, status, load_time, simulate_time, repeat, mode, source)
+                _add_result(model_results, res + timer.row() + memory.row(), ledger, simulator)
+
+                print("[{}/{}]".format(k, n_models), res)
+
+            _complete_model(results, model_results, model_id, repeats, ledger, simulator)
+    finally:
+        if harness is not None:
+            harness.close()
+
+    df = pd.DataFrame(data=results, columns=RESULT_COLUMNS)
+    return df
+
+
+def run_models_sbscl(model_paths: List[Path], output_dir: Path, n_repeat: int = 1,
+                     mode: str = MODE_COLD, output_format: str = "tsv",
+                     adaptive: Optional[AdaptiveSettings] = None,
+                     track_memory: bool = False,
+                     ledger: Optional[RunLedger] = None,
+                     time_course: Optional[TimeCourseSettings] = None,
+                     trajectory_dir: Path = TRAJECTORY_DIR,
+                     source: str = SOURCE_SBML, warmup: Optional[int] = None) -> pd.DataFrame:
+    """ODE simulation for all given models with SBSCL in a warm JVM.
+
+    All models run in a single long-lived JVM (see `sbscl`). Before the
+    repeats of a model the model is simulated warmup times (default
+    `sbscl.WARMUP_RUNS`) without recording, so the JIT compilation is not
+    part of the timings.
+
+    The phases are timed in the JVM: 'read' (file read), 'parse' (JSBML),
+    'compile' (SBMLinterpreter), 'setup' (solver and initial values, reset
+    in warm mode), 'solve' (Rosenbrock solver) and 'extract' (copy of the
+    result table). Trajectories are written as TSV to output_dir by the JVM,
+    for the columnar formats the TSV is converted after the run. The memory
+    of the JVM is not tracked (track_memory is ignored).
+    """
+    from code.comparisonpy.sbscl import WARMUP_RUNS
+
+    return _run_models_sbscl(
+        model_paths, output_dir, simulator="sbscl", fresh_jvm=False,
+        warmup=warmup if warmup is not None else WARMUP_RUNS, n_repeat=n_repeat, mode=mode,
+        output_format=output_format, adaptive=adaptive, ledger=ledger,
+        time_course=time_course, trajectory_dir=trajectory_dir, source=source,
+    )
+
+
+def run_models_sbscl_cold(model_paths: List[Path], output_dir: Path, n_repeat: int = 1,
+                          mode: str = MODE_COLD, output_format: str = "tsv",
+                          adaptive: Optional[AdaptiveSettings] = None,
+                          track_memory: bool = False,
+                          ledger: Optional[RunLedger] = None,
+                          time_course: Optional[TimeCourseSettings] = None,
+                          trajectory_dir: Path = TRAJECTORY_DIR,
+                          source: str = SOURCE_SBML) -> pd.DataFrame:
+    """ODE simulation for all given models with SBSCL in a cold JVM.
+
+    Every repeat runs in a fresh JVM without warm-up, i.e. the timings include
+    class loading and JIT compilation (the JVM startup is not part of the load
+    time). The warm mode is equal to the cold mode. See `run_models_sbscl`
+    for the phases.
+    """
+    return _run_models_sbscl(
+        model_paths, output_dir, simulator="sbscl_cold", fresh_jvm=True, warmup=0,
+        n_repeat=n_repeat, mode=mode, output_format=output_format, adaptive=adaptive,
+        ledger=ledger, time_course=time_course, trajectory_dir=trajectory_dir, source=source,
+    )
+
+
+ODE_SIMULATORS = {
+    "roadrunner": run_models_roadrunner,
+    "copasi": run_models_copasi,
+    "sbscl": run_models_sbscl,
+    "sbscl_cold": run_models_sbscl_cold,
+}
+
+
+def run_model_repeats(simulator: str, path: Path, n_repeat: int, output_dir: Path,
+                      mode: str = MODE_COLD, output_format: str = "tsv",
+                      adaptive: Optional[AdaptiveSettings] = None,
+                      track_memory: bool = False,
+                      ledger: Optional[RunLedger] = None,
+                      time_course: Optional[TimeCourseSettings] = None,
+                      trajectory_dir: Path = TRAJECTORY_DIR,
+                      source: str = SOURCE_SBML) -> pd.DataFrame:
+    """Simulate a single model repeatedly with the given simulator.
+
+    Used as task in the parallel mode, so that all repeats of a model run
+    in the same worker process.
+    """
+    f_run = ODE_SIMULATORS[simulator]
+    return f_run([path], output_dir=output_dir, n_repeat=n_repeat, mode=mode,
+                 output_format=output_format, adaptive=adaptive, track_memory=track_memory,
+                 ledger=ledger, time_course=time_course, trajectory_dir=trajectory_dir,
+                 source=source)
+
+
+def failed_model_repeats(task: tuple, status: str) -> pd.DataFrame:
+    """Results for a model task which timed out or crashed the worker.
+
+    Results are only created for the repeats which were not finished before
+    the timeout or crash (all repeats without ledger). They are committed to
+    the ledger of the task (with the worker id and CPU affinity of the failed
+    worker, see `parallel.run_tasks`) and the model is marked as completed.
+    """
+    simulator, path, n_repeat, output_dir, mode, output_format, adaptive, track_memory, ledger, \
+        _, _, source = task
+    missing = list(range(1, n_repeat + 1))
+    n_finished = 0
+    if ledger is not None:
+        missing = ledger.missing_repeats(path_model_id(path), simulator, n_repeat)
+        n_finished = len(ledger.repeats(path_model_id(path), simulator))
+    df = pd.DataFrame({
+        "model": path_model_id(path),
+        "status": status,
+        "load_time": np.nan,
+        "simulate_time": np.nan,
+        "repeat": missing,
+        "mode": mode,
+        "source": source,
+    })
+    for column in PHASE_COLUMNS + MEMORY_COLUMNS + SUMMARY_COLUMNS:
+        df[column] = np.nan
+    df["n_samples"] = n_finished
+    if ledger is not None:
+        for data in df[list(RESULT_COLUMNS)].to_dict(orient="records"):
+            ledger.add(data["model"], simulator, data["repeat"], data)
+        summary = {column: np.nan for column in SUMMARY_COLUMNS}
+        summary["n_samples"] = n_finished
+        ledger.complete(path_model_id(path), simulator, summary)
     return df
 
 
-def run_models(simulator: str, n_repeat: int):
-    """Optimize the models repeatidly."""
-    model_paths = BIOMODELS_MODEL_PATHS
+def run_models(simulator: str, n_repeat: int, n_workers: Optional[int] = None,
+               timeout: Optional[float] = TIMEOUT, pin_cpus: bool = True,
+               mode: str = MODE_COLD, output_format: str = "tsv",
+               adaptive: Optional[AdaptiveSettings] = None,
+               track_memory: bool = False, resume: bool = True,
+               query: Optional[str] = None, models: Optional[List[str]] = None,
+               time_course: Optional[TimeCourseSettings] = None,
+               source: str = SOURCE_SBML, collection: str = "biomodels",
+               results_dir: Path = RESULTS_DIR):
+    """Optimize the models repeatidly.
+
+    In the parallel mode (n_workers is not None) every model is simulated in
+    its own worker process. Models exceeding the timeout or crashing the
+    worker are stored with status 'timeout' or 'crash'.
+
+    With adaptive settings every model is repeated at least n_repeat times and
+    until the confidence interval of the median times is narrower than the
+    target width (or the budget is exhausted). The number of samples and the
+    CI bounds are stored next to the times.
+
+    Every repeat is committed to the run ledger, the result TSV is generated
+    from the ledger. An interrupted sweep is continued by rerunning with the
+    same settings: completed models are skipped, partially finished models
+    continue with the next repeat. The package versions of the simulator are
+    part of the settings, i.e. after an upgrade a new sweep is started.
+
+    Only the backend of the simulator is imported, before the benchmark in
+    serial mode and in the worker startup in parallel mode (the startup time
+    of every worker is stored with the results).
+
+    The models are selected from the model catalog and run in the order of
+    decreasing model size (longest jobs first). Models not supported by the
+    simulator (see `catalog.UNSUPPORTED_QUERIES`) are stored as 'skipped'.
 
-    f_dict = {
-        "roadrunner": run_models_roadrunner,
-        "copasi": run_models_copasi,
-    }
+    :param simulator: simulator key
+    :param n_repeat: number of repeats per model (minimal number in adaptive mode)
+    :param mode: benchmark mode, 'cold' (load every repeat) or 'warm' (load once)
+    :param output_format: trajectory output, 'tsv' or columnar dataset ('arrow', 'parquet')
+    :param adaptive: settings for adaptive number of repeats, fixed n_repeat if None
+    :param track_memory: record peak RSS and tracemalloc peak (slows down timings)
+    :param n_workers: number of parallel worker processes, runs serially if None
+    :param timeout: wall-clock timeout per model [s] (parallel mode)
+    :param pin_cpus: pin every worker to a single CPU (parallel mode)
+    :param resume: continue the last sweep with identical settings (and package versions),
+        start a new sweep otherwise
+    :param query: catalog query for selecting models, e.g. 'n_events == 0', all models if None
+    :param models: BioModels ids, all models (of the query) if None
+    :param time_course: time course settings (tolerances), module settings if None
+    :param source: model source, 'sbml' or 'state_cache' (see `ODE_SOURCES`), results of
+        other sources than 'sbml' are stored as `<collection>_<simulator>_<source>.tsv`
+    :param collection: model collection, 'biomodels' or the ODE models of 'synthetic',
+        results are stored as `<collection>_<simulator>.tsv`
+    :param results_dir: output directory of the results (`<results_dir>/ode`) and the ledger
+    """
+    _check_options(mode, output_format, simulator=simulator, source=source)
+    tc = time_course if time_course is not None else TimeCourseSettings()
+    output_dir = results_dir / "ode" / simulator
+    output_dir.mkdir(parents=True, exist_ok=True)
+    trajectory_dir = results_dir / "ode" / TRAJECTORY_DIR.name
+    ledger = RunLedger.open(config={
+        "dataset": "ode", "n_repeat": n_repeat, "mode": mode, "output_format": output_format,
+        "source": source, "collection": collection, "adaptive": adaptive,
+        "track_memory": track_memory, "start": tc.start, "end": tc.end, "steps": tc.steps,
+        "absolute_tolerance": tc.absolute_tolerance, "relative_tolerance": tc.relative_tolerance,
+        "versions": package_versions(simulator),
+    }, resume=resume, path=results_dir / LEDGER_PATH.name)
+    build_catalog([collection])
+    model_paths = [
+        path for path in catalog_model_paths(collection, query=query, model_ids=models,
+                                             dataset="ode")
+        if not ledger.is_complete(path_model_id(path), simulator)
+    ]
 
-    f_run = f_dict[simulator]
-    dfs = []
-    for k in range(n_repeat):
-        df = f_run(model_paths, output_dir=RESULTS_DIR / "ode" / simulator)
-        df["repeat"] = k + 1
-        dfs.append(df)
+    if n_workers is None:
+        import_modules(SIMULATOR_MODULES[simulator])
+        f_run = ODE_SIMULATORS[simulator]
+        f_run(model_paths, output_dir=output_dir, n_repeat=n_repeat, mode=mode,
+              output_format=output_format, adaptive=adaptive, track_memory=track_memory,
+              ledger=ledger, time_course=tc, trajectory_dir=trajectory_dir, source=source)
+    else:
+        tasks = [
+            (simulator, path, n_repeat, output_dir, mode, output_format, adaptive, track_memory,
+             ledger, tc, trajectory_dir, source)
+            for path in model_paths
+        ]
+        run_tasks(
+            run_model_repeats, tasks, n_workers=n_workers, pin_cpus=pin_cpus,
+            timeout=timeout, on_error=failed_model_repeats,
+            initializer=import_modules, initargs=(SIMULATOR_MODULES[simulator],),
+        )
 
-    df = pd.concat(dfs)
-    df.sort_values(by=["model", "repeat"], inplace=True)
+    df = ledger.to_dataframe(simulator, columns=RESULT_COLUMNS)
+    df[VERSIONS_COLUMN] = versions_value(simulator)
     df.to_csv(
-        RESULTS_DIR / "ode" / f"biomodels_{simulator}.tsv",
+        results_dir / "ode" / f"{collection}_{result_name(simulator, source)}.tsv",
         sep="\t", index=False
     )
 
@@ -0,0 +1,215 @@
+"""
+Process based scheduler for running benchmark tasks in parallel.
+
+Every task (e.g. all repeats of a single model) is executed in a fresh
+worker process, so a model is pinned to exactly one process and the timings
+of the repeats stay comparable. Workers can optionally be pinned to a single
+CPU; the worker id and the CPU affinity are stored with the results so that
+contention effects can be spotted.
+
+Every task pays the startup of a fresh interpreter, i.e. the imports of the
+task module and of the simulator backends (preloaded by an initializer).
+The startup time of every worker is stored with the results (`startup_time`).
+
+Tasks exceeding the wall-clock timeout are killed and workers dying in native
+code (e.g. segfaults in the simulators) are replaced by a new process, so a
+single model can neither stall nor kill the complete sweep.
+"""
+import importlib
+import math
+import multiprocessing
+import os
+import time
+from multiprocessing.connection import wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+# start method for worker processes, 'spawn' gives every task a clean
+# interpreter without simulator state inherited from the parent
+MP_CONTEXT = "spawn"
+POLL_INTERVAL = 0.1  # [s]
+
+# status of tasks which did not return a result
+STATUS_TIMEOUT = "timeout"
+STATUS_CRASH = "crash"
+
+# worker id, CPU affinity and startup time of the current worker process, None in
+# the main process
+_WORKER: Optional[Dict[str, Any]] = None
+
+
+def available_cpus() -> List[int]:
+    """Get the CPUs the current process is allowed to run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def current_worker() -> Dict[str, Any]:
+    """Worker id, CPU affinity and startup time of the current worker process.
+
+    Empty in the main process.
+    """
+    return dict(_WORKER) if _WORKER is not None else {}
+
+
+def import_modules(modules: Sequence[str]):
+    """Import the modules, worker initializer for preloading simulator backends."""
+    for module in modules:
+        importlib.import_module(module)
+
+
+def _run_worker(conn, worker_id: int, cpus: Optional[List[int]], f: Callable, args: Tuple,
+                initializer: Optional[Callable], initargs: Tuple, start_time: float):
+    """Execute a single task in the worker process and send the result back.
+
+    The startup time is the wall-clock time from the start of the process
+    (in the parent) until the worker is ready to run the task, i.e. the
+    interpreter startup, unpickling of the task (imports the module of f) and
+    the initializer.
+    """
+    global _WORKER
+    if cpus is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    if initializer is not None:
+        initializer(*initargs)
+    startup_time = time.time() - start_time  # [s]
+    affinity = ",".join(str(cpu) for cpu in available_cpus())
+    _WORKER = {"worker": worker_id, "cpu_affinity": affinity, "startup_time": startup_time}
+
+    df: pd.DataFrame = f(*args)
+    df["worker"] = worker_id
+    df["cpu_affinity"] = affinity
+    df["startup_time"] = startup_time
+    conn.send(df)
+    conn.close()
+
+
+def _on_error(on_error: Callable[[Tuple, str], pd.DataFrame], args: Tuple, status: str,
+              worker: Dict[str, Any]) -> pd.DataFrame:
+    """Call on_error with the information of the failed worker as current worker."""
+    global _WORKER
+    _WORKER = worker
+    try:
+        return on_error(args, status)
+    finally:
+        _WORKER = None
+
+
+def run_tasks(f: Callable[..., pd.DataFrame], tasks: Sequence[Tuple],
+              n_workers: int, pin_cpus: bool = True,
+              timeout: Optional[float] = None,
+              on_error: Optional[Callable[[Tuple, str], pd.DataFrame]] = None,
+              initializer: Optional[Callable] = None, initargs: Tuple = (),
+              ) -> List[pd.DataFrame]:
+    """Run `f(*args)` for all args in tasks with n_workers processes.
+
+    Every task is executed in its own process. At most n_workers processes
+    are running at the same time. If pin_cpus is set, worker k is pinned to
+    the k-th available CPU (round robin if there are more workers than CPUs).
+
+    Tasks running longer than timeout are killed. If on_error is given,
+    `on_error(args, status)` creates the result for tasks which were killed
+    (status 'timeout') or whose worker died (status 'crash'), and the
+    scheduler continues with a new worker. Without on_error a RuntimeError
+    is raised. on_error runs in the main process with the worker id and CPU
+    affinity of the failed worker as `current_worker`, so results it commits
+    (e.g. to the run ledger) carry the worker information.
+
+    The initializer is called with initargs in every worker before the task
+    (e.g. `import_modules` for importing the simulator backends), it is part
+    of the reported worker startup time.
+
+    :param f: module level function returning a DataFrame
+    :param tasks: argument tuples for f
+    :param n_workers: number of parallel worker processes
+    :param pin_cpus: pin every worker to a single CPU
+    :param timeout: wall-clock timeout per task [s], no timeout if None
+    :param on_error: creates result DataFrame for timeouts and crashes
+    :param initializer: module level function called in every worker before the task
+    :param initargs: arguments for initializer
+    :return: list of result DataFrames in order of tasks
+    """
+    if n_workers < 1:
+        raise ValueError(f"n_workers must be >= 1, but is '{n_workers}'")
+
+    ctx = multiprocessing.get_context(MP_CONTEXT)
+    cpus = available_cpus()
+    n_tasks = len(tasks)
+    pending = list(enumerate(tasks))
+    free_workers = list(range(n_workers))
+    # worker_id -> (process, connection, task index, start time)
+    running: Dict[int, Tuple] = {}
+    results: List[Optional[pd.DataFrame]] = [None] * n_tasks
+
+    while pending or running:
+        # fill free worker slots
+        while pending and free_workers:
+            worker_id = free_workers.pop(0)
+            k, args = pending.pop(0)
+            worker_cpus = [cpus[worker_id % len(cpus)]] if pin_cpus else None
+            conn_recv, conn_send = ctx.Pipe(duplex=False)
+            process = ctx.Process(
+                target=_run_worker,
+                args=(conn_send, worker_id, worker_cpus, f, args, initializer, initargs,
+                      time.time()),
+                daemon=True,
+            )
+            process.start()
+            conn_send.close()
+            running[worker_id] = (process, conn_recv, k, time.time())
+
+        wait(
+            [conn for (_, conn, _, _) in running.values()] +
+            [process.sentinel for (process, _, _, _) in running.values()],
+            timeout=POLL_INTERVAL,
+        )
+
+        # collect finished workers
+        for worker_id, (process, conn, k, start_time) in list(running.items()):
+            status = None
+            # poll is also true on EOF, i.e. when the worker died
+            if conn.poll():
+                try:
+                    results[k] = conn.recv()
+                except EOFError:
+                    status = STATUS_CRASH
+                process.join()
+            elif timeout is not None and time.time() - start_time > timeout:
+                process.kill()
+                process.join()
+                status = STATUS_TIMEOUT
+            else:
+                continue
+            conn.close()
+
+            if status is not None:
+                print(f"ERROR: worker {worker_id} {status} (exitcode "
+                      f"'{process.exitcode}') for task: {tasks[k]}")
+                if on_error is None:
+                    raise RuntimeError(
+                        f"Worker '{worker_id}' {status} with exitcode "
+                        f"'{process.exitcode}' for task: {tasks[k]}"
+                    )
+                worker_cpus = [cpus[worker_id % len(cpus)]] if pin_cpus else cpus
+                worker = {"worker": worker_id,
+                          "cpu_affinity": ",".join(str(cpu) for cpu in worker_cpus),
+                          "startup_time": math.nan}
+                df = _on_error(on_error, tasks[k], status, worker)
+                for key, value in worker.items():
+                    df[key] = value
+                results[k] = df
+
+            del running[worker_id]
+            free_workers.append(worker_id)
+            print("[{}/{}]".format(n_tasks - len(pending) - len(running), n_tasks),
+                  f"worker {worker_id} finished task {k}")
+
+    startup_times = pd.Series([df.startup_time.iloc[0] for df in results if len(df)],
+                              dtype=float).dropna()
+    if len(startup_times):
+        print(f"worker startup time [s]: median {startup_times.median():.3f}, "
+              f"max {startup_times.max():.3f} ({len(startup_times)} workers)")
+
+    return results
@@ -0,0 +1,415 @@
+"""
+Detection of performance regressions between benchmark runs.
+
+The result TSVs of a run are stored as named baseline in
+`results/baselines/<name>` (with the versions of the simulator packages).
+The results of every model collection (`<collection>_<simulator>.tsv`) are
+stored and compared separately.
+The repeat samples of the current results are compared per model, simulator
+and time key (load_time, simulate_time) against the baseline:
+
+- the change is the ratio of the median times (current / baseline) with a
+  bootstrap confidence interval,
+- the significance is tested with the two-sided Mann-Whitney U test on the
+  repeat samples (exact distribution without ties, normal approximation
+  with tie correction otherwise).
+
+A model is flagged as 'regression' ('improvement') if the ratio exceeds
+1 + threshold (is below 1 / (1 + threshold)) and the change is significant.
+The report is ranked by the ratio, largest regressions first. The exit code
+of the command line is 1 if any regression was found, so it can be used as
+gate for simulator upgrades.
+
+The result TSVs store the package versions of the simulator (column
+'versions'). Results with the package versions of the baseline (or a copy
+of the baseline results) are not compared, so a gate which reran the
+benchmark without the upgrade fails instead of passing without a change.
+"""
+import json
+import math
+import shutil
+import sys
+import time
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+from importlib import metadata
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from code.comparisonpy import BASE_DIR, RESULTS_DIR
+from code.comparisonpy.catalog import DATASET_COLLECTIONS
+
+BASELINES_DIR = RESULTS_DIR / "baselines"
+METADATA_FILENAME = "baseline.json"
+
+TIME_KEYS = ["load_time", "simulate_time"]
+THRESHOLD = 0.10  # relative change of the median time
+ALPHA = 0.05  # significance level of the Mann-Whitney U test
+N_BOOTSTRAP = 2000
+SEED = 42
+EXACT_MAX_SAMPLES = 20  # exact U distribution for samples up to this size
+
+STATUS_REGRESSION = "regression"
+STATUS_IMPROVEMENT = "improvement"
+STATUS_UNCHANGED = "unchanged"
+STATUS_MISSING = "missing"
+
+VERSIONS_COLUMN = "versions"  # package versions (JSON) in the result TSVs
+
+# python distributions (or maven artifacts of the SBSCL harness) of the
+# simulators, versions are stored with the baseline
+SIMULATOR_PACKAGES = {
+    "cobrapy": ["cobra", "optlang"],
+    "cameo": ["cameo", "cobra", "optlang"],
+    "roadrunner": ["libroadrunner"],
+    "copasi": ["python-copasi", "basico"],
+    "sbscl": ["sbscl"],
+    "sbscl_cold": ["sbscl"],
+}
+# maven artifacts, the versions are read from the pom of the harness
+MAVEN_PACKAGES = {"sbscl"}
+POM_PATH = BASE_DIR / "pom.xml"
+
+REPORT_COLUMNS = [
+    "model", "simulator", "time_key", "status", "ratio", "ratio_ci_low", "ratio_ci_high",
+    "p_value", "median_baseline", "median_current", "n_baseline", "n_current",
+]
+
+
+def _results_prefix(dataset: str, collection: Optional[str] = None) -> str:
+    """Prefix of the result TSVs of the dataset.
+
+    :param collection: model collection of the results, default collection
+        of the dataset if None
+    """
+    if dataset not in DATASET_COLLECTIONS:
+        raise ValueError(f"Unsupported dataset '{dataset}', use 'fba' or 'ode'")
+    return collection if collection is not None else DATASET_COLLECTIONS[dataset]
+
+
+def _metadata_key(dataset: str, simulator: str, collection: Optional[str] = None) -> str:
+    """Key of the results in the baseline metadata."""
+    prefix = _results_prefix(dataset, collection)
+    if prefix == DATASET_COLLECTIONS[dataset]:
+        return f"{dataset}/{simulator}"
+    return f"{dataset}/{prefix}/{simulator}"
+
+
+def result_path(dataset: str, simulator: str, results_dir: Path = RESULTS_DIR,
+                collection: Optional[str] = None) -> Path:
+    """Path of the result TSV of the simulator."""
+    return results_dir / dataset / f"{_results_prefix(dataset, collection)}_{simulator}.tsv"
+
+
+def _maven_version(artifact_id: str, pom_path: Path = POM_PATH) -> Optional[str]:
+    """Version of the maven dependency in the pom (None if not a dependency)."""
+    if not pom_path.exists():
+        return None
+    ns = {"m": "http://maven.apache.org/POM/4.0.0"}
+    for dependency in ET.parse(pom_path).getroot().iterfind("m:dependencies/m:dependency", ns):
+        if dependency.findtext("m:artifactId", namespaces=ns) == artifact_id:
+            return dependency.findtext("m:version", namespaces=ns)
+    return None
+
+
+def package_versions(simulator: str) -> Dict[str, Optional[str]]:
+    """Versions of the installed packages of the simulator (None if not installed)."""
+    versions = {}
+    for package in SIMULATOR_PACKAGES.get(simulator, []):
+        if package in MAVEN_PACKAGES:
+            versions[package] = _maven_version(package)
+            continue
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def versions_value(simulator: str) -> str:
+    """Package versions of the simulator for the 'versions' column of the results."""
+    return json.dumps(package_versions(simulator), sort_keys=True)
+
+
+def result_versions(df: pd.DataFrame) -> Optional[Dict[str, Optional[str]]]:
+    """Package versions stored in the results, None for results without versions."""
+    if VERSIONS_COLUMN not in df.columns:
+        return None
+    values = df[VERSIONS_COLUMN].dropna()
+    return json.loads(values.iloc[0]) if len(values) else None
+
+
+def save_baseline(name: str, dataset: str, simulators: Sequence[str],
+                  results_dir: Path = RESULTS_DIR,
+                  baselines_dir: Path = BASELINES_DIR,
+                  collection: Optional[str] = None) -> Path:
+    """Store the current results of the simulators as baseline.
+
+    An existing baseline of the dataset, collection and simulator is replaced.
+    The package versions of the results are stored in the metadata (the
+    installed versions for results without versions).
+
+    :param collection: model collection of the results, default collection
+        of the dataset if None
+    :return: directory of the baseline
+    """
+    baseline_dir = baselines_dir / name
+    (baseline_dir / dataset).mkdir(parents=True, exist_ok=True)
+    meta = read_baseline_metadata(name, baselines_dir=baselines_dir)
+    for simulator in simulators:
+        path = result_path(dataset, simulator, results_dir=results_dir, collection=collection)
+        if not path.exists():
+            raise ValueError(f"No results for '{simulator}': '{path}'")
+        shutil.copyfile(path, result_path(dataset, simulator, results_dir=baseline_dir,
+                                          collection=collection))
+        versions = result_versions(pd.read_csv(path, sep="\t"))
+        meta[_metadata_key(dataset, simulator, collection)] = {
+            "created": time.time(),
+            "source": str(path),
+            "versions": versions if versions is not None else package_versions(simulator),
+        }
+    with open(baseline_dir / METADATA_FILENAME, "w") as f_out:
+        json.dump(meta, f_out, indent=2, sort_keys=True)
+    return baseline_dir
+
+
+def read_baseline_metadata(name: str, baselines_dir: Path = BASELINES_DIR) -> Dict[str, Dict]:
+    """Metadata of the baseline (creation time, package versions), empty if not existing."""
+    path = baselines_dir / name / METADATA_FILENAME
+    if not path.exists():
+        return {}
+    with open(path, "r") as f_in:
+        return json.load(f_in)
+
+
+def list_baselines(baselines_dir: Path = BASELINES_DIR) -> List[str]:
+    """Names of the stored baselines."""
+    if not baselines_dir.exists():
+        return []
+    return sorted(p.parent.name for p in baselines_dir.glob(f"*/{METADATA_FILENAME}"))
+
+
+@lru_cache(maxsize=None)
+def _u_distribution(n1: int, n2: int) -> np.ndarray:
+    """Number of permutations for every value of U (without ties)."""
+    if n1 == 0 or n2 == 0:
+        return np.ones(1)
+    # f(u; n1, n2) = f(u - n2; n1 - 1, n2) + f(u; n1, n2 - 1)
+    counts = np.zeros(n1 * n2 + 1)
+    a = _u_distribution(n1 - 1, n2)
+    b = _u_distribution(n1, n2 - 1)
+    counts[n2:n2 + len(a)] += a
+    counts[:len(b)] += b
+    return counts
+
+
+def _ranks(x: np.ndarray) -> np.ndarray:
+    """Ranks (starting at 1) with average ranks for ties."""
+    order = np.argsort(x, kind="mergesort")
+    ranks = np.empty(len(x))
+    sorted_x = x[order]
+    # start index of every group of equal values
+    starts = np.flatnonzero(np.r_[True, sorted_x[1:] != sorted_x[:-1]])
+    ends = np.r_[starts[1:], len(x)]
+    for start, end in zip(starts, ends):
+        ranks[order[start:end]] = (start + end + 1) / 2.0
+    return ranks
+
+
+def mann_whitney_u(x: Sequence[float], y: Sequence[float]) -> Tuple[float, float]:
+    """Two-sided Mann-Whitney U test.
+
+    The exact distribution of U is used for samples without ties (up to
+    EXACT_MAX_SAMPLES per sample), the normal approximation with tie and
+    continuity correction otherwise.
+
+    :return: U statistic of x, p-value (NaN if a sample is empty)
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n1, n2 = len(x), len(y)
+    if n1 == 0 or n2 == 0:
+        return math.nan, math.nan
+
+    values = np.concatenate([x, y])
+    ranks = _ranks(values)
+    u = ranks[:n1].sum() - n1 * (n1 + 1) / 2.0
+    has_ties = len(np.unique(values)) < len(values)
+
+    if not has_ties and max(n1, n2) <= EXACT_MAX_SAMPLES:
+        counts = _u_distribution(n1, n2)
+        cdf = np.cumsum(counts) / counts.sum()
+        k = int(round(min(u, n1 * n2 - u)))
+        return float(u), min(1.0, float(2.0 * cdf[k]))
+
+    n = n1 + n2
+    _, tie_counts = np.unique(values, return_counts=True)
+    tie_term = (tie_counts ** 3 - tie_counts).sum() / (n * (n - 1))
+    sigma = math.sqrt(n1 * n2 / 12.0 * ((n + 1) - tie_term))
+    if sigma == 0.0:
+        return float(u), 1.0
+    z = (abs(u - n1 * n2 / 2.0) - 0.5) / sigma
+    return float(u), min(1.0, math.erfc(max(z, 0.0) / math.sqrt(2.0)))
+
+
+def bootstrap_ratio_ci(baseline: Sequence[float], current: Sequence[float],
+                       n_bootstrap: int = N_BOOTSTRAP, confidence: float = 0.95,
+                       seed: Optional[int] = SEED) -> Tuple[float, float]:
+    """Bootstrap confidence interval of the ratio of the medians (current / baseline)."""
+    baseline = np.asarray(baseline, dtype=float)
+    current = np.asarray(current, dtype=float)
+    if len(baseline) == 0 or len(current) == 0:
+        return math.nan, math.nan
+    rng = np.random.default_rng(seed)
+    # resample all bootstrap replicates at once (n_bootstrap x n)
+    b = np.median(rng.choice(baseline, size=(n_bootstrap, len(baseline))), axis=1)
+    c = np.median(rng.choice(current, size=(n_bootstrap, len(current))), axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = c / b
+    q = (1.0 - confidence) / 2.0
+    low, high = np.nanquantile(ratios, [q, 1.0 - q])
+    return float(low), float(high)
+
+
+def classify(ratio: float, p_value: float, threshold: float = THRESHOLD,
+             alpha: float = ALPHA) -> str:
+    """Status of the change of the median time."""
+    if math.isnan(ratio) or math.isnan(p_value):
+        return STATUS_MISSING
+    if p_value < alpha:
+        if ratio > 1.0 + threshold:
+            return STATUS_REGRESSION
+        if ratio < 1.0 / (1.0 + threshold):
+            return STATUS_IMPROVEMENT
+    return STATUS_UNCHANGED
+
+
+def _samples(df: pd.DataFrame, time_key: str) -> Dict[str, np.ndarray]:
+    """Valid repeat samples per model."""
+    if "status" in df.columns and df.status.dtype == object:
+        df = df[~df.status.isin(["failure", "skipped", "timeout", "crash"])]
+    df = df[["model", time_key]].dropna()
+    return {model: group[time_key].values for model, group in df.groupby("model")}
+
+
+def compare_runs(df_baseline: pd.DataFrame, df_current: pd.DataFrame, simulator: str,
+                 time_keys: Sequence[str] = TIME_KEYS, threshold: float = THRESHOLD,
+                 alpha: float = ALPHA) -> pd.DataFrame:
+    """Compare the repeat samples of the current results with the baseline.
+
+    Models missing in one of the runs (or without valid samples) get the
+    status 'missing'.
+    """
+    records = []
+    for time_key in time_keys:
+        if time_key not in df_baseline.columns or time_key not in df_current.columns:
+            continue
+        baseline = _samples(df_baseline, time_key)
+        current = _samples(df_current, time_key)
+        for model in sorted(set(baseline) | set(current)):
+            x = baseline.get(model, np.empty(0))
+            y = current.get(model, np.empty(0))
+            median_x = float(np.median(x)) if len(x) else math.nan
+            median_y = float(np.median(y)) if len(y) else math.nan
+            ratio = median_y / median_x if len(x) and len(y) and median_x > 0 else math.nan
+            _, p_value = mann_whitney_u(y, x)
+            ci_low, ci_high = bootstrap_ratio_ci(x, y)
+            records.append({
+                "model": model, "simulator": simulator, "time_key": time_key,
+                "status": classify(ratio, p_value, threshold=threshold, alpha=alpha),
+                "ratio": ratio, "ratio_ci_low": ci_low, "ratio_ci_high": ci_high,
+                "p_value": p_value, "median_baseline": median_x, "median_current": median_y,
+                "n_baseline": len(x), "n_current": len(y),
+            })
+    return pd.DataFrame(records, columns=REPORT_COLUMNS)
+
+
+def regression_report(name: str, dataset: str, simulators: Sequence[str],
+                      results_dir: Path = RESULTS_DIR, baselines_dir: Path = BASELINES_DIR,
+                      threshold: float = THRESHOLD, alpha: float = ALPHA,
+                      collection: Optional[str] = None) -> pd.DataFrame:
+    """Ranked report of the current results against the baseline.
+
+    The report is stored in `<results_dir>/<dataset>/regressions_<name>.tsv`
+    (with the collection as prefix for other collections than the default
+    collection of the dataset), sorted by the ratio of the median times
+    (largest regressions first).
+
+    Results with the package versions of the baseline, or identical to the
+    baseline results, raise a ValueError: the benchmark has to be rerun with
+    the upgraded packages.
+
+    :param collection: model collection of the results, default collection
+        of the dataset if None
+    """
+    baseline_dir = baselines_dir / name
+    if not (baseline_dir / METADATA_FILENAME).exists():
+        raise ValueError(f"Baseline '{name}' does not exist, use any of "
+                         f"{list_baselines(baselines_dir)}")
+    meta = read_baseline_metadata(name, baselines_dir=baselines_dir)
+
+    dfs = []
+    for simulator in simulators:
+        baseline_path = result_path(dataset, simulator, results_dir=baseline_dir,
+                                    collection=collection)
+        if not baseline_path.exists():
+            raise ValueError(f"No '{simulator}' results in baseline '{name}'")
+        df_baseline = pd.read_csv(baseline_path, sep="\t")
+        df_current = pd.read_csv(result_path(dataset, simulator, results_dir=results_dir,
+                                             collection=collection), sep="\t")
+        versions = meta.get(
+            _metadata_key(dataset, simulator, collection), {}
+        ).get("versions", {})
+        current_versions = result_versions(df_current)
+        if current_versions == versions or df_current.equals(df_baseline):
+            raise ValueError(
+                f"'{simulator}' results have the package versions of baseline '{name}' "
+                f"({versions}), rerun the benchmark after the upgrade"
+            )
+        if current_versions is not None:
+            print(f"{simulator}: baseline {versions} -> current {current_versions}")
+        df = compare_runs(df_baseline, df_current, simulator=simulator, threshold=threshold,
+                          alpha=alpha)
+        dfs.append(df)
+
+    df_report = pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame(columns=REPORT_COLUMNS)
+    df_report = df_report.sort_values(by="ratio", ascending=False, na_position="last")
+    prefix = _results_prefix(dataset, collection)
+    prefix = "" if prefix == DATASET_COLLECTIONS[dataset] else f"{prefix}_"
+    df_report.to_csv(results_dir / dataset / f"{prefix}regressions_{name}.tsv", sep="\t",
+                     index=False)
+    return df_report
+
+
+def print_report(df_report: pd.DataFrame):
+    """Print the flagged models of the report."""
+    for status in [STATUS_REGRESSION, STATUS_IMPROVEMENT]:
+        df = df_report[df_report.status == status]
+        print(f"--- {len(df)} {status}s ---")
+        if len(df):
+            print(df[["model", "simulator", "time_key", "ratio", "ratio_ci_low",
+                      "ratio_ci_high", "p_value"]].to_string(index=False))
+
+
+def check_regressions(name: str, dataset: str, simulators: Sequence[str],
+                      results_dir: Path = RESULTS_DIR, baselines_dir: Path = BASELINES_DIR,
+                      threshold: float = THRESHOLD, alpha: float = ALPHA,
+                      collection: Optional[str] = None) -> int:
+    """Create and print the regression report.
+
+    :param collection: model collection of the results, default collection
+        of the dataset if None
+    :return: exit code, 1 if regressions were found, 0 otherwise
+    """
+    df_report = regression_report(name, dataset, simulators, results_dir=results_dir,
+                                  baselines_dir=baselines_dir, threshold=threshold, alpha=alpha,
+                                  collection=collection)
+    print_report(df_report)
+    return int((df_report.status == STATUS_REGRESSION).any())
+
+
+if __name__ == "__main__":
+    sys.exit(check_regressions("default", dataset="ode", simulators=["roadrunner", "copasi"]))
@@ -0,0 +1,215 @@
+"""
+SBSCL (Java) simulator driven from Python via a long-lived JVM.
+
+The SBSCL harness (`src/main/java/SbsclHarness.java`) runs in a local JVM
+subprocess which is started once and answers the simulation and optimization
+requests over stdin/stdout. Every result is streamed back as soon as the run
+is finished, so the repeats are committed to the ledger like the results of
+the Python simulators (instead of the batch files of the Java mains). The
+phases are timed in the JVM (`System.nanoTime`, thread CPU time).
+
+The first runs in a JVM include class loading, interpretation and JIT
+compilation, so the benchmark distinguishes
+
+    sbscl       warm JVM, the runs of a model follow an explicit warm-up
+                phase of unrecorded runs of the model
+    sbscl_cold  every run in a fresh JVM without warm-up
+
+The JVM startup itself is not part of the load time. Responses are read with
+a deadline (`STARTUP_TIMEOUT`, `REQUEST_TIMEOUT`), a JVM which does not
+respond in time is killed and restarted by the runners.
+
+The harness is built with maven (classes and dependencies in `target/`)
+
+    mvn compile dependency:copy-dependencies
+
+alternatively the classpath is set via the environment variable
+`SBSCL_CLASSPATH`.
+"""
+import os
+import queue
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from code.comparisonpy import BASE_DIR
+from code.comparisonpy.timing import PHASES, PhaseTimer
+
+JAVA = "java"
+JVM_OPTIONS: List[str] = []
+HARNESS_CLASS = "SbsclHarness"
+CLASSPATH_ENV = "SBSCL_CLASSPATH"
+CLOSE_TIMEOUT = 10.0  # [s]
+STARTUP_TIMEOUT = 60.0  # [s] until the harness is ready
+REQUEST_TIMEOUT = 300.0  # [s] per request (simulation or optimization)
+
+# unrecorded runs of every model before the measured repeats (warm JVM)
+WARMUP_RUNS = 5
+
+
+def sbscl_classpath() -> str:
+    """Classpath of the SBSCL harness, from `SBSCL_CLASSPATH` or the maven build."""
+    classpath = os.environ.get(CLASSPATH_ENV)
+    if classpath:
+        return classpath
+    classes_dir = BASE_DIR / "target" / "classes"
+    if not (classes_dir / f"{HARNESS_CLASS}.class").exists():
+        raise RuntimeError(
+            f"SBSCL harness not found in '{classes_dir}', build it via "
+            f"'mvn compile dependency:copy-dependencies' or set '{CLASSPATH_ENV}'"
+        )
+    return os.pathsep.join([str(classes_dir), str(BASE_DIR / "target" / "dependency" / "*")])
+
+
+class SbsclHarness:
+    """Long-lived JVM running the SBSCL harness.
+
+    Use as context manager to stop the JVM. Errors of a run are raised as
+    RuntimeError, the JVM continues with the next request (check `alive`
+    if the JVM itself died).
+
+    :param java: java executable
+    :param classpath: classpath of the harness, see `sbscl_classpath` if None
+    :param jvm_options: options of the JVM, e.g. ['-Xmx4g']
+    :param timeout: deadline of every request [s], the JVM is killed if it
+        does not respond in time
+    """
+
+    def __init__(self, java: str = JAVA, classpath: Optional[str] = None,
+                 jvm_options: Optional[List[str]] = None,
+                 timeout: float = REQUEST_TIMEOUT):
+        jvm_options = jvm_options if jvm_options is not None else JVM_OPTIONS
+        self.timeout = timeout
+        start_time = time.perf_counter()
+        try:
+            self.process = subprocess.Popen(
+                [java] + jvm_options + ["-cp", classpath or sbscl_classpath(), HARNESS_CLASS],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, encoding="utf-8",
+                bufsize=1,
+            )
+        except OSError as err:
+            raise RuntimeError(f"JVM could not be started: {err}") from err
+
+        # responses are read in a thread, so that reads can time out
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        threading.Thread(target=self._read_lines, daemon=True).start()
+
+        fields = self._read(timeout=STARTUP_TIMEOUT)
+        if fields[0] != "ready":
+            self.close()
+            raise RuntimeError(f"Unexpected response of the SBSCL harness: {fields}")
+        self.java_version = fields[1]
+        self.startup_time = time.perf_counter() - start_time  # [s]
+
+    def __enter__(self) -> "SbsclHarness":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def alive(self) -> bool:
+        """JVM is running."""
+        return self.process.poll() is None
+
+    def _read_lines(self):
+        """Forward the lines of the JVM stdout to the queue, None at EOF."""
+        for line in self.process.stdout:
+            self._lines.put(line)
+        self._lines.put(None)
+
+    def _read(self, timeout: float) -> List[str]:
+        """Read the next response, kill the JVM if there is none within timeout [s]."""
+        try:
+            line = self._lines.get(timeout=timeout)
+        except queue.Empty:
+            self.kill()
+            raise RuntimeError(f"SBSCL JVM did not respond within {timeout} [s], killed")
+        if line is None:
+            self.process.wait()
+            raise RuntimeError(f"SBSCL JVM exited with code '{self.process.returncode}'")
+        return line.rstrip("\n").split("\t")
+
+    def _request(self, fields: Tuple, timer: Optional[PhaseTimer]) -> Dict[str, str]:
+        """Send the request and wait for its result.
+
+        The phases of the result are added to the timer.
+        """
+        try:
+            self.process.stdin.write("\t".join(str(f) for f in fields) + "\n")
+            self.process.stdin.flush()
+        except OSError as err:
+            raise RuntimeError(f"SBSCL JVM not reachable: {err}") from err
+
+        response = self._read(timeout=self.timeout)
+        if response[0] == "error":
+            raise RuntimeError(f"SBSCL error for '{fields[1]}': {response[1]}")
+        values = dict(field.split("=", 1) for field in response[1:])
+        if timer is not None:
+            for phase in PHASES:
+                if phase in values:
+                    wall_ns, cpu_ns = values.pop(phase).split(",")
+                    timer.add(phase, wall_ns=int(wall_ns), cpu_ns=int(cpu_ns))
+        return values
+
+    def simulate(self, path: Path, start: float, end: float, steps: int,
+                 absolute_tolerance: float, relative_tolerance: float,
+                 reload: bool = True, output_path: Optional[Path] = None,
+                 timer: Optional[PhaseTimer] = None) -> str:
+        """Simulate the model (Rosenbrock solver).
+
+        Without reload the model of the previous request is reset and reused.
+        The trajectory is written as TSV to output_path (after the timings).
+
+        :return: status, 'success' or 'failure' (unstable integration)
+        """
+        values = self._request((
+            "ode", path.name.split(".")[0], path, int(reload), start, end, steps,
+            absolute_tolerance, relative_tolerance, output_path or "",
+        ), timer=timer)
+        return values["status"]
+
+    def optimize(self, path: Path, reload: bool = True,
+                 timer: Optional[PhaseTimer] = None) -> Tuple[str, float]:
+        """FBA of the model (SBML or .xml.gz).
+
+        Without reload the LP problem of the previous request is solved again.
+
+        :return: status ('optimal' or 'failure'), objective value
+        """
+        values = self._request(("fba", path.name.split(".")[0], path, int(reload)), timer=timer)
+        return values["status"], float(values["objective_value"])
+
+    def warmup(self, path: Path, n_runs: int = WARMUP_RUNS, **kwargs) -> float:
+        """Warm-up phase: unrecorded runs of the model (JIT compilation).
+
+        :param kwargs: time course arguments of `simulate` for ODE models,
+            FBA if empty
+        :return: wall time of the warm-up [s]
+        """
+        start_time = time.perf_counter()
+        for _ in range(n_runs):
+            if kwargs:
+                self.simulate(path, **kwargs)
+            else:
+                self.optimize(path)
+        return time.perf_counter() - start_time
+
+    def kill(self):
+        """Kill the JVM (e.g. if it hangs)."""
+        if self.alive:
+            self.process.kill()
+        self.process.wait()
+
+    def close(self):
+        """Stop the JVM."""
+        if not self.alive:
+            return
+        try:
+            self.process.stdin.write("quit\n")
+            self.process.stdin.close()
+            self.process.wait(timeout=CLOSE_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
@@ -0,0 +1,51 @@
+"""
+LP solver backends of the FBA benchmark.
+
+optlang picks the first available solver by default, so results differ
+between machines. The benchmark records the solver, status and iteration
+count of every optimization and can run all models against a list of
+backends.
+"""
+import math
+from typing import TYPE_CHECKING, List
+
+if TYPE_CHECKING:
+    import cobra
+
+
+def available_solvers() -> List[str]:
+    """Names of the LP solvers available locally (e.g. 'glpk', 'glpk_exact', 'cplex')."""
+    from cobra.util.solver import solvers as cobra_solvers
+
+    return sorted(cobra_solvers.keys())
+
+
+def check_solvers(solvers: List[str]):
+    """Check that all solvers are available."""
+    available = available_solvers()
+    missing = [s for s in solvers if s not in available]
+    if missing:
+        raise ValueError(f"Solvers not available: {missing}, use any of {available}")
+
+
+def solver_name(model: "cobra.Model") -> str:
+    """Name of the solver of the model, e.g. 'glpk'."""
+    interface = model.solver.interface.__name__.split(".")[-1]
+    return interface.replace("_interface", "")
+
+
+def solver_iterations(model: "cobra.Model") -> float:
+    """Iteration count of the last optimization, NaN if not available for the solver."""
+    name = solver_name(model)
+    problem = model.solver.problem
+    try:
+        if name in ("glpk", "glpk_exact"):
+            import swiglpk
+            return float(swiglpk.glp_get_it_cnt(problem))
+        elif name == "cplex":
+            return float(problem.solution.progress.get_num_iterations())
+        elif name == "gurobi":
+            return float(problem.IterCount)
+    except (AttributeError, ImportError):
+        pass
+    return math.nan
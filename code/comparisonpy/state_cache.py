@@ -0,0 +1,144 @@
+"""
+On-disk cache of compiled roadrunner models.
+
+Creating a `roadrunner.RoadRunner` from SBML runs the LLVM JIT compilation,
+which dominates the load time of roadrunner (often 10-100x the simulation).
+The cache stores the saved state (`rr.saveState`) of the freshly compiled
+model, which contains the compiled model, so that a ready-to-simulate
+instance is restored via `rr.loadState` without recompiling. Entries are
+keyed by the roadrunner version and the content hash of the SBML
+
+    models/state_cache/roadrunner-<version>/<model>/<sha256>.rr
+
+Entries of a model are rebuilt automatically if the SBML changes. Entries are
+written atomically, so workers can build and read the cache concurrently.
+
+Restoring from the cache is benchmarked as its own model source
+(`SOURCE_STATE_CACHE`), so that the cold-compile and the cache-restore load
+times can be reported side by side.
+"""
+import hashlib
+import os
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+
+from code.comparisonpy import MODELS_DIR, RESULTS_DIR
+from code.comparisonpy.model_store import read_sbml
+from code.comparisonpy.timing import PhaseTimer
+
+STATE_CACHE_DIR = MODELS_DIR / "state_cache"
+STATE_SUFFIX = ".rr"
+
+# model source of the ODE benchmark restoring models from the cache
+SOURCE_STATE_CACHE = "state_cache"
+
+
+def sbml_hash(sbml_str: str) -> str:
+    """SHA256 hex digest of the SBML content."""
+    return hashlib.sha256(sbml_str.encode("utf-8")).hexdigest()
+
+
+def roadrunner_version() -> str:
+    """Version of the installed roadrunner."""
+    import roadrunner
+    return roadrunner.__version__
+
+
+def state_cache_path(path: Path, cache_dir: Path = STATE_CACHE_DIR) -> Path:
+    """Path of the cache entry for the SBML file and the installed roadrunner."""
+    sbml_str = read_sbml(path)
+    return (
+        cache_dir / f"roadrunner-{roadrunner_version()}" / path.name.split(".")[0] /
+        f"{sbml_hash(sbml_str)}{STATE_SUFFIX}"
+    )
+
+
+def state_cache_entry(path: Path, cache_dir: Path = STATE_CACHE_DIR) -> Path:
+    """Get the cache entry for the given SBML file.
+
+    The entry is created if it does not exist, i.e. the model is compiled
+    and the state is saved. Outdated entries of the model (i.e. for a
+    different content hash) are removed. Resolving the entry requires
+    hashing the SBML, so this should be called outside of timings.
+    """
+    import roadrunner
+
+    state_path = state_cache_path(path, cache_dir=cache_dir)
+    if state_path.exists():
+        return state_path
+
+    # remove outdated entries (temporary files of other workers and the entry
+    # of the current hash, which another worker may have just renamed, are kept)
+    model_dir = state_path.parent
+    model_dir.mkdir(parents=True, exist_ok=True)
+    for outdated in model_dir.glob(f"*{STATE_SUFFIX}"):
+        if outdated.name != state_path.name:
+            outdated.unlink(missing_ok=True)
+
+    # save in temporary file of the process, rename when complete
+    rr = roadrunner.RoadRunner(read_sbml(path))
+    tmp_path = model_dir / f"{state_path.name}.{os.getpid()}.tmp"
+    rr.saveState(str(tmp_path))
+    os.replace(tmp_path, state_path)
+    print(f"... cached '{model_dir.name}' in '{state_path}' ...")
+    return state_path
+
+
+def build_state_cache(model_paths: List[Path], cache_dir: Path = STATE_CACHE_DIR) -> List[Path]:
+    """Create or update the cache entries for all given models."""
+    return [state_cache_entry(path, cache_dir=cache_dir) for path in model_paths]
+
+
+def load_roadrunner_state(state_path: Path, timer: Optional[PhaseTimer] = None):
+    """Restore roadrunner instance from the cache entry.
+
+    Reading and deserialization of the state are not separable and recorded as
+    'parse' phase with the optional timer, no compilation is required.
+
+    :return: roadrunner.RoadRunner
+    """
+    import roadrunner
+
+    timer = timer if timer is not None else PhaseTimer()
+    with timer.phase("parse"):
+        rr = roadrunner.RoadRunner()
+        rr.loadState(str(state_path))
+    return rr
+
+
+def compare_load_times(simulator: str = "roadrunner", source: str = SOURCE_STATE_CACHE,
+                       collection: str = "biomodels",
+                       results_dir: Path = RESULTS_DIR) -> pd.DataFrame:
+    """Cold-compile and cache-restore load times side by side.
+
+    Median load times per model of the SBML results (`<collection>_<simulator>.tsv`)
+    and the cache results (`<collection>_<simulator>_<source>.tsv`) of successful
+    repeats; stored in `results/ode/<simulator>_load_sources.tsv` (with the
+    collection as prefix for other collections than 'biomodels').
+    """
+    dfs = {}
+    for key, name in [("sbml", simulator), (source, f"{simulator}_{source}")]:
+        df = pd.read_csv(results_dir / "ode" / f"{collection}_{name}.tsv", sep="\t")
+        df = df[df.status == "success"]
+        dfs[key] = df.groupby("model")[["load_time", "simulate_time"]].median()
+
+    df = dfs["sbml"].join(dfs[source], how="inner", lsuffix="_sbml", rsuffix=f"_{source}")
+    df["load_speedup"] = df["load_time_sbml"] / df[f"load_time_{source}"]
+    df = df.reset_index()
+    prefix = "" if collection == "biomodels" else f"{collection}_"
+    df.to_csv(results_dir / "ode" / f"{prefix}{simulator}_load_sources.tsv", sep="\t",
+              index=False)
+
+    if len(df):
+        print(f"{simulator} median load time [s]: "
+              f"sbml {df['load_time_sbml'].median():.4f}, "
+              f"{source} {df[f'load_time_{source}'].median():.4f}, "
+              f"speedup {df['load_speedup'].median():.1f}x ({len(df)} models)")
+    return df
+
+
+if __name__ == "__main__":
+    from code.comparisonpy import biomodels_model_paths
+    build_state_cache(biomodels_model_paths())
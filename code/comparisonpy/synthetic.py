@@ -0,0 +1,381 @@
+"""
+Synthetic models of controlled size for the scaling of the simulators.
+
+The BioModels and BiGG models cover the model sizes only sparsely, so the
+growth of load and simulate time with the model size is benchmarked on
+generated models. Every model family is generated for the sizes in `SIZES`
+(number of reactions, 10 to 100k)
+
+    mass_action    random mass-action network (conversions, associations)
+                   on n/2 species
+    stiff_cascade  linear cascade with rate constants spanning 6 orders of
+                   magnitude (stiff)
+    events         mass-action ring with a pulse event every 10 reactions
+    fba            stoichiometric network (SBML fbc) with uptake, a chain of
+                   internal reactions, random shortcuts and a biomass objective
+
+The models are written as SBML L3V1 to `models/synthetic/<id>.xml` with the
+id `synthetic_<kind>_<size>` and are a model collection of the catalog
+('synthetic'), i.e. benchmarked with `run_models`/`optimize_models` with
+`collection="synthetic"` (the ODE and FBA models are selected via the fbc
+package). Random networks are reproducible via the seed.
+
+The scaling of the median load and simulate times with the number of
+reactions is fitted per simulator and model family as power law
+(time ~ a * n^b), the exponents are stored in
+`results/<dataset>/synthetic_scaling.tsv`.
+"""
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from code.comparisonpy import MODELS_DIR, RESULTS_DIR
+from code.comparisonpy.catalog import build_catalog, load_catalog
+
+if TYPE_CHECKING:
+    import libsbml
+
+COLLECTION = "synthetic"
+SYNTHETIC_DIR = MODELS_DIR / COLLECTION
+
+ODE_KINDS = ["mass_action", "stiff_cascade", "events"]
+FBA_KINDS = ["fba"]
+KINDS = ODE_KINDS + FBA_KINDS
+
+# number of reactions of the generated models
+SIZES = [10, 30, 100, 300, 1000, 3000, 10000, 30000, 100000]
+SEED = 1234
+
+# rate constants of the cascade span 10^-STIFFNESS to 10^STIFFNESS
+STIFFNESS = 3
+# one event per EVENT_RATIO reactions, triggered in [0, EVENT_END]
+EVENT_RATIO = 10
+EVENT_END = 100.0
+# flux bounds of the FBA models
+UPTAKE_BOUND = 10.0
+FLUX_BOUND = 1000.0
+
+# status of successful runs in the results
+SUCCESS_STATUS = ["success", "optimal"]
+TIME_KEYS = ["load_time", "simulate_time"]
+SCALING_COLUMNS = [
+    "simulator", "kind", "time_key", "n_models", "min_reactions", "max_reactions",
+    "exponent", "exponent_ci_low", "exponent_ci_high", "prefactor", "r_squared",
+]
+
+
+def synthetic_model_id(kind: str, size: int) -> str:
+    """Id of the synthetic model."""
+    return f"{COLLECTION}_{kind}_{size}"
+
+
+def synthetic_kind(model_id: str) -> str:
+    """Model family of the synthetic model id."""
+    return model_id[len(COLLECTION) + 1:].rsplit("_", 1)[0]
+
+
+class _ModelBuilder:
+    """Creates the SBML L3V1 document of a synthetic model (single compartment)."""
+
+    def __init__(self, model_id: str, fbc: bool = False):
+        import libsbml
+
+        self.libsbml = libsbml
+        if fbc:
+            self.doc = libsbml.SBMLDocument(libsbml.SBMLNamespaces(3, 1, "fbc", 2))
+            self.doc.setPackageRequired("fbc", False)
+        else:
+            self.doc = libsbml.SBMLDocument(3, 1)
+        self.model: libsbml.Model = self.doc.createModel()
+        self.model.setId(model_id)
+        if fbc:
+            self.model.getPlugin("fbc").setStrict(True)
+
+        compartment = self.model.createCompartment()
+        compartment.setId("c")
+        compartment.setSize(1.0)
+        compartment.setSpatialDimensions(3)
+        compartment.setConstant(True)
+
+    def species(self, sid: str, concentration: float = 0.0):
+        s = self.model.createSpecies()
+        s.setId(sid)
+        s.setCompartment("c")
+        s.setInitialConcentration(concentration)
+        s.setHasOnlySubstanceUnits(False)
+        s.setBoundaryCondition(False)
+        s.setConstant(False)
+
+    def parameter(self, pid: str, value: float):
+        p = self.model.createParameter()
+        p.setId(pid)
+        p.setValue(value)
+        p.setConstant(True)
+
+    def reaction(self, rid: str, reactants: Sequence[str], products: Sequence[str],
+                 formula: Optional[str] = None, reversible: bool = False,
+                 bounds: Optional[Tuple[str, str]] = None) -> "libsbml.Reaction":
+        """Reaction with unit stoichiometries, kinetic law (ODE) or flux bounds (FBA)."""
+        r = self.model.createReaction()
+        r.setId(rid)
+        r.setReversible(reversible)
+        r.setFast(False)
+        for sids, create in [(reactants, r.createReactant), (products, r.createProduct)]:
+            for sid in sids:
+                ref = create()
+                ref.setSpecies(sid)
+                ref.setStoichiometry(1.0)
+                ref.setConstant(True)
+        if formula is not None:
+            law = r.createKineticLaw()
+            law.setMath(self.libsbml.parseL3Formula(formula))
+        if bounds is not None:
+            plugin = r.getPlugin("fbc")
+            plugin.setLowerFluxBound(bounds[0])
+            plugin.setUpperFluxBound(bounds[1])
+        return r
+
+    def event(self, eid: str, trigger: str, assignments: Dict[str, str]):
+        e = self.model.createEvent()
+        e.setId(eid)
+        e.setUseValuesFromTriggerTime(True)
+        t = e.createTrigger()
+        t.setMath(self.libsbml.parseL3Formula(trigger))
+        t.setInitialValue(False)
+        t.setPersistent(True)
+        for variable, formula in assignments.items():
+            a = e.createEventAssignment()
+            a.setVariable(variable)
+            a.setMath(self.libsbml.parseL3Formula(formula))
+
+    def write(self, path: Path):
+        """Write the SBML, errors of the document are raised as ValueError."""
+        if self.doc.getNumErrors(self.libsbml.LIBSBML_SEV_ERROR) > 0:
+            raise ValueError(f"Invalid synthetic model '{self.model.getId()}': "
+                             f"{self.doc.getErrorLog().toString()}")
+        if not self.libsbml.writeSBMLToFile(self.doc, str(path)):
+            raise RuntimeError(f"Synthetic model could not be written: '{path}'")
+
+
+def _mass_action(model_id: str, size: int, rng: np.random.Generator) -> _ModelBuilder:
+    """Random mass-action network with size reactions on size/2 species.
+
+    A ring of conversions connects all species, the other reactions are
+    random conversions and associations. The number of molecules does not
+    increase, so the dynamics stay bounded.
+    """
+    builder = _ModelBuilder(model_id)
+    n_species = max(2, size // 2)
+    for i in range(n_species):
+        builder.species(f"S{i}", concentration=float(rng.uniform(0.1, 10.0)))
+    for j in range(size):
+        k = f"k{j}"
+        builder.parameter(k, float(10 ** rng.uniform(-2, 1)))
+        if j < n_species:
+            reactants, products = [f"S{j}"], [f"S{(j + 1) % n_species}"]
+        else:
+            a, b, c = (f"S{i}" for i in rng.choice(n_species, size=3, replace=False))
+            reactants, products = ([a], [b]) if rng.random() < 0.5 else ([a, b], [c])
+        builder.reaction(f"R{j}", reactants, products, formula=" * ".join([k] + reactants))
+    return builder
+
+
+def _stiff_cascade(model_id: str, size: int, rng: np.random.Generator) -> _ModelBuilder:
+    """Cascade of size reactions (inflow, conversions, outflow).
+
+    The rate constants cycle over 10^-STIFFNESS ... 10^STIFFNESS, so that
+    fast and slow time scales alternate along the cascade.
+    """
+    builder = _ModelBuilder(model_id)
+    n_species = size - 1
+    exponents = np.linspace(-STIFFNESS, STIFFNESS, num=7)
+    for i in range(n_species):
+        builder.species(f"S{i}", concentration=0.0)
+    builder.parameter("v_in", 1.0)
+    builder.reaction("R0", [], ["S0"], formula="v_in")
+    for j in range(1, size):
+        k = f"k{j}"
+        builder.parameter(k, float(10 ** exponents[j % len(exponents)]))
+        products = [f"S{j}"] if j < n_species else []
+        builder.reaction(f"R{j}", [f"S{j - 1}"], products, formula=f"{k} * S{j - 1}")
+    return builder
+
+
+def _events(model_id: str, size: int, rng: np.random.Generator) -> _ModelBuilder:
+    """Mass-action ring of size conversions with size/EVENT_RATIO pulse events.
+
+    Every event adds a pulse to a species at a fixed time in [0, EVENT_END].
+    """
+    builder = _ModelBuilder(model_id)
+    for i in range(size):
+        builder.species(f"S{i}", concentration=float(rng.uniform(0.1, 10.0)))
+    for j in range(size):
+        k = f"k{j}"
+        builder.parameter(k, float(10 ** rng.uniform(-2, 1)))
+        builder.reaction(f"R{j}", [f"S{j}"], [f"S{(j + 1) % size}"], formula=f"{k} * S{j}")
+    n_events = max(1, size // EVENT_RATIO)
+    for e, t in enumerate(np.linspace(0, EVENT_END, num=n_events + 2)[1:-1]):
+        sid = f"S{int(rng.integers(size))}"
+        builder.event(f"E{e}", trigger=f"time >= {t}", assignments={sid: f"{sid} + 1"})
+    return builder
+
+
+def _fba(model_id: str, size: int, rng: np.random.Generator) -> _ModelBuilder:
+    """Stoichiometric network with size reactions (SBML fbc).
+
+    Uptake of M0, a chain of irreversible reactions through all metabolites,
+    random shortcuts (M_a -> M_b with a < b) and the biomass reaction
+    consuming the last metabolite as objective. All internal reactions
+    conserve mass and all metabolites are drained via the chain, so the
+    biomass flux is limited by the uptake.
+    """
+    builder = _ModelBuilder(model_id, fbc=True)
+    n_metabolites = max(2, size // 2)
+    for i in range(n_metabolites):
+        builder.species(f"M{i}")
+    builder.parameter("lb_uptake", -UPTAKE_BOUND)
+    builder.parameter("lb_zero", 0.0)
+    builder.parameter("ub_default", FLUX_BOUND)
+
+    builder.reaction("EX_M0", ["M0"], [], reversible=True, bounds=("lb_uptake", "ub_default"))
+    for i in range(1, n_metabolites):
+        builder.reaction(f"R{i}", [f"M{i - 1}"], [f"M{i}"], bounds=("lb_zero", "ub_default"))
+    n_shortcuts = size - n_metabolites - 1
+    for j in range(n_shortcuts):
+        a, b = sorted(rng.choice(n_metabolites, size=2, replace=False))
+        builder.reaction(f"B{j}", [f"M{a}"], [f"M{b}"], bounds=("lb_zero", "ub_default"))
+    builder.reaction("BIOMASS", [f"M{n_metabolites - 1}"], [], bounds=("lb_zero", "ub_default"))
+
+    plugin = builder.model.getPlugin("fbc")
+    objective = plugin.createObjective()
+    objective.setId("obj")
+    objective.setType("maximize")
+    plugin.setActiveObjectiveId("obj")
+    flux_objective = objective.createFluxObjective()
+    flux_objective.setReaction("BIOMASS")
+    flux_objective.setCoefficient(1.0)
+    return builder
+
+
+GENERATORS = {
+    "mass_action": _mass_action,
+    "stiff_cascade": _stiff_cascade,
+    "events": _events,
+    "fba": _fba,
+}
+
+
+def generate_model(kind: str, size: int, seed: int = SEED,
+                   output_dir: Path = SYNTHETIC_DIR) -> Path:
+    """Generate the synthetic model of the family with size reactions.
+
+    :return: path of the SBML file
+    """
+    if kind not in GENERATORS:
+        raise ValueError(f"Unsupported model kind '{kind}', use one of {KINDS}")
+    if size < 10:
+        raise ValueError(f"Synthetic models require at least 10 reactions, got {size}")
+    model_id = synthetic_model_id(kind, size)
+    rng = np.random.default_rng([seed, KINDS.index(kind), size])
+    builder = GENERATORS[kind](model_id, size, rng)
+    path = output_dir / f"{model_id}.xml"
+    builder.write(path)
+    print(f"... generated '{model_id}' ...")
+    return path
+
+
+def generate_models(kinds: Sequence[str] = KINDS, sizes: Sequence[int] = SIZES,
+                    seed: int = SEED, overwrite: bool = False,
+                    output_dir: Path = SYNTHETIC_DIR) -> List[Path]:
+    """Generate the synthetic models of all families and sizes.
+
+    Existing models are kept unless overwrite is set. The catalog of the
+    synthetic collection is updated if the models are written to the
+    collection directory.
+
+    :return: paths of the SBML files
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for kind in kinds:
+        for size in sizes:
+            path = output_dir / f"{synthetic_model_id(kind, size)}.xml"
+            if overwrite or not path.exists():
+                path = generate_model(kind, size, seed=seed, output_dir=output_dir)
+            paths.append(path)
+    if output_dir == SYNTHETIC_DIR:
+        build_catalog([COLLECTION])
+    return paths
+
+
+def scaling_exponent(n: np.ndarray, times: np.ndarray) -> Dict[str, float]:
+    """Least squares fit of the power law times = prefactor * n^exponent (log-log).
+
+    The confidence interval of the exponent is the normal approximation
+    (+-1.96 standard errors).
+    """
+    x, y = np.log10(n), np.log10(times)
+    exponent, intercept = np.polyfit(x, y, deg=1)
+    residuals = y - (intercept + exponent * x)
+    ss_res = float(np.sum(residuals ** 2))
+    ss_tot = float(np.sum((y - y.mean()) ** 2))
+    stderr = np.sqrt(ss_res / (len(x) - 2) / np.sum((x - x.mean()) ** 2))
+    return {
+        "exponent": exponent,
+        "exponent_ci_low": exponent - 1.96 * stderr,
+        "exponent_ci_high": exponent + 1.96 * stderr,
+        "prefactor": 10 ** intercept,
+        "r_squared": 1.0 - ss_res / ss_tot if ss_tot > 0 else np.NaN,
+    }
+
+
+def fit_scaling(dataset: str, simulators: Sequence[str],
+                results_dir: Path = RESULTS_DIR) -> pd.DataFrame:
+    """Scaling exponents of the load and simulate time per simulator and model family.
+
+    Fitted on the median times of the successful repeats per model of the
+    synthetic results (`<results_dir>/<dataset>/synthetic_<simulator>.tsv`)
+    against the number of reactions, at least 3 models are required for a fit.
+    The exponents are stored in `<results_dir>/<dataset>/synthetic_scaling.tsv`.
+    """
+    df_catalog = load_catalog()
+    n_reactions = df_catalog[df_catalog.collection == COLLECTION].set_index("model").n_reactions
+
+    rows = []
+    for simulator in simulators:
+        path = results_dir / dataset / f"{COLLECTION}_{simulator}.tsv"
+        if not path.exists():
+            print(f"No synthetic results for '{simulator}': '{path}'")
+            continue
+        df = pd.read_csv(path, sep="\t")
+        df = df[df.status.isin(SUCCESS_STATUS)]
+        df_median = df.groupby("model")[TIME_KEYS].median()
+        df_median["n_reactions"] = n_reactions.reindex(df_median.index)
+        df_median["kind"] = [synthetic_kind(mid) for mid in df_median.index]
+
+        for (kind, time_key), df_fit in df_median.melt(
+            id_vars=["kind", "n_reactions"], value_vars=TIME_KEYS, var_name="time_key",
+            value_name="time",
+        ).groupby(["kind", "time_key"]):
+            df_fit = df_fit[(df_fit.time > 0) & df_fit.n_reactions.notna()]
+            if len(df_fit) < 3:
+                continue
+            rows.append({
+                "simulator": simulator, "kind": kind, "time_key": time_key,
+                "n_models": len(df_fit), "min_reactions": int(df_fit.n_reactions.min()),
+                "max_reactions": int(df_fit.n_reactions.max()),
+                **scaling_exponent(df_fit.n_reactions.values.astype(float),
+                                   df_fit.time.values.astype(float)),
+            })
+
+    df_scaling = pd.DataFrame(rows, columns=SCALING_COLUMNS)
+    (results_dir / dataset).mkdir(parents=True, exist_ok=True)
+    df_scaling.to_csv(results_dir / dataset / f"{COLLECTION}_scaling.tsv", sep="\t", index=False)
+    print(df_scaling.to_string(index=False))
+    return df_scaling
+
+
+if __name__ == "__main__":
+    generate_models()
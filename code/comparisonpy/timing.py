@@ -0,0 +1,82 @@
+"""
+High resolution per-phase timing of the simulator adapters.
+
+All adapters break a run into the same phases
+
+    read      file read / decompression
+    parse     SBML parsing (model creation)
+    compile   model compilation (e.g. roadrunner JIT)
+    setup     integrator/task setup
+    solve     integration (ODE) or optimization (FBA)
+    extract   result extraction
+
+Wall times are measured with `perf_counter_ns`, CPU times with
+`process_time_ns`. Phases which cannot be separated for a simulator are
+measured together in one phase (documented in the adapter), phases which do
+not exist are NaN. The load time is the sum of read, parse and compile; the
+simulate time the sum of setup, solve and extract.
+"""
+import math
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+PHASES = ["read", "parse", "compile", "setup", "solve", "extract"]
+LOAD_PHASES = ["read", "parse", "compile"]
+SIMULATE_PHASES = ["setup", "solve", "extract"]
+
+# columns of the phase timings in the results [s]
+PHASE_COLUMNS = tuple(f"{phase}_time" for phase in PHASES) + tuple(
+    f"{phase}_cpu_time" for phase in PHASES
+)
+
+
+class PhaseTimer:
+    """Records wall and CPU time of the phases of a single run."""
+
+    def __init__(self):
+        self.wall_ns: Dict[str, int] = {}
+        self.cpu_ns: Dict[str, int] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the enclosed code as phase, repeated phases are accumulated."""
+        if name not in PHASES:
+            raise ValueError(f"Unsupported phase '{name}', use one of {PHASES}")
+        wall_start = time.perf_counter_ns()
+        cpu_start = time.process_time_ns()
+        try:
+            yield
+        finally:
+            cpu = time.process_time_ns() - cpu_start
+            wall = time.perf_counter_ns() - wall_start
+            self.wall_ns[name] = self.wall_ns.get(name, 0) + wall
+            self.cpu_ns[name] = self.cpu_ns.get(name, 0) + cpu
+
+    def add(self, name: str, wall_ns: int, cpu_ns: int):
+        """Add a phase measured outside of the timer (e.g. in the SBSCL JVM)."""
+        if name not in PHASES:
+            raise ValueError(f"Unsupported phase '{name}', use one of {PHASES}")
+        self.wall_ns[name] = self.wall_ns.get(name, 0) + wall_ns
+        self.cpu_ns[name] = self.cpu_ns.get(name, 0) + cpu_ns
+
+    def time(self, phases: List[str]) -> float:
+        """Summed wall time of the given phases [s], NaN if none was measured."""
+        values = [self.wall_ns[phase] for phase in phases if phase in self.wall_ns]
+        return sum(values) * 1E-9 if values else math.nan
+
+    @property
+    def load_time(self) -> float:
+        """Wall time of the load phases [s]."""
+        return self.time(LOAD_PHASES)
+
+    @property
+    def simulate_time(self) -> float:
+        """Wall time of the simulate phases [s]."""
+        return self.time(SIMULATE_PHASES)
+
+    def row(self) -> Tuple[float, ...]:
+        """Wall and CPU times of all phases [s] in order of PHASE_COLUMNS."""
+        wall = [self.wall_ns[p] * 1E-9 if p in self.wall_ns else math.nan for p in PHASES]
+        cpu = [self.cpu_ns[p] * 1E-9 if p in self.cpu_ns else math.nan for p in PHASES]
+        return tuple(wall + cpu)
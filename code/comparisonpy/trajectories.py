@@ -0,0 +1,157 @@
+"""
+Columnar storage of ODE trajectories.
+
+The trajectories of all simulators and repeats are stored in a single
+dataset partitioned by model, simulator and repeat
+
+    results/ode/trajectories/model=<model>/simulator=<simulator>/repeat=<repeat>/part-0.<format>
+
+Supported formats are Arrow IPC ('arrow', uncompressed and memory-mappable)
+and Parquet ('parquet', compressed). Values are stored as float64, so no
+precision is lost in contrast to the text formatted TSV files.
+
+Requires the optional dependency `pyarrow`, which is only imported when
+trajectories are written or read.
+"""
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from code.comparisonpy import RESULTS_DIR
+
+TRAJECTORY_DIR = RESULTS_DIR / "ode" / "trajectories"
+TRAJECTORY_FORMATS = ["arrow", "parquet"]
+
+# output formats of the ODE runners, 'tsv' writes one TSV file per model
+OUTPUT_FORMATS = ["tsv"] + TRAJECTORY_FORMATS
+
+
+def _check_pyarrow() -> ModuleType:
+    """Import the optional pyarrow dependency (with the IPC and Parquet modules)."""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as err:
+        raise ImportError(
+            "Columnar trajectories require 'pyarrow', install via 'pip install pyarrow'"
+        ) from err
+    return pyarrow
+
+
+def trajectory_path(model_id: str, simulator: str, repeat: int,
+                    fmt: str = "arrow", trajectory_dir: Path = TRAJECTORY_DIR) -> Path:
+    """Path of the partition file for the given trajectory."""
+    if fmt not in TRAJECTORY_FORMATS:
+        raise ValueError(f"Unsupported trajectory format '{fmt}', use one of {TRAJECTORY_FORMATS}")
+    return (
+        trajectory_dir / f"model={model_id}" / f"simulator={simulator}" /
+        f"repeat={repeat}" / f"part-0.{fmt}"
+    )
+
+
+def write_trajectory(data: np.ndarray, columns: Sequence[str], model_id: str,
+                     simulator: str, repeat: int, fmt: str = "arrow",
+                     trajectory_dir: Path = TRAJECTORY_DIR) -> Path:
+    """Write trajectory (timepoints x columns) to the partitioned dataset.
+
+    Existing trajectories for the partition are overwritten.
+    """
+    pa = _check_pyarrow()
+    data = np.asarray(data, dtype=np.float64)
+    table = pa.Table.from_arrays(
+        [pa.array(data[:, k]) for k in range(data.shape[1])],
+        names=[str(c) for c in columns],
+    )
+
+    path = trajectory_path(model_id, simulator, repeat, fmt=fmt, trajectory_dir=trajectory_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "arrow":
+        with pa.OSFile(str(path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    else:
+        pa.parquet.write_table(table, str(path))
+    return path
+
+
+def write_trajectory_df(df: pd.DataFrame, model_id: str, simulator: str, repeat: int,
+                        fmt: str = "arrow", trajectory_dir: Path = TRAJECTORY_DIR) -> Path:
+    """Write trajectory DataFrame to the partitioned dataset."""
+    return write_trajectory(
+        df.values, columns=df.columns, model_id=model_id, simulator=simulator,
+        repeat=repeat, fmt=fmt, trajectory_dir=trajectory_dir,
+    )
+
+
+def read_trajectory_array(model_id: str, simulator: str, repeat: int = 1,
+                          fmt: str = "arrow", trajectory_dir: Path = TRAJECTORY_DIR
+                          ) -> Tuple[np.ndarray, List[str]]:
+    """Read trajectory as (timepoints x columns) float64 array and column names.
+
+    Arrow files are memory-mapped instead of read into memory.
+    """
+    pa = _check_pyarrow()
+    path = trajectory_path(model_id, simulator, repeat, fmt=fmt, trajectory_dir=trajectory_dir)
+    if fmt == "arrow":
+        source = pa.memory_map(str(path), "r")
+        table = pa.ipc.open_file(source).read_all()
+    else:
+        table = pa.parquet.read_table(str(path), memory_map=True)
+
+    if table.num_columns == 0:
+        return np.empty(shape=(0, 0)), []
+    data = np.column_stack([table.column(k).to_numpy() for k in range(table.num_columns)])
+    return data, table.column_names
+
+
+def read_trajectory(model_id: str, simulator: str, repeat: int = 1,
+                    fmt: str = "arrow", trajectory_dir: Path = TRAJECTORY_DIR) -> pd.DataFrame:
+    """Read trajectory as DataFrame."""
+    data, columns = read_trajectory_array(
+        model_id, simulator, repeat=repeat, fmt=fmt, trajectory_dir=trajectory_dir
+    )
+    return pd.DataFrame(data, columns=columns)
+
+
+def list_trajectories(fmt: str = "arrow", trajectory_dir: Path = TRAJECTORY_DIR
+                      ) -> pd.DataFrame:
+    """List all stored trajectories with model, simulator and repeat.
+
+    Only the directory layout is scanned, no data is read.
+    """
+    records: List[Dict] = []
+    for path in sorted(trajectory_dir.glob(f"model=*/simulator=*/repeat=*/part-0.{fmt}")):
+        keys = dict(p.split("=", 1) for p in path.parent.relative_to(trajectory_dir).parts)
+        records.append({
+            "model": keys["model"],
+            "simulator": keys["simulator"],
+            "repeat": int(keys["repeat"]),
+            "path": path,
+        })
+    return pd.DataFrame(records, columns=["model", "simulator", "repeat", "path"])
+
+
+def convert_tsv_results(simulators: Optional[List[str]] = None, repeat: int = 1,
+                        fmt: str = "arrow", trajectory_dir: Path = TRAJECTORY_DIR):
+    """Convert existing TSV results in results/ode/<simulator> to the dataset.
+
+    The TSV files only contain the last repeat, which is stored as given repeat.
+    """
+    if simulators is None:
+        simulators = ["sbscl", "roadrunner", "copasi"]
+    for simulator in simulators:
+        for tsv_path in sorted((RESULTS_DIR / "ode" / simulator).glob("*.tsv")):
+            df = pd.read_csv(tsv_path, sep="\t")
+            write_trajectory_df(
+                df, model_id=tsv_path.stem, simulator=simulator, repeat=repeat,
+                fmt=fmt, trajectory_dir=trajectory_dir,
+            )
+
+
+if __name__ == "__main__":
+    convert_tsv_results()
+    print(list_trajectories())
@@ -1,3 +1,6 @@
+from pathlib import Path
+from typing import List, Optional, Sequence
+
 import pandas as pd
 from matplotlib import pyplot as plt
 import seaborn as sns
@@ -5,6 +8,8 @@ import numpy as np
 from matplotlib.lines import Line2D
 
 from code.comparisonpy import RESULTS_DIR
+from code.comparisonpy.catalog import DATASET_COLLECTIONS
+from code.comparisonpy.memory import MEMORY_COLUMNS
 
 parameters = {
     "axes.titlesize": 20,
@@ -14,39 +19,63 @@ parameters = {
     # "ytick.labelweight": "bold",
 }
 plt.rcParams.update(parameters)
-print(plt.rcParams)
 
 
+TIME_KEYS = ["load_time", "simulate_time", "total_time"]
+FIGURE_FORMATS = ["svg", "pdf"]
+MODELS_PER_PAGE = 100  # models per page of the per model figures
+RASTER_THRESHOLD = 200  # rasterize the markers for more models
 
-def visualize_fba_timings():
-    # [1] visualize running time for models
-    simulators = [
-        "sbscl",
-        # "cameo",
-        "cobrapy"
-    ]
-    dfs = []
-    for simulator in simulators:
-        df = pd.read_csv(RESULTS_DIR / "fba" / f"bigg_{simulator}.tsv", sep="\t")
-        df["simulator"] = simulator
-        df["total_time"] = df["load_time"] + df["simulate_time"]
-        dfs.append(df)
+COLORS = {
+    "sbscl": "tab:blue",
+    "sbscl_cold": "tab:cyan",
+    "cobrapy": "tab:orange",
+    "cameo": "tab:red",
+    "roadrunner": "tab:red",
+    "roadrunner_state_cache": "tab:purple",
+    "copasi": "tab:green",
+}
+LABELS = {
+    "sbscl": "SBSCL-v1.2",
+    "sbscl_cold": "SBSCL-v1.2 (cold JVM)",
+    "cobrapy": "cobrapy-v0.21.0",
+    "cameo": "cameo-v0.13.0",
+    "copasi": "COPASI-v4.30.240",
+    "roadrunner": "roadrunner-2.0.5",
+    "roadrunner_state_cache": "roadrunner-2.0.5 (state cache)",
+}
+FBA_SIMULATORS = [
+    "sbscl",
+    # "cameo",
+    "cobrapy"
+]
+ODE_SIMULATORS = [
+    "sbscl",
+    "roadrunner",
+    "copasi",
+]
 
-    # concatenate all the timings
-    df_data = pd.concat(dfs)
-    df_data.sort_values(inplace=True, by=['model'])
-    visualize_timings(df_data, dataset="fba")
 
+def load_results(dataset: str, simulators: List[str],
+                 results_dir: Path = RESULTS_DIR,
+                 collection: Optional[str] = None,
+                 solver: Optional[str] = None) -> pd.DataFrame:
+    """Load the results of all simulators for the dataset ('fba' or 'ode').
 
-def visualize_ode_timings():
-    simulators = [
-        "sbscl",
-        "roadrunner",
-        "copasi",
-    ]
+    :param collection: model collection of the results
+        (`<collection>_<simulator>.tsv`), default collection of the dataset if None
+    :param solver: LP backend of the FBA results, the results of the solver
+        (`<collection>_<simulator>_<solver>.tsv`) are used for simulators
+        with results of the solver (not for the reference)
+    """
+    prefix = collection if collection is not None else DATASET_COLLECTIONS[dataset]
     dfs = []
     for simulator in simulators:
-        df = pd.read_csv(RESULTS_DIR / "ode" / f"biomodels_{simulator}.tsv", sep="\t")
+        path = results_dir / dataset / f"{prefix}_{simulator}.tsv"
+        solver_path = results_dir / dataset / f"{prefix}_{simulator}_{solver}.tsv"
+        if solver is not None and solver_path.exists():
+            path = solver_path
+        df = pd.read_csv(path, sep="\t")
         df["simulator"] = simulator
         df["total_time"] = df["load_time"] + df["simulate_time"]
         dfs.append(df)
@@ -54,82 +83,308 @@ def visualize_ode_timings():
     # concatenate all the timings
     df_data = pd.concat(dfs)
     df_data.sort_values(inplace=True, by=['model'])
-    visualize_timings(df_data, dataset="ode")
-
-
-def visualize_timings(df: pd.DataFrame, dataset="fba"):
-    """Visualizes the timings comparison."""
-
-    colors = {
-        "sbscl": "tab:blue",
-        "cobrapy": "tab:orange",
-        "cameo": "tab:red",
-        "roadrunner": "tab:red",
-        "copasi": "tab:green",
-    }
-    labels = {
-        "sbscl": "SBSCL-v1.2",
-        "cobrapy": "cobrapy-v0.21.0",
-        "cameo": "cameo-v0.13.0",
-        "copasi": "COPASI-v4.30.240",
-        "roadrunner": "roadrunner-2.0.5",
-    }
+    return df_data
+
+
+def visualize_fba_timings(simulators: List[str] = FBA_SIMULATORS,
+                          results_dir: Path = RESULTS_DIR, show: bool = True):
+    # [1] visualize running time for models
+    df_data = load_results("fba", simulators=simulators, results_dir=results_dir)
+    visualize_timings(df_data, dataset="fba", results_dir=results_dir, show=show)
+    visualize_timing_summary(df_data, dataset="fba", results_dir=results_dir, show=show)
+
+
+def visualize_ode_timings(simulators: List[str] = ODE_SIMULATORS,
+                          results_dir: Path = RESULTS_DIR, show: bool = True):
+    df_data = load_results("ode", simulators=simulators, results_dir=results_dir)
+    visualize_timings(df_data, dataset="ode", results_dir=results_dir, show=show)
+    visualize_timing_summary(df_data, dataset="ode", results_dir=results_dir, show=show)
+
+
+def visualize_fba_memory(simulators: List[str] = FBA_SIMULATORS,
+                         results_dir: Path = RESULTS_DIR, show: bool = True):
+    df_data = load_results("fba", simulators=simulators, results_dir=results_dir)
+    visualize_memory(df_data, dataset="fba", results_dir=results_dir, show=show)
+
+
+def visualize_ode_memory(simulators: List[str] = ODE_SIMULATORS,
+                         results_dir: Path = RESULTS_DIR, show: bool = True):
+    df_data = load_results("ode", simulators=simulators, results_dir=results_dir)
+    visualize_memory(df_data, dataset="ode", results_dir=results_dir, show=show)
+
+
+def timing_statistics(df: pd.DataFrame, time_keys: List[str] = TIME_KEYS) -> pd.DataFrame:
+    """Mean, SD and median of the times per simulator and model (single groupby).
+
+    :return: DataFrame with index (simulator, model) and columns (time_key, statistic)
+    """
+    return df.groupby(["simulator", "model"])[time_keys].agg(["mean", "std", "median"])
+
+
+def _pages(models: np.ndarray, models_per_page: Optional[int]) -> List[np.ndarray]:
+    """Split the models in pages of models_per_page models."""
+    if models_per_page is None or len(models) <= models_per_page:
+        return [models]
+    return [models[k:k + models_per_page] for k in range(0, len(models), models_per_page)]
+
+
+def _save_figure(fig: plt.Figure, path: Path, formats: Sequence[str], show: bool):
+    """Save the figure in all formats (path without suffix), show or close it."""
+    for fmt in formats:
+        fig.savefig(path.with_name(f"{path.name}.{fmt}"), bbox_inches="tight")
+    if show:
+        plt.show()
+    else:
+        plt.close(fig)
+
+
+def _legend(ax: plt.Axes, simulators: Sequence[str], **kwargs):
+    """Legend with a marker per simulator."""
+    legend_lines = [Line2D([0], [0], color=COLORS[sim], marker="s", linestyle="") for
+                    sim in simulators]
+    ax.legend(legend_lines, [LABELS[sim] for sim in simulators], **kwargs)
+
+
+def visualize_timings(df: pd.DataFrame, dataset="fba", results_dir: Path = RESULTS_DIR,
+                      show: bool = True, formats: Sequence[str] = FIGURE_FORMATS,
+                      models_per_page: Optional[int] = MODELS_PER_PAGE,
+                      rasterized: Optional[bool] = None):
+    """Visualizes the timings comparison per model.
+
+    The times are aggregated with a single groupby, every simulator is drawn
+    with one errorbar (mean and SD of all models) and one scatter collection
+    (all repeats). The figure height scales with the number of models, with
+    more than models_per_page models the figures are split in pages
+    (`<time_key>_<page>`). The markers are rasterized (text and axes stay
+    vector graphics) for more than RASTER_THRESHOLD models if rasterized is
+    None.
+
+    The figures are stored in `<results_dir>/<dataset>`, with show the
+    figures are displayed (closed otherwise).
+    """
     simulators = df.simulator.unique()
-    models = df.model.unique()
+    models = np.sort(df.model.unique())
+    stats = timing_statistics(df)
+    if rasterized is None:
+        rasterized = len(models) > RASTER_THRESHOLD
+    pages = _pages(models, models_per_page)
+
+    for time_key in TIME_KEYS:
+        for page, page_models in enumerate(pages, start=1):
+            positions = pd.Series(np.arange(len(page_models)), index=page_models)
+            df_page = df[df.model.isin(page_models)]
+
+            fig: plt.Figure
+            ax: plt.Axes
+            fig, ax = plt.subplots(nrows=1, ncols=1,
+                                   figsize=(12, max(4.0, 0.2 * len(page_models))), dpi=150)
+            # ensure labels are plotted
+            fig.subplots_adjust(left=0.3)
+            for simulator in simulators:
+                df_sim = df_page[df_page.simulator == simulator]
+                ax.scatter(df_sim[time_key].values, positions[df_sim.model].values,
+                           s=25, color=COLORS[simulator], edgecolor="black", linewidth=0.5,
+                           zorder=2, rasterized=rasterized)
+                stats_sim = stats.loc[simulator, time_key].reindex(page_models)
+                ax.errorbar(x=stats_sim["mean"].values, y=positions.values,
+                            xerr=stats_sim["std"].values, fmt="s", color=COLORS[simulator],
+                            markersize=8, markeredgecolor="black", alpha=0.8, zorder=3,
+                            rasterized=rasterized)
+
+            ax.set_xscale("log")
+            ax.set_ylabel("model")
+            ax.set_xlabel(f"{time_key} [s]")
+            title = f"{dataset.upper()} {time_key.replace('_', ' ')}"
+            if len(pages) > 1:
+                title += f" ({page}/{len(pages)})"
+            ax.set_title(title)
+            ax.grid(axis="both")
+            ax.set_ylim(-0.5, len(page_models) - 0.5)
+            ax.set_yticks(range(len(page_models)))
+            ax.set_yticklabels(labels=page_models)
+            _legend(ax, simulators, bbox_to_anchor=(0, 1, 1, 0), loc="lower left")
+
+            name = time_key if len(pages) == 1 else f"{time_key}_{page}"
+            _save_figure(fig, results_dir / dataset / name, formats=formats, show=show)
+
+
+def visualize_timing_summary(df: pd.DataFrame, dataset="fba", results_dir: Path = RESULTS_DIR,
+                             show: bool = True, formats: Sequence[str] = FIGURE_FORMATS,
+                             reference: str = "sbscl", model_size: bool = True,
+                             collection: Optional[str] = None):
+    """Summary views of the timings independent of the number of models.
+
+    - ECDF of the median times per model (`ecdf.<fmt>`)
+    - histograms of the speedup ratios (median time of the simulator divided
+      by the median time of the reference simulator) per model (`speedup.<fmt>`)
+    - log-log scatter of the median times against the model size
+      (species + reactions from the model catalog, `model_size.<fmt>`)
+
+    The figures have one column per time key.
+
+    :param collection: model collection of the results (model sizes from the
+        catalog), default collection of the dataset if None
+    """
+    simulators = list(df.simulator.unique())
+    medians = timing_statistics(df).xs("median", axis=1, level=1)
+    rasterized = df.model.nunique() > RASTER_THRESHOLD
+
+    # ECDF
+    fig, axes = plt.subplots(nrows=1, ncols=len(TIME_KEYS), figsize=(6 * len(TIME_KEYS), 5),
+                             dpi=150)
+    for ax, time_key in zip(axes, TIME_KEYS):
+        for simulator in simulators:
+            x = np.sort(medians.loc[simulator, time_key].dropna().values)
+            ax.step(x, np.arange(1, len(x) + 1) / len(x), where="post",
+                    color=COLORS[simulator], linewidth=2)
+        ax.set_xscale("log")
+        ax.set_xlabel(f"median {time_key} [s]")
+        ax.set_ylabel("fraction of models")
+        ax.grid(axis="both")
+    _legend(axes[0], simulators, loc="upper left")
+    fig.suptitle(f"{dataset.upper()} timings ECDF")
+    _save_figure(fig, results_dir / dataset / "ecdf", formats=formats, show=show)
+
+    # speedup ratios against the reference
+    others = [sim for sim in simulators if sim != reference]
+    if reference in simulators and others:
+        fig, axes = plt.subplots(nrows=1, ncols=len(TIME_KEYS),
+                                 figsize=(6 * len(TIME_KEYS), 5), dpi=150)
+        for ax, time_key in zip(axes, TIME_KEYS):
+            ref = medians.loc[reference, time_key]
+            ratios = {
+                sim: np.log10(medians.loc[sim, time_key] / ref).replace(
+                    [np.inf, -np.inf], np.nan).dropna()
+                for sim in others
+            }
+            values = np.concatenate([r.values for r in ratios.values()])
+            bins = np.histogram_bin_edges(values, bins=50) if len(values) else 10
+            for simulator, ratio in ratios.items():
+                ax.hist(ratio.values, bins=bins, color=COLORS[simulator], alpha=0.6,
+                        edgecolor="black", linewidth=0.5)
+            ax.axvline(0.0, color="black", linestyle="--")
+            ax.set_xlabel(f"log10({time_key} / {time_key} {reference})")
+            ax.set_ylabel("number of models")
+            ax.grid(axis="both")
+        _legend(axes[0], others, loc="upper left")
+        fig.suptitle(f"{dataset.upper()} speedup against {LABELS[reference]}")
+        _save_figure(fig, results_dir / dataset / "speedup", formats=formats, show=show)
+
+    # median times against model size
+    if model_size:
+        from code.comparisonpy.catalog import load_catalog
+        collection = collection if collection is not None else DATASET_COLLECTIONS[dataset]
+        df_catalog = load_catalog()
+        df_catalog = df_catalog[df_catalog.collection == collection].set_index("model")
+        size = df_catalog.n_species + df_catalog.n_reactions
+
+        fig, axes = plt.subplots(nrows=1, ncols=len(TIME_KEYS),
+                                 figsize=(6 * len(TIME_KEYS), 5), dpi=150)
+        for ax, time_key in zip(axes, TIME_KEYS):
+            for simulator in simulators:
+                y = medians.loc[simulator, time_key]
+                x = size.reindex(y.index)
+                ax.scatter(x.values, y.values, s=15, color=COLORS[simulator],
+                           edgecolor="black", linewidth=0.3, alpha=0.7, rasterized=rasterized)
+            ax.set_xscale("log")
+            ax.set_yscale("log")
+            ax.set_xlabel("model size (species + reactions)")
+            ax.set_ylabel(f"median {time_key} [s]")
+            ax.grid(axis="both")
+        _legend(axes[0], simulators, loc="upper left")
+        fig.suptitle(f"{dataset.upper()} timings against model size")
+        _save_figure(fig, results_dir / dataset / "model_size", formats=formats, show=show)
 
-    for time_key in ["load_time", "simulate_time", "total_time"]:
+
+def visualize_memory(df: pd.DataFrame, dataset="fba", results_dir: Path = RESULTS_DIR,
+                     show: bool = True, formats: Sequence[str] = FIGURE_FORMATS):
+    """Visualizes the memory footprint comparison.
+
+    Only results with memory tracking are plotted (simulators without memory
+    columns, e.g. SBSCL, are skipped). The figures are stored in
+    `<results_dir>/<dataset>`.
+    """
+    if not set(MEMORY_COLUMNS).issubset(df.columns):
+        print(f"No memory columns in {dataset} results, run with memory tracking.")
+        return
+    df = df[df[list(MEMORY_COLUMNS)].notna().any(axis=1)]
+    simulators = df.simulator.unique()
+    models = np.sort(df.model.unique())
+    positions = pd.Series(np.arange(len(models)), index=models)
+    # [bytes] -> [MiB], median over repeats
+    medians = df.groupby(["simulator", "model"])[list(MEMORY_COLUMNS)].median() / 2**20
+
+    for memory_key in MEMORY_COLUMNS:
         fig: plt.Figure
         ax: plt.Axes
-        fig, ax = plt.subplots(nrows=1, ncols=1, figsize=(12, 20), dpi=150)
+        fig, ax = plt.subplots(nrows=1, ncols=1,
+                               figsize=(12, max(4.0, 0.2 * len(models))), dpi=150)
         # ensure labels are plotted
         fig.subplots_adjust(left=0.3)
         for simulator in simulators:
-            df_sim = df[df.simulator == simulator]
-
-            # sns.boxplot(
-            #     y="model",
-            #     x=time_key,
-            #     orient="h",
-            #     ax=ax,
-            #     data=df_sim,
-            #     color=colors[simulator],
-            #     saturation=1.0,
-            #     boxprops={'color': colors[simulator]},
-            #     whis=5.0
-            # )
-            for k, model in enumerate(models):
-                df_model = df[(df.model == model) & (df.simulator == simulator)]
-                y = df_model[time_key]
-                y_mean = y.mean()
-                y_sd = y.std()
-                ax.errorbar(y=k, x=y_mean, xerr=y_sd, color=colors[simulator],
-                            marker="s", markersize=10, markeredgecolor="black",
-                            alpha=0.8)
-                ax.plot(y, [k]*len(y), marker="o", markersize=5,
-                        color=colors[simulator], markeredgecolor="black")
+            y = medians.loc[simulator, memory_key]
+            ax.scatter(y.values, positions[y.index].values, marker="s", s=50,
+                       color=COLORS[simulator], edgecolor="black", alpha=0.8,
+                       rasterized=len(models) > RASTER_THRESHOLD)
 
-        ax.set_xscale("log")
+        ax.set_xscale("symlog", linthresh=1.0)
         ax.set_ylabel("model")
-        ax.set_xlabel(f"{time_key} [s]")
-        ax.set_title(f"{dataset.upper()} {time_key.replace('_', ' ')}")
+        ax.set_xlabel(f"{memory_key} [MiB]")
+        ax.set_title(f"{dataset.upper()} {memory_key.replace('_', ' ')}")
         ax.grid(axis="both")
         ax.set_ylim(-0.5, len(models)-0.5)
-
-        print(simulators)
         ax.set_yticks(range(len(models)))
         ax.set_yticklabels(labels=models)
-        legend_lines = [Line2D([0], [0], color=colors[sim], marker="s", linestyle="") for
-                        sim in simulators]
-        sim_labels = [labels[sim] for sim in simulators]
+        _legend(ax, simulators, bbox_to_anchor=(0, 1, 1, 0), loc="lower left")
+        _save_figure(fig, results_dir / dataset / memory_key, formats=formats, show=show)
 
-        ax.legend(legend_lines, sim_labels,
-                  bbox_to_anchor=(0, 1, 1, 0), loc="lower left")
 
-        plt.savefig(RESULTS_DIR / dataset / f"{time_key}.svg",
-                    bbox_inches="tight")
-        plt.savefig(RESULTS_DIR / dataset / f"{time_key}.pdf",
-                    bbox_inches="tight")
-        plt.show()
+# line style per integrator method of the work-precision curves
+METHOD_STYLES = {
+    "cvode": ("o", "-"),
+    "deterministic": ("o", "-"),
+    "rk45": ("^", "--"),
+    "radau5": ("^", "--"),
+}
+
+
+def visualize_work_precision(df: pd.DataFrame, results_dir: Path = RESULTS_DIR,
+                             show: bool = False, formats: Sequence[str] = FIGURE_FORMATS):
+    """Visualizes the work-precision curves per model.
+
+    Error (RMS relative error against the reference) vs. median simulate time
+    of all simulators and methods over the tolerances, points on the Pareto
+    front of the model are highlighted. The figures are stored in
+    `<results_dir>/ode/work_precision`.
+    """
+    df = df[df.status == "success"]
+    output_dir = results_dir / "ode" / "work_precision"
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    for model_id, df_model in df.groupby("model"):
+        fig: plt.Figure
+        ax: plt.Axes
+        fig, ax = plt.subplots(nrows=1, ncols=1, figsize=(8, 6), dpi=150)
+        legend_lines, legend_labels = [], []
+        for (simulator, method), df_curve in df_model.groupby(["simulator", "method"]):
+            df_curve = df_curve.sort_values("relative_tolerance", ascending=False)
+            marker, linestyle = METHOD_STYLES.get(method, ("s", ":"))
+            line, = ax.plot(df_curve.simulate_time, df_curve.rms_rel_error, marker=marker,
+                            linestyle=linestyle, color=COLORS[simulator], alpha=0.8)
+            legend_lines.append(line)
+            legend_labels.append(f"{LABELS[simulator]} {method}")
+        front = df_model[df_model.pareto.astype(bool)].sort_values("simulate_time")
+        ax.plot(front.simulate_time, front.rms_rel_error, marker="o", markersize=12,
+                markerfacecolor="none", markeredgecolor="black", linestyle="")
+
+        ax.set_xscale("log")
+        ax.set_yscale("log")
+        ax.set_xlabel("simulate time [s]")
+        ax.set_ylabel("RMS relative error")
+        ax.set_title(f"{model_id} work-precision")
+        ax.grid(axis="both", which="major")
+        ax.legend(legend_lines, legend_labels, loc="best")
+        _save_figure(fig, output_dir / model_id, formats=formats, show=show)
 
 
 if __name__ == "__main__":
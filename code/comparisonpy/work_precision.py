@@ -0,0 +1,363 @@
+"""
+Work-precision benchmark of the ODE simulators.
+
+Every model is simulated with the integrator methods of the simulators
+(`METHODS`, e.g. roadrunner CVODE vs RK45, COPASI LSODA vs RADAU5) on a grid
+of tolerances (`TOLERANCES`). The error of every run is measured against a
+reference solution of the model with tight tolerances (`REFERENCE`,
+`REFERENCE_TOLERANCES`) on the common species (concentrations, SBML ids), the
+work is the median time of the repeated simulations (the model is loaded
+once per simulator, the state is reset for every run).
+
+The reference is computed with COPASI RADAU5, i.e. independent of the
+roadrunner integrators. A method measured against itself at tighter
+tolerances has a biased error, so the points of the reference method are
+not part of the Pareto front and are marked as reference in the summary.
+
+The work-precision points are stored in `results/ode/work_precision.tsv`,
+with a flag for the points on the Pareto front (time vs. error) of the model.
+The Pareto summary per simulator and method (cost per digit of accuracy,
+time to reach the target error, share of models on the Pareto front) is
+stored in `results/ode/work_precision_summary.tsv`.
+"""
+import math
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from code.comparisonpy import RESULTS_DIR
+from code.comparisonpy.catalog import (
+    build_catalog, catalog_model_paths, model_id as path_model_id, unsupported_models
+)
+from code.comparisonpy.extraction import (
+    ResultArray, copasi_species_ids, extract_roadrunner, species_columns
+)
+from code.comparisonpy.model_store import read_sbml
+from code.comparisonpy.ode_comparison import Trajectory, align_trajectories, trajectory_errors
+from code.comparisonpy.ode_simulation import SIMULATOR_MODULES, TimeCourseSettings
+from code.comparisonpy.parallel import import_modules, run_tasks
+from code.comparisonpy.timing import PhaseTimer
+
+N_REPEAT = 3
+
+# integrator methods with error control per simulator, the first method is the default
+METHODS = {
+    "roadrunner": ["cvode", "rk45"],
+    "copasi": ["deterministic", "radau5"],
+}
+
+# (absolute tolerance, relative tolerance) from loose to tight
+TOLERANCES = [(10.0 ** -(k + 3), 10.0 ** -k) for k in range(3, 11)]
+
+# reference solution (simulator, method) and its tolerances
+REFERENCE = ("copasi", "radau5")
+REFERENCE_TOLERANCES = (1E-14, 1E-12)
+
+# target error for the time to reach the accuracy
+TARGET_ERROR = 1E-6
+
+POINT_COLUMNS = [
+    "model", "simulator", "method", "absolute_tolerance", "relative_tolerance", "status",
+    "n_samples", "simulate_time", "solve_time", "n_species", "max_rel_error",
+    "rms_rel_error", "digits",
+]
+
+# run(method, absolute_tolerance, relative_tolerance, timer) -> result of a simulation
+RunFunction = Callable[[str, float, float, PhaseTimer], ResultArray]
+
+
+@contextmanager
+def roadrunner_session(path: Path, tc: TimeCourseSettings) -> Iterator[RunFunction]:
+    """Model loaded in roadrunner, yields the run function.
+
+    Species are selected as concentrations and named by SBML id. RK45 has no
+    absolute tolerance, the relative tolerance is used as 'epsilon'.
+    """
+    import roadrunner
+
+    rr: roadrunner.RoadRunner = roadrunner.RoadRunner(read_sbml(path))
+    model: roadrunner.ExecutableModel = rr.model
+    species = list(model.getFloatingSpeciesIds()) + list(model.getBoundarySpeciesIds())
+    rr.selections = ["time"] + [f"[{sid}]" for sid in species]
+    columns = ["time"] + species
+
+    def run(method: str, absolute_tolerance: float, relative_tolerance: float,
+            timer: PhaseTimer) -> ResultArray:
+        with timer.phase("setup"):
+            rr.reset()
+            if rr.integrator.getName() != method:
+                rr.setIntegrator(method)
+            integrator: roadrunner.Integrator = rr.integrator
+            if method == "rk45":
+                integrator.setValue("epsilon", relative_tolerance)
+            else:
+                integrator.setValue("absolute_tolerance", absolute_tolerance)
+                integrator.setValue("relative_tolerance", relative_tolerance)
+        with timer.phase("solve"):
+            s = rr.simulate(start=tc.start, end=tc.end, steps=tc.steps)
+        with timer.phase("extract"):
+            result = extract_roadrunner(s)
+        return ResultArray(result.data, columns=columns)
+
+    yield run
+
+
+@contextmanager
+def copasi_session(path: Path, tc: TimeCourseSettings) -> Iterator[RunFunction]:
+    """Model loaded in COPASI, yields the run function.
+
+    Every run starts from the initial values, species are returned as
+    concentrations and renamed to their SBML ids.
+    """
+    from basico import load_model_from_string, remove_datamodel
+    from code.comparisonpy.copasi_example import run_time_course_array
+
+    dm = load_model_from_string(read_sbml(path))
+    if dm is None:
+        raise RuntimeError(f"COPASI model could not be loaded: '{path_model_id(path)}'")
+    try:
+        species_ids = copasi_species_ids(dm.getModel())
+
+        def run(method: str, absolute_tolerance: float, relative_tolerance: float,
+                timer: PhaseTimer) -> ResultArray:
+            result = run_time_course_array(
+                model=dm, start_time=tc.start, duration=tc.end - tc.start,
+                step_number=tc.steps, a_tol=absolute_tolerance, r_tol=relative_tolerance,
+                method=method, use_initial_values=True, timer=timer,
+            )
+            return ResultArray(result.data, columns=species_columns(result.columns, species_ids))
+
+        yield run
+    finally:
+        remove_datamodel(dm)
+
+
+SESSIONS = {
+    "roadrunner": roadrunner_session,
+    "copasi": copasi_session,
+}
+
+
+def _errors(result: ResultArray, reference: Trajectory) -> Tuple[int, float, float]:
+    """Number of compared species, max and RMS relative error against the reference."""
+    _, y_ref, y, columns = align_trajectories(
+        reference, Trajectory.from_array(result.data, columns=result.columns)
+    )
+    if not columns:
+        return 0, math.nan, math.nan
+    errors = trajectory_errors(y_ref, y)
+    return (len(columns), float(np.nanmax(errors["max_rel_error"])),
+            float(np.sqrt(np.nanmean(errors["rms_rel_error"] ** 2))))
+
+
+def reference_solution(path: Path, tc: TimeCourseSettings,
+                       reference: Tuple[str, str] = REFERENCE) -> Trajectory:
+    """Reference solution of the model with REFERENCE_TOLERANCES."""
+    simulator, method = reference
+    with SESSIONS[simulator](path, tc) as run:
+        result = run(method, *REFERENCE_TOLERANCES, PhaseTimer())
+    return Trajectory.from_array(result.data, columns=result.columns)
+
+
+def work_precision_model(path: Path, simulators: Sequence[str],
+                         methods: Dict[str, List[str]],
+                         tolerances: Sequence[Tuple[float, float]],
+                         n_repeat: int, tc: TimeCourseSettings,
+                         reference: Tuple[str, str] = REFERENCE) -> pd.DataFrame:
+    """Work-precision points of all simulators and methods for a single model.
+
+    Used as task in the parallel mode.
+    """
+    model_id = path_model_id(path)
+    points: List[Dict] = []
+
+    def add(simulator: str, method: str, tolerance: Tuple[float, float], status: str, **kwargs):
+        points.append({
+            "model": model_id, "simulator": simulator, "method": method,
+            "absolute_tolerance": tolerance[0], "relative_tolerance": tolerance[1],
+            "status": status, **kwargs,
+        })
+
+    ref = None
+    if model_id not in unsupported_models(reference[0]):
+        try:
+            ref = reference_solution(path, tc, reference=reference)
+        except (RuntimeError, ValueError) as err:
+            print(f"ERROR in reference of '{model_id}'", err)
+
+    for simulator in simulators:
+        sim_methods = methods[simulator]
+        if ref is None or model_id in unsupported_models(simulator):
+            for method in sim_methods:
+                for tolerance in tolerances:
+                    add(simulator, method, tolerance, "skipped", n_samples=0)
+            continue
+        try:
+            with SESSIONS[simulator](path, tc) as run:
+                for method in sim_methods:
+                    for tolerance in tolerances:
+                        simulate_times, solve_times = [], []
+                        try:
+                            for _ in range(n_repeat):
+                                timer = PhaseTimer()
+                                result = run(method, *tolerance, timer)
+                                simulate_times.append(timer.simulate_time)
+                                solve_times.append(timer.time(["solve"]))
+                        except (RuntimeError, ValueError) as err:
+                            print(f"ERROR in '{model_id}' ({simulator}, {method}, {tolerance})",
+                                  err)
+                            add(simulator, method, tolerance, "failure", n_samples=0)
+                            continue
+                        n_species, max_rel_error, rms_rel_error = _errors(result, ref)
+                        add(simulator, method, tolerance, "success", n_samples=n_repeat,
+                            simulate_time=float(np.median(simulate_times)),
+                            solve_time=float(np.median(solve_times)), n_species=n_species,
+                            max_rel_error=max_rel_error, rms_rel_error=rms_rel_error)
+        except (RuntimeError, ValueError) as err:
+            print(f"ERROR in '{model_id}' ({simulator})", err)
+            for method in sim_methods:
+                for tolerance in tolerances:
+                    add(simulator, method, tolerance, "failure", n_samples=0)
+
+    df = pd.DataFrame(points).reindex(columns=POINT_COLUMNS)
+    # errors below machine precision are counted as machine precision
+    df["digits"] = -np.log10(df["rms_rel_error"].astype(float).clip(lower=np.finfo(float).eps))
+    print(f"work-precision '{model_id}': {(df.status == 'success').sum()}/{len(df)} points")
+    return df
+
+
+def failed_work_precision_model(task: tuple, status: str) -> pd.DataFrame:
+    """Points of a model task which timed out or crashed the worker."""
+    path, simulators, methods, tolerances = task[:4]
+    return pd.DataFrame([
+        {"model": path_model_id(path), "simulator": simulator, "method": method,
+         "absolute_tolerance": atol, "relative_tolerance": rtol, "status": status,
+         "n_samples": 0}
+        for simulator in simulators for method in methods[simulator]
+        for atol, rtol in tolerances
+    ]).reindex(columns=POINT_COLUMNS)
+
+
+def pareto_front(df: pd.DataFrame, time_key: str = "simulate_time",
+                 error_key: str = "rms_rel_error",
+                 exclude: Sequence[Tuple[str, str]] = ()) -> pd.Series:
+    """Flag the points on the Pareto front (time vs. error) per model.
+
+    A point is on the front if no faster (or equally fast) point of the model
+    has a smaller or equal error. Failed points and the points of the
+    excluded (simulator, method), e.g. the reference, are not on the front.
+    """
+    valid = df[time_key].notna() & df[error_key].notna()
+    for simulator, method in exclude:
+        valid &= ~((df["simulator"] == simulator) & (df["method"] == method))
+    df_valid = df[valid].sort_values(["model", time_key, error_key])
+    # smallest error of all faster points of the model
+    best_before = (
+        df_valid.groupby("model")[error_key].cummin()
+        .groupby(df_valid["model"]).shift(1)
+    )
+    on_front = best_before.isna() | (df_valid[error_key] < best_before)
+    return on_front.reindex(df.index, fill_value=False)
+
+
+def pareto_summary(df: pd.DataFrame, target_error: float = TARGET_ERROR,
+                   reference: Tuple[str, str] = REFERENCE) -> pd.DataFrame:
+    """Cost of accuracy per simulator and method.
+
+    - time_per_digit: median over models of the smallest time per digit of
+      accuracy (-log10 of the RMS relative error, points with > 0 digits)
+    - time_at_target: median over models of the smallest time reaching the
+      target error
+    - n_target: number of models in which the target error was reached
+    - pareto_fraction: share of the models with at least one point on the
+      Pareto front of the model (NaN for the reference method)
+    - reference: method of the reference solution, its errors are biased
+    """
+    df = df[df.status == "success"].copy()
+    df["time_per_digit"] = df["simulate_time"] / df["digits"].where(df["digits"] > 0)
+    df["time_at_target"] = df["simulate_time"].where(df["rms_rel_error"] <= target_error)
+    per_model = df.groupby(["simulator", "method", "model"]).agg(
+        time_per_digit=("time_per_digit", "min"),
+        time_at_target=("time_at_target", "min"),
+        pareto=("pareto", "any"),
+    )
+    summary = per_model.groupby(["simulator", "method"]).agg(
+        n_models=("pareto", "size"),
+        time_per_digit=("time_per_digit", "median"),
+        time_at_target=("time_at_target", "median"),
+        n_target=("time_at_target", "count"),
+        pareto_fraction=("pareto", "mean"),
+    ).reset_index()
+    summary["reference"] = ((summary["simulator"] == reference[0]) &
+                            (summary["method"] == reference[1]))
+    summary.loc[summary["reference"], "pareto_fraction"] = np.nan
+    return summary.sort_values("time_per_digit").reset_index(drop=True)
+
+
+def run_work_precision(simulators: Sequence[str] = ("roadrunner", "copasi"),
+                       methods: Optional[Dict[str, List[str]]] = None,
+                       tolerances: Sequence[Tuple[float, float]] = TOLERANCES,
+                       n_repeat: int = N_REPEAT, n_workers: Optional[int] = None,
+                       timeout: Optional[float] = None, pin_cpus: bool = True,
+                       reference: Tuple[str, str] = REFERENCE,
+                       query: Optional[str] = None, models: Optional[List[str]] = None,
+                       time_course: Optional[TimeCourseSettings] = None,
+                       results_dir: Path = RESULTS_DIR) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Work-precision benchmark of the simulators and methods for the models.
+
+    The points are stored in `<results_dir>/ode/work_precision.tsv` and the
+    Pareto summary in `<results_dir>/ode/work_precision_summary.tsv`.
+
+    :param simulators: simulator keys (see `SESSIONS`)
+    :param methods: integrator methods per simulator, `METHODS` if None
+    :param tolerances: (absolute, relative) tolerances
+    :param n_repeat: repeats per point, the work is the median time
+    :param n_workers: number of parallel worker processes (one model per task), serial if None
+    :param timeout: wall-clock timeout per model [s] (parallel mode)
+    :param pin_cpus: pin every worker to a single CPU (parallel mode)
+    :param reference: (simulator, method) of the reference solution
+    :param query: catalog query for selecting models, all models if None
+    :param models: BioModels ids, all models (of the query) if None
+    :param time_course: time course settings (tolerances are ignored), module settings if None
+    :param results_dir: output directory of the results (`<results_dir>/ode`)
+    :return: points, Pareto summary
+    """
+    unknown = [sim for sim in simulators if sim not in SESSIONS]
+    if unknown or reference[0] not in SESSIONS:
+        raise ValueError(f"Unsupported simulators {unknown + [reference[0]]}, "
+                         f"use any of {list(SESSIONS)}")
+    methods = methods if methods is not None else METHODS
+    tc = time_course if time_course is not None else TimeCourseSettings()
+    (results_dir / "ode").mkdir(parents=True, exist_ok=True)
+
+    build_catalog(["biomodels"])
+    model_paths = catalog_model_paths("biomodels", query=query, model_ids=models)
+    modules = sorted({m for sim in set(simulators) | {reference[0]} for m in SIMULATOR_MODULES[sim]})
+    tasks = [(path, simulators, methods, tolerances, n_repeat, tc, reference)
+             for path in model_paths]
+    if n_workers is None:
+        import_modules(modules)
+        dfs = [work_precision_model(*task) for task in tasks]
+    else:
+        dfs = run_tasks(work_precision_model, tasks, n_workers=n_workers, pin_cpus=pin_cpus,
+                        timeout=timeout, on_error=failed_work_precision_model,
+                        initializer=import_modules, initargs=(modules,))
+
+    df = pd.concat(dfs) if dfs else pd.DataFrame(columns=POINT_COLUMNS)
+    df = df.reset_index(drop=True)
+    df["pareto"] = pareto_front(df, exclude=[reference])
+    df.to_csv(results_dir / "ode" / "work_precision.tsv", sep="\t", index=False)
+
+    df_summary = pareto_summary(df, reference=reference)
+    df_summary.to_csv(results_dir / "ode" / "work_precision_summary.tsv", sep="\t", index=False)
+    print(df_summary.to_string(index=False))
+    print(f"reference: {reference[0]} {reference[1]} {REFERENCE_TOLERANCES}, "
+          f"excluded from the Pareto front")
+    return df, df_summary
+
+
+if __name__ == "__main__":
+    run_work_precision()
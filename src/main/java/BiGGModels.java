@@ -20,10 +20,10 @@ public class BiGGModels {
 
             for (int rep = 1; rep <= 5; rep++) {
                 InputStream stream = new GZIPInputStream(new FileInputStream(completePath));
-                double loadTime;
-                double simulateTime;
+                long loadTime;
+                long simulateTime;
 
-                double startTime = System.nanoTime();
+                long startTime = System.nanoTime();
                 SBMLDocument doc = SBMLReader.read(stream);
                 FluxBalanceAnalysis solver = new FluxBalanceAnalysis(doc);
                 loadTime = (System.nanoTime() - startTime);
@@ -46,10 +46,10 @@ public class Biomodels {
                 if (model != null) {
                     solver.reset();
                     try {
-                        double loadTime;
-                        double simulateTime = 0d;
+                        long loadTime;
+                        long simulateTime = 0L;
                         boolean status = true;
-                        double time1 = System.nanoTime();
+                        long time1 = System.nanoTime();
                         SBMLinterpreter interpreter = new SBMLinterpreter(model);
                         loadTime = (System.nanoTime() - time1);
 
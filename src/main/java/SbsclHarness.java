@@ -0,0 +1,263 @@
+import org.sbml.jsbml.Model;
+import org.sbml.jsbml.SBMLDocument;
+import org.sbml.jsbml.SBMLReader;
+import org.simulator.fba.FluxBalanceAnalysis;
+import org.simulator.math.odes.AdaptiveStepsizeIntegrator;
+import org.simulator.math.odes.MultiTable;
+import org.simulator.math.odes.RosenbrockSolver;
+import org.simulator.sbml.SBMLinterpreter;
+
+import java.io.BufferedReader;
+import java.io.ByteArrayOutputStream;
+import java.io.File;
+import java.io.FileInputStream;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.InputStreamReader;
+import java.io.OutputStreamWriter;
+import java.io.PrintStream;
+import java.io.Writer;
+import java.lang.management.ManagementFactory;
+import java.lang.management.ThreadMXBean;
+import java.util.LinkedHashMap;
+import java.util.Map;
+import java.util.zip.GZIPInputStream;
+
+/**
+ * Long-lived SBSCL worker driven by the Python benchmark (code/comparisonpy/sbscl.py).
+ *
+ * Requests are read line by line from stdin, every request is answered with a
+ * single line on stdout as soon as it is finished (tab separated):
+ *
+ *   ode  model_id  path  reload  start  end  steps  atol  rtol  output_path
+ *   fba  model_id  path  reload
+ *   quit
+ *
+ *   ready  java_version
+ *   result  key=value  ...
+ *   error  message
+ *
+ * With reload=0 the model loaded by the previous request is reused (warm mode).
+ * The phases read/parse/compile/setup/solve/extract are reported as
+ * "phase=wall_ns,cpu_ns". Trajectories are written to output_path (if not
+ * empty) after the timings. Output of the libraries is redirected to stderr.
+ */
+public class SbsclHarness {
+
+    private static final ThreadMXBean THREADS = ManagementFactory.getThreadMXBean();
+
+    private final Map<String, long[]> phases = new LinkedHashMap<String, long[]>();
+    private long wallStart;
+    private long cpuStart;
+
+    private String loadedPath = null;
+    private SBMLinterpreter interpreter = null;
+    private FluxBalanceAnalysis fba = null;
+
+    private void start() {
+        wallStart = System.nanoTime();
+        cpuStart = THREADS.getCurrentThreadCpuTime();
+    }
+
+    private void stop(String phase) {
+        long wall = System.nanoTime() - wallStart;
+        long cpu = THREADS.getCurrentThreadCpuTime() - cpuStart;
+        long[] times = phases.get(phase);
+        if (times == null) {
+            phases.put(phase, new long[]{wall, cpu});
+        } else {
+            times[0] += wall;
+            times[1] += cpu;
+        }
+    }
+
+    private static String readModel(String path) throws IOException {
+        InputStream stream = new FileInputStream(path);
+        if (path.endsWith(".gz")) {
+            stream = new GZIPInputStream(stream);
+        }
+        try {
+            ByteArrayOutputStream buffer = new ByteArrayOutputStream();
+            byte[] chunk = new byte[1 << 16];
+            int n;
+            while ((n = stream.read(chunk)) != -1) {
+                buffer.write(chunk, 0, n);
+            }
+            return buffer.toString("UTF-8");
+        } finally {
+            stream.close();
+        }
+    }
+
+    private SBMLDocument load(String path) throws Exception {
+        start();
+        String xml = readModel(path);
+        stop("read");
+        start();
+        SBMLDocument doc = SBMLReader.read(xml);
+        stop("parse");
+        return doc;
+    }
+
+    private String simulate(String[] request) throws Exception {
+        String path = request[2];
+        boolean reload = !"0".equals(request[3]);
+        double startTime = Double.parseDouble(request[4]);
+        double endTime = Double.parseDouble(request[5]);
+        int steps = Integer.parseInt(request[6]);
+        double atol = Double.parseDouble(request[7]);
+        double rtol = Double.parseDouble(request[8]);
+        String outputPath = request.length > 9 ? request[9] : "";
+
+        boolean loaded = false;
+        if (reload || interpreter == null || !path.equals(loadedPath)) {
+            interpreter = null;
+            loadedPath = null;
+            Model model = load(path).getModel();
+            start();
+            interpreter = new SBMLinterpreter(model);
+            stop("compile");
+            loadedPath = path;
+            loaded = true;
+        }
+
+        start();
+        if (!loaded) {
+            // reset state of the loaded model
+            interpreter.init(true);
+        }
+        AdaptiveStepsizeIntegrator solver = new RosenbrockSolver();
+        solver.setAbsTol(atol);
+        solver.setRelTol(rtol);
+        solver.setStepSize((endTime - startTime) / steps);
+        double[] initialValues = interpreter.getInitialValues();
+        stop("setup");
+
+        start();
+        MultiTable solution = solver.solve(interpreter, initialValues, startTime, endTime);
+        stop("solve");
+
+        start();
+        int nRows = solution.getRowCount();
+        int nColumns = solution.getColumnCount();
+        String[] columns = new String[nColumns];
+        double[][] data = new double[nRows][nColumns];
+        for (int j = 0; j < nColumns; j++) {
+            columns[j] = j == 0 ? "time" : solution.getColumnName(j);
+            for (int i = 0; i < nRows; i++) {
+                data[i][j] = solution.getValueAt(i, j);
+            }
+        }
+        stop("extract");
+
+        if (!outputPath.isEmpty()) {
+            writeTSV(outputPath, columns, data);
+        }
+        return "status=" + (solver.isUnstable() ? "failure" : "success");
+    }
+
+    private String optimize(String[] request) throws Exception {
+        String path = request[2];
+        boolean reload = !"0".equals(request[3]);
+
+        if (reload || fba == null || !path.equals(loadedPath)) {
+            fba = null;
+            loadedPath = null;
+            SBMLDocument doc = load(path);
+            // creation of the LP problem
+            start();
+            fba = new FluxBalanceAnalysis(doc);
+            stop("parse");
+            loadedPath = path;
+        }
+
+        start();
+        fba.solve();
+        stop("solve");
+
+        start();
+        double objectiveValue = fba.getObjectiveValue();
+        stop("extract");
+
+        String status = Double.isNaN(objectiveValue) ? "failure" : "optimal";
+        return "status=" + status + "\tobjective_value=" + objectiveValue;
+    }
+
+    private static void writeTSV(String path, String[] columns, double[][] data) throws IOException {
+        File file = new File(path);
+        File parent = file.getParentFile();
+        if (parent != null) {
+            parent.mkdirs();
+        }
+        Writer writer = new OutputStreamWriter(new FileOutputStream(file), "UTF-8");
+        try {
+            StringBuilder line = new StringBuilder();
+            for (int j = 0; j < columns.length; j++) {
+                line.append(j == 0 ? "" : "\t").append(columns[j]);
+            }
+            writer.write(line.append("\n").toString());
+            for (double[] row : data) {
+                line.setLength(0);
+                for (int j = 0; j < row.length; j++) {
+                    line.append(j == 0 ? "" : "\t").append(row[j]);
+                }
+                writer.write(line.append("\n").toString());
+            }
+        } finally {
+            writer.close();
+        }
+    }
+
+    private String handle(String[] request) throws Exception {
+        phases.clear();
+        String result;
+        if ("ode".equals(request[0])) {
+            result = simulate(request);
+        } else if ("fba".equals(request[0])) {
+            result = optimize(request);
+        } else {
+            throw new IllegalArgumentException("Unsupported request '" + request[0] + "'");
+        }
+
+        StringBuilder response = new StringBuilder("result\tmodel=").append(request[1]);
+        response.append("\t").append(result);
+        for (Map.Entry<String, long[]> entry : phases.entrySet()) {
+            response.append("\t").append(entry.getKey()).append("=")
+                    .append(entry.getValue()[0]).append(",").append(entry.getValue()[1]);
+        }
+        return response.toString();
+    }
+
+    public static void main(String[] args) throws IOException {
+        // protocol on stdout, everything else on stderr
+        PrintStream out = new PrintStream(new FileOutputStream(java.io.FileDescriptor.out), true, "UTF-8");
+        System.setOut(System.err);
+
+        SbsclHarness harness = new SbsclHarness();
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in, "UTF-8"));
+        out.println("ready\t" + System.getProperty("java.version"));
+
+        String line;
+        while ((line = in.readLine()) != null) {
+            if (line.isEmpty()) {
+                continue;
+            }
+            String[] request = line.split("\t", -1);
+            if ("quit".equals(request[0])) {
+                break;
+            }
+            String response;
+            try {
+                response = harness.handle(request);
+            } catch (Throwable e) {
+                // keep the worker alive, release the model
+                harness.interpreter = null;
+                harness.fba = null;
+                harness.loadedPath = null;
+                response = "error\t" + String.valueOf(e).replaceAll("[\t\r\n]+", " ");
+            }
+            out.println(response);
+        }
+    }
+}
@@ -0,0 +1,105 @@
+"""
+Tests of the adaptive number of repeats.
+"""
+import math
+
+import numpy as np
+import pytest
+
+from code.comparisonpy.adaptive import (
+    SUMMARY_COLUMNS, AdaptiveSettings, RepeatController, median_ci
+)
+
+
+def _coverage(n, k):
+    """Coverage of [x_(k), x_(n-k+1)] by brute force over all sign patterns."""
+    below = sum(math.comb(n, j) for j in range(k))
+    return 1 - 2 * below / 2 ** n
+
+
+@pytest.mark.parametrize("n, confidence, k", [
+    (6, 0.95, 1),  # coverage 0.969
+    (9, 0.95, 2),  # coverage 0.961
+    (20, 0.95, 6),  # coverage 0.959
+    (5, 0.9, 1),  # coverage 0.938
+    (5, 0.5, 2),  # coverage 0.625
+])
+def test_median_ci_order_statistics(n, confidence, k):
+    x = np.arange(1.0, n + 1)
+    assert _coverage(n, k) >= confidence > _coverage(n, k + 1)
+    rng = np.random.default_rng(1)
+    assert median_ci(rng.permutation(x), confidence=confidence) == (x[k - 1], x[n - k])
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 5])
+def test_median_ci_too_few_samples(n):
+    low, high = median_ci(np.arange(n, dtype=float), confidence=0.95)
+    assert math.isnan(low) and math.isnan(high)
+
+
+def test_median_ci_ignores_nan():
+    x = [3.0, np.nan, 1.0, 2.0, 6.0, np.nan, 5.0, 4.0]
+    assert median_ci(x, confidence=0.95) == (1.0, 6.0)
+    assert all(math.isnan(v) for v in median_ci([np.nan] * 10))
+
+
+def _run(controller, times):
+    """Iterate the controller with the times of the repeats, return the repeats."""
+    repeats = []
+    for repeat in controller:
+        repeats.append(repeat)
+        t = times(repeat)
+        controller.add(load_time=t, simulate_time=t)
+    return repeats
+
+
+def test_fixed_number_of_repeats():
+    controller = RepeatController(3)
+    assert _run(controller, lambda r: 1.0) == [1, 2, 3]
+    summary = dict(zip(SUMMARY_COLUMNS, controller.summary()))
+    assert summary["n_samples"] == 3
+    assert math.isnan(summary["load_time_ci_low"])
+
+
+def test_restore_continues_with_next_repeat():
+    controller = RepeatController(3)
+    controller.restore([{"load_time": 1.0, "simulate_time": 2.0}])
+    assert _run(controller, lambda r: 1.0) == [2, 3]
+    assert controller.samples["simulate_time"] == [2.0, 1.0, 1.0]
+
+    controller = RepeatController(2)
+    controller.restore([{"load_time": 1.0, "simulate_time": 1.0}] * 2)
+    assert list(controller) == []
+
+
+def test_adaptive_stops_when_converged():
+    adaptive = AdaptiveSettings(rel_width=0.05, max_repeat=50, time_budget=60.0)
+    # constant times, the CI exists from 6 samples on (95%)
+    assert _run(RepeatController(3, adaptive=adaptive), lambda r: 1.0) == list(range(1, 7))
+    # at least n_repeat repeats
+    assert len(_run(RepeatController(10, adaptive=adaptive), lambda r: 1.0)) == 10
+
+
+def test_adaptive_continues_until_limits():
+    adaptive = AdaptiveSettings(rel_width=0.01, max_repeat=12, time_budget=60.0)
+    # alternating times never converge
+    controller = RepeatController(3, adaptive=adaptive)
+    assert len(_run(controller, lambda r: 1.0 + r % 2)) == 12
+    assert not controller.converged()
+
+    adaptive = AdaptiveSettings(rel_width=0.01, max_repeat=12, time_budget=0.0)
+    assert _run(RepeatController(3, adaptive=adaptive), lambda r: 1.0 + r % 2) == [1]
+
+
+def test_adaptive_checks_only_keys_with_samples():
+    adaptive = AdaptiveSettings(rel_width=0.05, max_repeat=50)
+    controller = RepeatController(3, adaptive=adaptive, keys=["simulate_time"])
+    for repeat in controller:
+        controller.add(load_time=1.0 + repeat % 2, simulate_time=1.0)
+    assert len(controller.samples["simulate_time"]) == 6
+
+    # failed repeats (NaN) are not checked
+    controller = RepeatController(3, adaptive=adaptive)
+    for _ in controller:
+        controller.add(load_time=np.nan, simulate_time=1.0)
+    assert len(controller.samples["simulate_time"]) == 6
@@ -0,0 +1,113 @@
+"""
+Tests of the model catalog.
+"""
+import gzip
+import hashlib
+
+import pytest
+
+import code.comparisonpy
+from code.comparisonpy import biomodels_model_paths, catalog
+from code.comparisonpy.model_store import file_hash, read_sbml
+
+pytest.importorskip("libsbml")
+
+SBML = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<sbml xmlns="http://www.sbml.org/sbml/level3/version1/core" level="3" version="1">\n'
+    '  <model id="m1">\n'
+    '    <listOfCompartments>\n'
+    '      <compartment id="c" size="1" constant="true"/>\n'
+    '    </listOfCompartments>\n'
+    '    <listOfSpecies>\n'
+    '      <species id="A" compartment="c" initialConcentration="1" hasOnlySubstanceUnits="false"'
+    ' boundaryCondition="false" constant="false"/>\n'
+    '    </listOfSpecies>\n'
+    '  </model>\n'
+    '</sbml>\n'
+)
+
+SBML_NO_MODEL = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<sbml xmlns="http://www.sbml.org/sbml/level3/version1/core" level="3" version="1"/>\n'
+)
+
+
+@pytest.fixture
+def models_dir(tmp_path, monkeypatch):
+    """Collection 'test' with a valid model and a file without model."""
+    models_dir = tmp_path / "models"
+    (models_dir / "test").mkdir(parents=True)
+    (models_dir / "test" / "m1.xml").write_text(SBML)
+    (models_dir / "test" / "m2.xml").write_text(SBML_NO_MODEL)
+    with gzip.open(models_dir / "test" / "m3.xml.gz", "wt") as f_out:
+        f_out.write(SBML)
+    monkeypatch.setattr(catalog, "MODELS_DIR", models_dir)
+    monkeypatch.setitem(catalog.COLLECTIONS, "test", lambda: sorted(
+        list((models_dir / "test").glob("*.xml")) + list((models_dir / "test").glob("*.xml.gz"))
+    ))
+    return models_dir
+
+
+def test_build_catalog_records_errors(models_dir, tmp_path, monkeypatch):
+    catalog_path = tmp_path / "catalog.tsv"
+    df = catalog.build_catalog(["test"], catalog_path=catalog_path).set_index("model")
+    assert df.loc["m1", "status"] == catalog.STATUS_OK
+    assert df.loc["m1", "n_species"] == 1
+    assert df.loc["m2", "status"] == catalog.STATUS_ERROR
+    assert "No model" in df.loc["m2", "error"]
+    # gzipped models are cataloged by model id
+    assert df.loc["m3", "status"] == catalog.STATUS_OK
+    assert df.loc["m3", "path"] == "test/m3.xml.gz"
+
+    # error entries are reused and never selected
+    assert len(catalog.build_catalog(["test"], catalog_path=catalog_path)) == 3
+    monkeypatch.setattr(catalog, "load_catalog", lambda: df.reset_index())
+    assert catalog.catalog_model_paths("test", longest_first=False) == [
+        models_dir / "test" / "m1.xml", models_dir / "test" / "m3.xml.gz"
+    ]
+
+    # requested error entries are skipped, unknown models raise
+    assert catalog.catalog_model_paths("test", model_ids=["m1", "m2"]) == [
+        models_dir / "test" / "m1.xml"
+    ]
+    assert catalog.catalog_model_paths("test", model_ids=["m2"]) == []
+    with pytest.raises(ValueError, match="m3"):
+        catalog.catalog_model_paths("test", model_ids=["m1", "m3"])
+
+
+def test_file_hash(tmp_path):
+    content = SBML.encode()
+    path = tmp_path / "m1.xml"
+    path.write_bytes(content)
+    gz_path = tmp_path / "m1.xml.gz"
+    with gzip.open(gz_path, "wb") as f_out:
+        f_out.write(content)
+
+    sha256 = hashlib.sha256(content).hexdigest()
+    assert file_hash(path) == sha256
+    assert file_hash(path, chunk_size=7) == sha256
+    assert file_hash(path, decompress=True) == sha256
+    assert file_hash(gz_path, decompress=True) == sha256
+    assert file_hash(gz_path) == hashlib.sha256(gz_path.read_bytes()).hexdigest()
+
+
+def test_read_sbml(tmp_path):
+    path = tmp_path / "m1.xml"
+    path.write_text(SBML)
+    gz_path = tmp_path / "m1.xml.gz"
+    with gzip.open(gz_path, "wt") as f_out:
+        f_out.write(SBML)
+    assert read_sbml(path) == read_sbml(gz_path) == SBML
+
+
+def test_biomodels_model_paths_gzip(tmp_path, monkeypatch):
+    (tmp_path / "biomodels").mkdir()
+    (tmp_path / "biomodels" / "BIOMD0000000001.xml").write_text(SBML)
+    (tmp_path / "biomodels" / "BIOMD0000000002.xml.gz").write_bytes(gzip.compress(SBML.encode()))
+    (tmp_path / "biomodels" / "manifest.json").write_text("{}")
+    monkeypatch.setattr(code.comparisonpy, "MODELS_DIR", tmp_path)
+
+    paths = biomodels_model_paths()
+    assert [p.name for p in paths] == ["BIOMD0000000001.xml", "BIOMD0000000002.xml.gz"]
+    assert [catalog.model_id(p) for p in paths] == ["BIOMD0000000001", "BIOMD0000000002"]
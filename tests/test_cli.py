@@ -0,0 +1,88 @@
+"""
+Tests of the command line parser.
+"""
+import pandas as pd
+import pytest
+
+from code.comparisonpy.cli import create_parser, main
+
+
+def test_fba_source_choices():
+    parser = create_parser()
+    assert parser.parse_args(["fba", "--source", "store_pickle"]).source == "store_pickle"
+    with pytest.raises(SystemExit):
+        parser.parse_args(["fba", "--source", "json"])
+
+
+def test_ensemble_arguments():
+    args = create_parser().parse_args(
+        ["ensemble", "--simulators", "roadrunner", "--runs", "10", "--workers", "2"]
+    )
+    assert (args.command, args.simulators, args.runs, args.workers) == (
+        "ensemble", ["roadrunner"], 10, 2
+    )
+
+
+def test_fba_scenarios_arguments():
+    args = create_parser().parse_args(
+        ["fba-scenarios", "--kinds", "gene", "--query", "n_reactions < 1000"]
+    )
+    assert (args.command, args.kinds, args.simulators, args.source) == (
+        "fba-scenarios", ["gene"], ["cobrapy", "cameo"], "sbml"
+    )
+
+
+def _write_fba_results(path, objective_values):
+    pd.DataFrame({
+        "model": list(objective_values), "objective_value": list(objective_values.values()),
+        "status": "optimal", "iterations": 10, "solve_time": 0.1, "simulate_time": 0.2,
+    }).to_csv(path, sep="\t", index=False)
+
+
+def test_compare_fba_solvers(tmp_path):
+    fba_dir = tmp_path / "fba"
+    fba_dir.mkdir()
+    _write_fba_results(fba_dir / "bigg_sbscl.tsv", {"m1": 10.0, "m2": 5.0})
+    _write_fba_results(fba_dir / "bigg_cobrapy_glpk.tsv", {"m1": 10.0, "m2": 5.0})
+    _write_fba_results(fba_dir / "bigg_cobrapy_glpk_exact.tsv", {"m1": 10.0, "m2": 4.0})
+    # stale results of the default solver are not compared
+    _write_fba_results(fba_dir / "bigg_cobrapy.tsv", {"m1": 1.0, "m2": 1.0})
+
+    assert main(["compare", "fba", "--simulators", "cobrapy",
+                 "--solvers", "glpk", "glpk_exact", "--output", str(tmp_path)]) == 0
+    df = pd.read_csv(fba_dir / "bigg_cobrapy_comparison.tsv", sep="\t")
+    assert df.identical.all()
+    df_summary = pd.read_csv(fba_dir / "bigg_cobrapy_comparison_solvers_summary.tsv",
+                             sep="\t").set_index("solver")
+    assert df_summary.correct.to_dict() == {"glpk": True, "glpk_exact": False}
+
+
+def test_compare_fba_solvers_without_default_results(tmp_path):
+    fba_dir = tmp_path / "fba"
+    fba_dir.mkdir()
+    _write_fba_results(fba_dir / "bigg_sbscl.tsv", {"m1": 10.0})
+    _write_fba_results(fba_dir / "bigg_cobrapy_glpk.tsv", {"m1": 10.0})
+
+    main(["compare", "fba", "--simulators", "cobrapy", "--solvers", "glpk",
+          "--output", str(tmp_path)])
+    assert (fba_dir / "bigg_cobrapy_comparison_solvers.tsv").exists()
+
+
+def test_compare_ode_trajectory_format(tmp_path):
+    pytest.importorskip("pyarrow")
+    import numpy as np
+    from code.comparisonpy.trajectories import write_trajectory
+
+    t = np.linspace(0, 10, 11)
+    data = np.column_stack([t, np.exp(-t / 3)])
+    for simulator in ["roadrunner", "copasi"]:
+        write_trajectory(data, ["time", "[S1]"], model_id="m1", simulator=simulator,
+                         repeat=1, trajectory_dir=tmp_path / "ode" / "trajectories")
+
+    assert main(["compare", "ode", "--simulators", "roadrunner", "copasi",
+                 "--format", "arrow", "--output", str(tmp_path)]) == 0
+    df = pd.read_csv(tmp_path / "ode" / "comparison_trajectories.tsv", sep="\t")
+    assert df[["model", "simulator_a", "simulator_b"]].values.tolist() == [
+        ["m1", "roadrunner", "copasi"]
+    ]
+    assert df.identical.all()
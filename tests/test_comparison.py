@@ -0,0 +1,26 @@
+"""
+Tests of the FBA comparison.
+"""
+import pandas as pd
+
+from code.comparisonpy.comparison import compare_fba_results
+
+
+def _write_results(path, objective_values):
+    pd.DataFrame({
+        "model": list(objective_values),
+        "objective_value": list(objective_values.values()),
+    }).to_csv(path, sep="\t", index=False)
+
+
+def test_compare_fba_results_collection(tmp_path):
+    fba_dir = tmp_path / "fba"
+    fba_dir.mkdir()
+    _write_results(fba_dir / "synthetic_sbscl.tsv", {"m1": 10.0, "m2": 5.0})
+    _write_results(fba_dir / "synthetic_cobrapy.tsv", {"m1": 10.0, "m2": 4.0})
+
+    path = compare_fba_results(simulator="cobrapy", results_dir=tmp_path,
+                               collection="synthetic")
+    assert path == fba_dir / "synthetic_cobrapy_comparison.tsv"
+    df = pd.read_csv(path, sep="\t").set_index("mid")
+    assert df.identical.to_dict() == {"m1": True, "m2": False}
@@ -0,0 +1,335 @@
+"""
+Tests of the BioModels download against a local stand-in server.
+
+The server serves a minimal fake of the BioModels API (search, file
+information and model download) with ETag/Last-Modified headers and
+conditional requests. Failures are injected per path.
+"""
+import gzip
+import hashlib
+import json
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from code.comparisonpy.download_biomodels import (
+    MANIFEST_FILENAME,
+    create_session,
+    download_biomodel_sbml,
+    download_biomodels,
+    query_curated_biomodels,
+    read_manifest,
+    stream_to_file,
+)
+
+SBML = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<sbml xmlns="http://www.sbml.org/sbml/level3/version1/core" level="3" version="1">\n'
+    '  <model id="{mid}"/>\n'
+    '</sbml>\n'
+)
+
+
+class FakeBioModels:
+    """State of the stand-in BioModels server."""
+
+    def __init__(self, model_ids: List[str]):
+        self.models: Dict[str, bytes] = {
+            mid: SBML.format(mid=mid).encode() for mid in model_ids
+        }
+        self.file_sizes: Dict[str, int] = {}  # reported fileSize overrides
+        self.checksums: Dict[str, str] = {}  # reported sha256 of the file information
+        self.failures: Dict[str, List[int]] = {}  # path -> status codes of next requests
+        self.requests: List[Dict] = []
+        self.last_modified = formatdate(usegmt=True)
+        self.lock = threading.Lock()
+        self.base_url = ""
+
+    def etag(self, mid: str) -> str:
+        return '"' + hashlib.sha256(self.models[mid]).hexdigest()[:16] + '"'
+
+    def downloads(self, mid: str) -> List[Dict]:
+        """Download requests of the model."""
+        return [r for r in self.requests if r["path"] == f"/model/download/{mid}"]
+
+
+def _handler(state: FakeBioModels):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: bytes = b"", headers: Dict = None):
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, data):
+            self._send(200, json.dumps(data).encode(),
+                       {"Content-Type": "application/json"})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            with state.lock:
+                state.requests.append({"path": url.path, "params": params,
+                                       "headers": dict(self.headers)})
+                failures = state.failures.get(url.path)
+                status = failures.pop(0) if failures else None
+            if status is not None:
+                return self._send(status)
+
+            mids = sorted(state.models)
+            if url.path == "/search":
+                offset, n = int(params["offset"]), int(params["numResults"])
+                return self._send_json({
+                    "matches": len(mids),
+                    "models": [{"id": mid} for mid in mids[offset:offset + n]],
+                })
+
+            if url.path.startswith("/model/download/"):
+                mid = url.path.split("/")[-1]
+                if params.get("filename") != f"{mid}_url.xml":
+                    return self._send(404)
+                headers = {"ETag": state.etag(mid), "Last-Modified": state.last_modified}
+                if self.headers.get("If-None-Match") == state.etag(mid):
+                    self.send_response(304)
+                    for key, value in headers.items():
+                        self.send_header(key, value)
+                    self.end_headers()
+                    return
+                return self._send(200, state.models[mid], headers)
+
+            mid = url.path.lstrip("/")
+            if mid not in state.models:
+                return self._send(404)
+            file_info = {
+                "name": f"{mid}_url.xml",
+                "fileSize": state.file_sizes.get(mid, len(state.models[mid])),
+            }
+            if mid in state.checksums:
+                file_info["sha256"] = state.checksums[mid]
+            return self._send_json({"files": {"main": [file_info]}})
+
+    return Handler
+
+
+@pytest.fixture
+def biomodels_server():
+    """Stand-in BioModels server on localhost in a background thread."""
+    state = FakeBioModels(["BIOMD0000000001", "BIOMD0000000002", "BIOMD0000000003"])
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(state))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield state
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_query_curated_biomodels_pages(biomodels_server, monkeypatch):
+    monkeypatch.setattr("code.comparisonpy.download_biomodels.PAGE_SIZE", 2)
+    mids = query_curated_biomodels(base_url=biomodels_server.base_url, max_workers=2)
+    assert mids == sorted(biomodels_server.models)
+    offsets = sorted(int(r["params"]["offset"]) for r in biomodels_server.requests
+                     if r["path"] == "/search" and r["params"]["numResults"] == "2")
+    assert offsets == [0, 2]
+
+
+def test_download_retries_server_errors(biomodels_server, tmp_path):
+    mid = "BIOMD0000000001"
+    biomodels_server.failures[f"/model/download/{mid}"] = [503]
+    entry = download_biomodel_sbml(mid, tmp_path / f"{mid}.xml",
+                                   session=create_session(retries=2),
+                                   base_url=biomodels_server.base_url)
+    assert (tmp_path / f"{mid}.xml").read_bytes() == biomodels_server.models[mid]
+    assert len(biomodels_server.downloads(mid)) == 2
+    assert entry["size"] == len(biomodels_server.models[mid])
+
+
+def test_download_fails_after_retries(biomodels_server, tmp_path):
+    mid = "BIOMD0000000001"
+    biomodels_server.failures[f"/model/download/{mid}"] = [500, 500]
+    with pytest.raises(requests.RequestException):
+        download_biomodel_sbml(mid, tmp_path / f"{mid}.xml",
+                               session=create_session(retries=1),
+                               base_url=biomodels_server.base_url)
+    assert not (tmp_path / f"{mid}.xml").exists()
+    assert not (tmp_path / f"{mid}.xml.part").exists()
+
+
+def test_conditional_request_not_modified(biomodels_server, tmp_path):
+    mid = "BIOMD0000000001"
+    path = tmp_path / f"{mid}.xml"
+    entry = download_biomodel_sbml(mid, path, base_url=biomodels_server.base_url)
+    assert entry["etag"] == biomodels_server.etag(mid)
+    assert entry["last_modified"] == biomodels_server.last_modified
+    mtime = path.stat().st_mtime_ns
+
+    entry_304 = download_biomodel_sbml(mid, path, base_url=biomodels_server.base_url,
+                                       entry=entry)
+    assert entry_304 == entry
+    assert path.stat().st_mtime_ns == mtime
+    headers = biomodels_server.downloads(mid)[-1]["headers"]
+    assert headers["If-None-Match"] == entry["etag"]
+    assert headers["If-Modified-Since"] == entry["last_modified"]
+
+
+def test_changed_model_is_refetched(biomodels_server, tmp_path):
+    mid = "BIOMD0000000001"
+    path = tmp_path / f"{mid}.xml"
+    entry = download_biomodel_sbml(mid, path, base_url=biomodels_server.base_url)
+    biomodels_server.models[mid] = SBML.format(mid=mid + "_v2").encode()
+
+    entry_new = download_biomodel_sbml(mid, path, base_url=biomodels_server.base_url,
+                                       entry=entry)
+    assert path.read_bytes() == biomodels_server.models[mid]
+    assert entry_new["etag"] != entry["etag"]
+    assert entry_new["sha256"] == hashlib.sha256(biomodels_server.models[mid]).hexdigest()
+
+
+def test_modified_local_file_is_refetched(biomodels_server, tmp_path):
+    mid = "BIOMD0000000001"
+    path = tmp_path / f"{mid}.xml"
+    entry = download_biomodel_sbml(mid, path, base_url=biomodels_server.base_url)
+    path.write_text("corrupted")
+
+    download_biomodel_sbml(mid, path, base_url=biomodels_server.base_url, entry=entry)
+    assert "If-None-Match" not in biomodels_server.downloads(mid)[-1]["headers"]
+    assert path.read_bytes() == biomodels_server.models[mid]
+
+
+def test_size_mismatch_leaves_no_file(biomodels_server, tmp_path):
+    mid = "BIOMD0000000001"
+    path = tmp_path / f"{mid}.xml"
+    biomodels_server.file_sizes[mid] = 1
+    with pytest.raises(ValueError, match="Size"):
+        download_biomodel_sbml(mid, path, base_url=biomodels_server.base_url)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_checksum_mismatch_leaves_no_file(biomodels_server, tmp_path):
+    mid = "BIOMD0000000001"
+    path = tmp_path / f"{mid}.xml"
+    biomodels_server.checksums[mid] = "0" * 64
+    with pytest.raises(ValueError, match="Checksum"):
+        download_biomodel_sbml(mid, path, base_url=biomodels_server.base_url)
+    assert list(tmp_path.iterdir()) == []
+
+    biomodels_server.checksums[mid] = hashlib.sha256(biomodels_server.models[mid]).hexdigest()
+    entry = download_biomodel_sbml(mid, path, base_url=biomodels_server.base_url)
+    assert entry["sha256"] == biomodels_server.checksums[mid]
+
+
+def test_refetch_is_checked_against_manifest(biomodels_server, tmp_path):
+    mid = "BIOMD0000000001"
+    path = tmp_path / f"{mid}.xml"
+    entry = download_biomodel_sbml(mid, path, base_url=biomodels_server.base_url)
+    path.unlink()
+
+    # same file (ETag) on the server, but other checksum in the manifest
+    with pytest.raises(ValueError, match="Checksum"):
+        download_biomodel_sbml(mid, path, base_url=biomodels_server.base_url,
+                               entry=dict(entry, sha256="0" * 64))
+    assert list(tmp_path.iterdir()) == []
+
+    assert download_biomodel_sbml(mid, path, base_url=biomodels_server.base_url,
+                                  entry=entry) == entry
+    assert path.read_bytes() == biomodels_server.models[mid]
+
+
+def test_stream_to_file_checksum(biomodels_server, tmp_path):
+    mid = "BIOMD0000000001"
+    content = biomodels_server.models[mid]
+    url = f"{biomodels_server.base_url}/model/download/{mid}"
+    params = {"filename": f"{mid}_url.xml"}
+    session = create_session()
+
+    path = tmp_path / f"{mid}.xml"
+    with session.get(url, params=params, stream=True) as response:
+        with pytest.raises(ValueError, match="Size"):
+            stream_to_file(response, path, expected_size=len(content) + 1)
+    with session.get(url, params=params, stream=True) as response:
+        with pytest.raises(ValueError, match="Checksum"):
+            stream_to_file(response, path, expected_sha256="0" * 64)
+    assert list(tmp_path.iterdir()) == []
+
+    sha256 = hashlib.sha256(content).hexdigest()
+    with session.get(url, params=params, stream=True) as response:
+        info = stream_to_file(response, path, expected_size=len(content),
+                              expected_sha256=sha256)
+    assert info == {"size": len(content), "sha256": sha256}
+    assert path.read_bytes() == content
+    assert not path.with_name(path.name + ".part").exists()
+
+    # gzipped on the fly, size and checksum of the uncompressed content
+    gz_path = tmp_path / f"{mid}.xml.gz"
+    with session.get(url, params=params, stream=True) as response:
+        info = stream_to_file(response, gz_path, expected_size=len(content),
+                              expected_sha256=sha256)
+    assert info == {"size": len(content), "sha256": sha256}
+    with gzip.open(gz_path, "rb") as f_in:
+        assert f_in.read() == content
+
+
+def test_download_biomodels_manifest(biomodels_server, tmp_path):
+    manifest = download_biomodels(base_url=biomodels_server.base_url, models_dir=tmp_path,
+                                  max_workers=2)
+    assert sorted(manifest) == sorted(biomodels_server.models)
+    assert read_manifest(tmp_path) == manifest
+    for mid, entry in manifest.items():
+        assert entry["path"] == f"{mid}.xml"
+        assert entry["sha256"] == hashlib.sha256(biomodels_server.models[mid]).hexdigest()
+    n_requests = len(biomodels_server.requests)
+
+    # second run only sends conditional requests
+    assert download_biomodels(base_url=biomodels_server.base_url,
+                              models_dir=tmp_path) == manifest
+    downloads = [r for r in biomodels_server.requests[n_requests:]
+                 if r["path"].startswith("/model/download/")]
+    assert len(downloads) == len(manifest)
+    assert all("If-None-Match" in r["headers"] for r in downloads)
+
+
+def test_download_biomodels_failure_keeps_entry(biomodels_server, tmp_path):
+    mids = sorted(biomodels_server.models)
+    manifest = download_biomodels(mids, base_url=biomodels_server.base_url,
+                                  models_dir=tmp_path)
+    biomodels_server.models[mids[0]] = b"changed"
+    biomodels_server.failures[f"/model/download/{mids[0]}"] = [404]
+
+    manifest_new = download_biomodels(mids, base_url=biomodels_server.base_url,
+                                      models_dir=tmp_path)
+    assert manifest_new == manifest
+    assert read_manifest(tmp_path) == manifest
+    assert (tmp_path / MANIFEST_FILENAME).exists()
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_download_biomodels_compressed(biomodels_server, tmp_path):
+    mid = "BIOMD0000000002"
+    download_biomodels([mid], base_url=biomodels_server.base_url, models_dir=tmp_path)
+    manifest = download_biomodels([mid], base_url=biomodels_server.base_url,
+                                  models_dir=tmp_path, compress=True)
+    path = tmp_path / f"{mid}.xml.gz"
+    with gzip.open(path, "rb") as f_in:
+        assert f_in.read() == biomodels_server.models[mid]
+    assert manifest[mid]["path"] == path.name
+    assert manifest[mid]["sha256"] == hashlib.sha256(biomodels_server.models[mid]).hexdigest()
+    # the uncompressed file of the previous download is replaced
+    assert not (tmp_path / f"{mid}.xml").exists()
+
+    # compressed file is current, only a conditional request is sent
+    assert download_biomodels([mid], base_url=biomodels_server.base_url,
+                              models_dir=tmp_path, compress=True) == manifest
+    assert "If-None-Match" in biomodels_server.downloads(mid)[-1]["headers"]
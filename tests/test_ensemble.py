@@ -0,0 +1,46 @@
+"""
+Tests of the ensemble simulations.
+"""
+import numpy as np
+import pytest
+
+from code.comparisonpy.ensemble import run_ensemble_copasi, run_ensemble_roadrunner
+
+pytest.importorskip("roadrunner")
+pytest.importorskip("basico")
+
+# species S depends on the parameter k via an initial assignment
+SBML = """<?xml version="1.0" encoding="UTF-8"?>
+<sbml xmlns="http://www.sbml.org/sbml/level3/version1/core" level="3" version="1">
+  <model id="initial_assignment">
+    <listOfCompartments>
+      <compartment id="c" size="1" constant="true"/>
+    </listOfCompartments>
+    <listOfSpecies>
+      <species id="S" compartment="c" initialConcentration="0" hasOnlySubstanceUnits="false"
+               boundaryCondition="false" constant="false"/>
+    </listOfSpecies>
+    <listOfParameters>
+      <parameter id="k" value="1" constant="true"/>
+    </listOfParameters>
+    <listOfInitialAssignments>
+      <initialAssignment symbol="S">
+        <math xmlns="http://www.w3.org/1998/Math/MathML">
+          <apply><times/><cn> 2 </cn><ci> k </ci></apply>
+        </math>
+      </initialAssignment>
+    </listOfInitialAssignments>
+  </model>
+</sbml>
+"""
+
+
+def test_initial_assignments_of_perturbed_parameters(tmp_path):
+    path = tmp_path / "initial_assignment.xml"
+    path.write_text(SBML, encoding="utf-8")
+    values = np.array([[1.0], [3.0], [0.5]])
+
+    results = [f(path, ["k"], values) for f in (run_ensemble_roadrunner, run_ensemble_copasi)]
+    for result in results:
+        initial = result.data[:, 0, result.columns.index("S")]
+        np.testing.assert_allclose(initial, 2 * values[:, 0])
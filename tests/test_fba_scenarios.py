@@ -0,0 +1,29 @@
+"""
+Tests of the FBA scenario benchmark (without simulator backends).
+"""
+from pathlib import Path
+
+import pytest
+
+from code.comparisonpy import fba_scenarios
+
+pytest.importorskip("cobra")
+
+
+def test_optimize_scenarios_records_failures(tmp_path, monkeypatch):
+    def run_scenarios(simulator, path, kind, **kwargs):
+        if path.name == "broken.xml.gz":
+            raise OSError("Not a gzipped file")
+        summary = {"model": fba_scenarios.bigg_model_id(path), "simulator": simulator,
+                   "kind": kind, "status": "success", "n_lps": 2}
+        return None, summary
+
+    monkeypatch.setattr(fba_scenarios, "run_scenarios", run_scenarios)
+    paths = [Path("broken.xml.gz"), Path("e_coli_core.xml.gz")]
+    df = fba_scenarios.optimize_scenarios(kind="gene", simulators=["cobrapy"],
+                                          model_paths=paths, results_dir=tmp_path)
+
+    assert list(df.model) == ["broken", "e_coli_core"]
+    assert list(df.status) == ["failure", "success"]
+    assert df.n_lps.isna().tolist() == [True, False]
+    assert (tmp_path / "fba" / "scenarios_gene.tsv").exists()
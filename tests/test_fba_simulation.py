@@ -0,0 +1,38 @@
+"""
+Tests of the FBA benchmark runner (without simulator backends).
+"""
+from pathlib import Path
+
+from code.comparisonpy.fba_simulation import RESULT_COLUMNS, failed_model_repeats
+from code.comparisonpy.ledger import RunLedger
+
+
+def test_failed_model_repeats_keeps_finished_repeats(tmp_path):
+    ledger = RunLedger.open({"dataset": "fba"}, path=tmp_path / "ledger.sqlite")
+    finished = {column: None for column in RESULT_COLUMNS}
+    finished.update({"model": "e_coli_core", "status": "optimal", "repeat": 1})
+    ledger.add("e_coli_core", "cobrapy", 1, finished)
+    ledger.add("e_coli_core", "cameo", 1, {**finished, "repeat": 1})
+    ledger.complete("e_coli_core", "cameo", {"n_samples": 1})
+
+    task = (["cobrapy", "cameo"], Path("e_coli_core.xml.gz"), 3, "cold", "sbml",
+            None, False, ledger, None)
+    df = failed_model_repeats(task, "timeout")
+
+    # completed simulators and finished repeats are not overwritten
+    assert set(df.simulator) == {"cobrapy"}
+    assert list(df.repeat) == [2, 3]
+    assert set(df.status) == {"timeout"}
+    repeats = ledger.repeats("e_coli_core", "cobrapy")
+    assert [(r["repeat"], r["status"]) for r in repeats] == [
+        (1, "optimal"), (2, "timeout"), (3, "timeout")
+    ]
+    assert ledger.is_complete("e_coli_core", "cobrapy")
+
+
+def test_failed_model_repeats_without_ledger():
+    task = (["cobrapy"], Path("e_coli_core.xml.gz"), 2, "cold", "sbml",
+            None, False, None, None)
+    df = failed_model_repeats(task, "crash")
+    assert list(df.repeat) == [1, 2]
+    assert set(df.status) == {"crash"}
@@ -0,0 +1,136 @@
+"""
+Tests of the run ledger.
+"""
+import pytest
+
+from code.comparisonpy.adaptive import SUMMARY_COLUMNS
+from code.comparisonpy.ledger import RunLedger
+from code.comparisonpy.memory import MemoryTracker
+from code.comparisonpy.ode_simulation import (
+    RESULT_COLUMNS, _add_result, _complete_model, _repeat_controller
+)
+from code.comparisonpy.timing import PhaseTimer
+
+CONFIG = {"dataset": "ode", "mode": "cold", "n_repeat": 3,
+          "versions": {"libroadrunner": "2.0.5"}}
+
+
+@pytest.fixture
+def ledger_path(tmp_path):
+    return tmp_path / "ledger.sqlite"
+
+
+def _data(model, repeat, load_time=1.0):
+    return {"model": model, "status": "success", "repeat": repeat,
+            "load_time": load_time, "simulate_time": 2.0}
+
+
+def test_open_resumes_sweep_of_config(ledger_path):
+    ledger = RunLedger.open(CONFIG, path=ledger_path)
+    assert RunLedger.open(CONFIG, path=ledger_path).sweep_id == ledger.sweep_id
+    new_ledger = RunLedger.open(CONFIG, resume=False, path=ledger_path)
+    assert new_ledger.sweep_id != ledger.sweep_id
+    # the last sweep of the configuration is resumed
+    assert RunLedger.open(CONFIG, path=ledger_path).sweep_id == new_ledger.sweep_id
+    other = RunLedger.open({**CONFIG, "n_repeat": 5}, path=ledger_path)
+    assert other.sweep_id not in (ledger.sweep_id, new_ledger.sweep_id)
+
+
+def test_version_change_starts_new_sweep(ledger_path):
+    ledger = RunLedger.open(CONFIG, path=ledger_path)
+    assert _sweep(ledger, ["m1", "m2"], n_repeat=3)
+    assert RunLedger.open(CONFIG, path=ledger_path).sweep_id == ledger.sweep_id
+
+    # the completed sweep of the old version is not resumed after an upgrade
+    upgraded = RunLedger.open({**CONFIG, "versions": {"libroadrunner": "2.1.0"}},
+                              path=ledger_path)
+    assert upgraded.sweep_id != ledger.sweep_id
+    assert len(_sweep(upgraded, ["m1", "m2"], n_repeat=3)) == 6
+    assert upgraded.to_dataframe("copasi", columns=RESULT_COLUMNS).n_samples.tolist() == [3] * 6
+
+
+def test_add_and_complete_keep_first_commit(ledger_path):
+    ledger = RunLedger.open(CONFIG, path=ledger_path)
+    ledger.add("m1", "copasi", 1, _data("m1", 1, load_time=1.0))
+    ledger.add("m1", "copasi", 1, _data("m1", 1, load_time=5.0))
+    ledger.add("m1", "copasi", 3, _data("m1", 3))
+    assert [r["load_time"] for r in ledger.repeats("m1", "copasi")] == [1.0, 1.0]
+    assert ledger.missing_repeats("m1", "copasi", n_repeat=3) == [2]
+    assert ledger.repeats("m1", "roadrunner") == []
+
+    assert not ledger.is_complete("m1", "copasi")
+    ledger.complete("m1", "copasi", {"n_samples": 2})
+    ledger.complete("m1", "copasi", {"n_samples": 7})
+    assert ledger.is_complete("m1", "copasi")
+    assert not ledger.is_complete("m1", "roadrunner")
+    df = ledger.to_dataframe("copasi", columns=["model", "n_samples"])
+    assert df.n_samples.tolist() == [2, 2]
+
+
+def test_to_dataframe_merges_summaries(ledger_path):
+    ledger = RunLedger.open(CONFIG, path=ledger_path)
+    for model in ["m2", "m1"]:
+        for repeat in [2, 1]:
+            ledger.add(model, "copasi", repeat, {**_data(model, repeat), "extra": model})
+    ledger.add("m1", "roadrunner", 1, _data("m1", 1))
+    ledger.complete("m1", "copasi", {"n_samples": 2, "load_time_ci_low": 0.5})
+
+    df = ledger.to_dataframe("copasi", columns=RESULT_COLUMNS)
+    assert list(df.columns) == list(RESULT_COLUMNS) + ["extra"]
+    assert list(zip(df.model, df.repeat)) == [("m1", 1), ("m1", 2), ("m2", 1), ("m2", 2)]
+    assert df.n_samples.tolist()[:2] == [2, 2]
+    assert df.n_samples.iloc[2:].isna().all()
+    assert df.load_time_ci_low.tolist()[:2] == [0.5, 0.5]
+    assert df.load_time_ci_high.isna().all()
+
+
+def _sweep(ledger, models, n_repeat, interrupt=None):
+    """Sweep like the ODE runners, raises KeyboardInterrupt before the repeat interrupt.
+
+    :return: executed (model, repeat)
+    """
+    executed = []
+    results = []
+    for model in models:
+        if ledger.is_complete(model, "copasi"):
+            continue
+        model_results = []
+        repeats = _repeat_controller(n_repeat, mode="cold", adaptive=None, ledger=ledger,
+                                     model_id=model, simulator="copasi")
+        for repeat in repeats:
+            if (model, repeat) == interrupt:
+                raise KeyboardInterrupt
+            executed.append((model, repeat))
+            load_time, simulate_time = 0.1 * repeat, 0.2 * repeat
+            repeats.add(load_time=load_time, simulate_time=simulate_time)
+            res = (model, "success", load_time, simulate_time, repeat, "cold", "sbml")
+            row = res + PhaseTimer().row() + MemoryTracker(enabled=False).row()
+            _add_result(model_results, row, ledger, "copasi")
+        _complete_model(results, model_results, model, repeats, ledger, "copasi")
+    return executed
+
+
+def test_interrupted_sweep_resumes(ledger_path):
+    models = ["m1", "m2", "m3"]
+    ledger = RunLedger.open(CONFIG, path=ledger_path)
+    with pytest.raises(KeyboardInterrupt):
+        _sweep(ledger, models, n_repeat=3, interrupt=("m2", 2))
+    assert ledger.is_complete("m1", "copasi")
+    assert ledger.missing_repeats("m2", "copasi", n_repeat=3) == [2, 3]
+    assert not ledger.is_complete("m2", "copasi")
+
+    # restart with the same configuration continues the sweep
+    ledger = RunLedger.open(CONFIG, path=ledger_path)
+    executed = _sweep(ledger, models, n_repeat=3)
+    assert executed == [("m2", 2), ("m2", 3), ("m3", 1), ("m3", 2), ("m3", 3)]
+    assert _sweep(ledger, models, n_repeat=3) == []
+
+    df = ledger.to_dataframe("copasi", columns=RESULT_COLUMNS)
+    assert list(zip(df.model, df.repeat)) == [(m, r) for m in models for r in [1, 2, 3]]
+    # the summary of m2 includes the repeat of the interrupted sweep
+    assert df.n_samples.tolist() == [3] * 9
+    assert set(SUMMARY_COLUMNS) <= set(df.columns)
+
+    # a new sweep starts from scratch
+    ledger = RunLedger.open(CONFIG, resume=False, path=ledger_path)
+    assert len(_sweep(ledger, models, n_repeat=3)) == 9
@@ -0,0 +1,115 @@
+"""
+Tests of the numerical comparison of ODE trajectories.
+"""
+import numpy as np
+import pytest
+
+from code.comparisonpy.ode_comparison import (
+    ABSOLUTE_EPS, Trajectory, _interpolate, align_trajectories, trajectory_errors
+)
+
+
+def test_trajectory_from_array():
+    data = np.array([[0.0, 1.0, 2.0], [1.0, 3.0, 4.0]])
+    trajectory = Trajectory.from_array(data, columns=["[S1]", "time", "S2"])
+    np.testing.assert_array_equal(trajectory.time, [1.0, 3.0])
+    np.testing.assert_array_equal(trajectory.values, [[0.0, 2.0], [1.0, 4.0]])
+    assert trajectory.columns == ["S1", "S2"]
+    assert Trajectory.from_array(data, columns=["S1", "S2", "S3"]).time is None
+
+
+def test_interpolate():
+    t = np.array([0.0, 1.0, 3.0])
+    y = np.array([[0.0, 10.0], [1.0, 20.0], [5.0, 0.0]])
+    values = _interpolate(np.array([-1.0, 0.0, 0.5, 2.0, 3.0, 4.0]), t, y)
+    np.testing.assert_array_equal(values, [
+        [np.nan, np.nan], [0.0, 10.0], [0.5, 15.0], [3.0, 10.0], [5.0, 0.0], [np.nan, np.nan]
+    ])
+
+
+def test_interpolate_short_time_vectors():
+    t_new = np.array([0.0, 1.0])
+    values = _interpolate(t_new, np.array([1.0]), np.array([[2.0, 3.0]]))
+    np.testing.assert_array_equal(values, [[np.nan, np.nan], [2.0, 3.0]])
+
+    values = _interpolate(t_new, np.empty(0), np.empty((0, 2)))
+    assert values.shape == (2, 2)
+    assert np.isnan(values).all()
+
+
+def test_align_trajectories_common_columns():
+    t = np.array([0.0, 1.0, 2.0])
+    a = Trajectory(t, np.array([[1.0, 2.0, 3.0]] * 3), ["S1", "S2", "S3"])
+    b = Trajectory(None, np.array([[30.0, 10.0]] * 3), ["S3", "S1"])
+    time_vector, ya, yb, columns = align_trajectories(a, b)
+    assert columns == ["S1", "S3"]
+    np.testing.assert_array_equal(time_vector, t)
+    np.testing.assert_array_equal(ya, [[1.0, 3.0]] * 3)
+    np.testing.assert_array_equal(yb, [[10.0, 30.0]] * 3)
+
+    # time vector of b is used if a has none
+    time_vector, _, _, _ = align_trajectories(b, a)
+    np.testing.assert_array_equal(time_vector, t)
+
+
+def test_align_trajectories_interpolates_b():
+    a = Trajectory(np.array([0.0, 0.5, 1.0, 1.5]), np.zeros((4, 1)), ["S1"])
+    b = Trajectory(np.array([0.0, 1.0]), np.array([[0.0], [2.0]]), ["S1"])
+    time_vector, _, yb, _ = align_trajectories(a, b)
+    np.testing.assert_array_equal(time_vector, a.time)
+    np.testing.assert_array_equal(yb[:, 0], [0.0, 1.0, 2.0, np.nan])
+
+    empty = Trajectory(np.empty(0), np.empty((0, 1)), ["S1"])
+    _, _, yb, _ = align_trajectories(a, empty)
+    assert np.isnan(yb).all()
+
+
+def test_align_trajectories_errors():
+    a = Trajectory(None, np.zeros((3, 1)), ["S1"])
+    with pytest.raises(ValueError, match="both"):
+        align_trajectories(a, a)
+    b = Trajectory(np.arange(2.0), np.zeros((2, 1)), ["S1"])
+    with pytest.raises(ValueError, match="number of timepoints"):
+        align_trajectories(a, b)
+
+
+def test_trajectory_errors():
+    ya = np.array([[1.0, 0.0, 1.0], [2.0, 0.0, np.nan]])
+    yb = np.array([[1.5, ABSOLUTE_EPS / 2, 1.0], [1.0, 0.0, 1.0]])
+    errors = trajectory_errors(ya, yb)
+    np.testing.assert_allclose(errors["max_abs_error"], [1.0, ABSOLUTE_EPS / 2, 0.0])
+    np.testing.assert_allclose(errors["rms_abs_error"],
+                               [np.sqrt((0.25 + 1.0) / 2), ABSOLUTE_EPS / 2 / np.sqrt(2), 0.0])
+    # relative to the larger absolute value, no relative error below the absolute eps
+    np.testing.assert_allclose(errors["max_rel_error"], [0.5, 0.0, 0.0])
+    np.testing.assert_allclose(errors["rms_rel_error"],
+                               [np.sqrt(((1 / 3) ** 2 + 0.25) / 2), 0.0, 0.0])
+
+
+def test_compare_ode_results_arrow(tmp_path):
+    pytest.importorskip("pyarrow")
+    from code.comparisonpy.ode_comparison import compare_ode_results
+    from code.comparisonpy.trajectories import write_trajectory
+
+    trajectory_dir = tmp_path / "ode" / "trajectories"
+    t = np.linspace(0, 10, 11)
+    data = np.column_stack([t, np.exp(-t / 3), t / 7])
+    columns = ["time", "[S1]", "[S2]"]
+    for model_id, scale in [("m1", 1.0), ("m2", 2.0)]:
+        write_trajectory(data, columns, model_id=model_id, simulator="roadrunner", repeat=1,
+                         trajectory_dir=trajectory_dir)
+        data_b = data.copy()
+        data_b[:, 1:] *= scale
+        write_trajectory(data_b, columns, model_id=model_id, simulator="copasi", repeat=1,
+                         trajectory_dir=trajectory_dir)
+    # trajectories of other simulators and formats are not compared
+    write_trajectory(data, columns, model_id="m3", simulator="sbscl", repeat=1,
+                     trajectory_dir=trajectory_dir)
+    write_trajectory(data, columns, model_id="m4", simulator="roadrunner", repeat=1,
+                     fmt="parquet", trajectory_dir=trajectory_dir)
+
+    df = compare_ode_results(simulators=["roadrunner", "copasi"], source="arrow",
+                             results_dir=tmp_path)
+    assert df.set_index("model").identical.to_dict() == {"m1": True, "m2": False}
+    assert (df.status == "compared").all()
+    assert (tmp_path / "ode" / "comparison_trajectories.tsv").exists()
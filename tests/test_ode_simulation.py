@@ -0,0 +1,30 @@
+"""
+Tests of the ODE benchmark runner (without simulator backends).
+"""
+from pathlib import Path
+
+from code.comparisonpy.ledger import RunLedger
+from code.comparisonpy.ode_simulation import RESULT_COLUMNS, failed_model_repeats
+from code.comparisonpy.parallel import _on_error
+
+
+def test_failed_model_repeats_keeps_finished_repeats(tmp_path):
+    ledger = RunLedger.open({"dataset": "ode"}, path=tmp_path / "ledger.sqlite")
+    finished = {column: None for column in RESULT_COLUMNS}
+    finished.update({"model": "BIOMD0000000001", "status": "success", "repeat": 1})
+    ledger.add("BIOMD0000000001", "roadrunner", 1, finished)
+
+    task = ("roadrunner", Path("BIOMD0000000001.xml"), 3, tmp_path, "cold", "tsv", None,
+            False, ledger, None, None, "sbml")
+    worker = {"worker": 2, "cpu_affinity": "2", "startup_time": float("nan")}
+    df = _on_error(failed_model_repeats, task, "timeout", worker)
+
+    assert list(df.repeat) == [2, 3]
+    assert set(df.status) == {"timeout"}
+    repeats = ledger.repeats("BIOMD0000000001", "roadrunner")
+    assert [(r["repeat"], r["status"]) for r in repeats] == [
+        (1, "success"), (2, "timeout"), (3, "timeout")
+    ]
+    # failed repeats carry the worker information
+    assert [(r.get("worker"), r.get("cpu_affinity")) for r in repeats[1:]] == [(2, "2")] * 2
+    assert ledger.is_complete("BIOMD0000000001", "roadrunner")
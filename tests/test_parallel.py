@@ -0,0 +1,80 @@
+"""
+Tests of the process based task scheduler.
+
+The task functions are module level functions, so that they can be
+unpickled in the spawned worker processes.
+"""
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from code.comparisonpy.parallel import (
+    STATUS_CRASH, STATUS_TIMEOUT, available_cpus, current_worker, run_tasks
+)
+
+
+def sleep_task(k: int, duration: float) -> pd.DataFrame:
+    time.sleep(duration)
+    return pd.DataFrame({"task": [k], "pid": [os.getpid()]})
+
+
+def crash_task(k: int, duration: float) -> pd.DataFrame:
+    os._exit(1)
+
+
+def worker_task(k: int, duration: float) -> pd.DataFrame:
+    return pd.DataFrame([{"task": k, **current_worker()}])
+
+
+def failed_task(args: tuple, status: str) -> pd.DataFrame:
+    return pd.DataFrame([{"task": args[0], "status": status, **current_worker()}])
+
+
+def test_results_in_order_of_tasks():
+    tasks = [(0, 0.6), (1, 0.0), (2, 0.3), (3, 0.0)]
+    results = run_tasks(sleep_task, tasks, n_workers=2, pin_cpus=False)
+    assert [df.task.iloc[0] for df in results] == [0, 1, 2, 3]
+    # every task runs in its own process
+    assert len({df.pid.iloc[0] for df in results}) == len(tasks)
+    assert all(df.startup_time.iloc[0] > 0 for df in results)
+
+
+def test_timeout_kills_task():
+    start_time = time.time()
+    results = run_tasks(sleep_task, [(0, 30.0), (1, 0.0)], n_workers=2, pin_cpus=False,
+                        timeout=2.0, on_error=failed_task)
+    assert time.time() - start_time < 20.0
+    assert results[0].status.iloc[0] == STATUS_TIMEOUT
+    assert results[1].task.iloc[0] == 1
+    assert "status" not in results[1]
+
+
+def test_crash_calls_on_error():
+    results = run_tasks(crash_task, [(0, 0.0)], n_workers=1, pin_cpus=True,
+                        on_error=failed_task)
+    df = results[0]
+    assert df.status.iloc[0] == STATUS_CRASH
+    # on_error runs with the information of the failed worker
+    assert df.worker.iloc[0] == 0
+    assert df.cpu_affinity.iloc[0] == str(available_cpus()[0])
+    assert current_worker() == {}
+
+
+def test_crash_without_on_error_raises():
+    with pytest.raises(RuntimeError, match=STATUS_CRASH):
+        run_tasks(crash_task, [(0, 0.0)], n_workers=1, pin_cpus=False)
+
+
+def test_workers_are_pinned():
+    cpus = available_cpus()
+    results = run_tasks(worker_task, [(k, 0.0) for k in range(3)], n_workers=2,
+                        pin_cpus=True)
+    for df in results:
+        assert df.cpu_affinity.iloc[0] == str(cpus[df.worker.iloc[0] % len(cpus)])
+
+
+def test_invalid_number_of_workers():
+    with pytest.raises(ValueError):
+        run_tasks(sleep_task, [(0, 0.0)], n_workers=0)
@@ -0,0 +1,165 @@
+"""
+Tests of the regression detection.
+"""
+import itertools
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from code.comparisonpy import regression
+
+
+def _write_results(path, load_times):
+    pd.DataFrame([
+        {"model": model, "repeat": k + 1, "load_time": t}
+        for model, times in load_times.items() for k, t in enumerate(times)
+    ]).to_csv(path, sep="\t", index=False)
+
+
+def test_result_path_collection(tmp_path):
+    assert regression.result_path("fba", "cobrapy", results_dir=tmp_path) == (
+        tmp_path / "fba" / "bigg_cobrapy.tsv"
+    )
+    assert regression.result_path("ode", "copasi", results_dir=tmp_path,
+                                  collection="synthetic") == (
+        tmp_path / "ode" / "synthetic_copasi.tsv"
+    )
+
+
+def test_package_versions_sbscl():
+    assert regression.package_versions("sbscl") == {
+        "sbscl": regression._maven_version("sbscl")
+    }
+    assert regression.package_versions("sbscl_cold") == regression.package_versions("sbscl")
+
+
+def test_regression_report_collection(tmp_path):
+    results_dir = tmp_path / "results"
+    baselines_dir = tmp_path / "baselines"
+    (results_dir / "ode").mkdir(parents=True)
+    path = results_dir / "ode" / "synthetic_roadrunner.tsv"
+    _write_results(path, {"m1": [1.0, 1.1, 0.9, 1.05, 0.95],
+                          "m2": [1.0, 1.1, 0.9, 1.05, 0.95]})
+    regression.save_baseline("base", "ode", ["roadrunner"], results_dir=results_dir,
+                             baselines_dir=baselines_dir, collection="synthetic")
+    assert (baselines_dir / "base" / "ode" / "synthetic_roadrunner.tsv").exists()
+    assert "ode/synthetic/roadrunner" in regression.read_baseline_metadata(
+        "base", baselines_dir=baselines_dir
+    )
+
+    # m1 is twice as slow
+    _write_results(path, {"m1": [2.0, 2.2, 1.8, 2.1, 1.9],
+                          "m2": [1.0, 1.1, 0.9, 1.05, 0.95]})
+    df = regression.regression_report("base", "ode", ["roadrunner"], results_dir=results_dir,
+                                      baselines_dir=baselines_dir, collection="synthetic")
+    assert (results_dir / "ode" / "synthetic_regressions_base.tsv").exists()
+    status = df.set_index("model").status.to_dict()
+    assert status == {"m1": regression.STATUS_REGRESSION, "m2": regression.STATUS_UNCHANGED}
+    assert regression.check_regressions(
+        "base", "ode", ["roadrunner"], results_dir=results_dir, baselines_dir=baselines_dir,
+        collection="synthetic",
+    ) == 1
+
+
+def test_regression_report_refuses_baseline_versions(tmp_path):
+    results_dir = tmp_path / "results"
+    baselines_dir = tmp_path / "baselines"
+    (results_dir / "ode").mkdir(parents=True)
+    path = results_dir / "ode" / "biomodels_roadrunner.tsv"
+    times = {"m1": [1.0, 1.1, 0.9, 1.05, 0.95]}
+
+    def write(load_times, version):
+        _write_results(path, load_times)
+        df = pd.read_csv(path, sep="\t")
+        df[regression.VERSIONS_COLUMN] = f'{{"libroadrunner": "{version}"}}'
+        df.to_csv(path, sep="\t", index=False)
+
+    write(times, "2.0.5")
+    regression.save_baseline("base", "ode", ["roadrunner"], results_dir=results_dir,
+                             baselines_dir=baselines_dir)
+    meta = regression.read_baseline_metadata("base", baselines_dir=baselines_dir)
+    assert meta["ode/roadrunner"]["versions"] == {"libroadrunner": "2.0.5"}
+
+    # unchanged results or a rerun without the upgrade are not compared
+    kwargs = dict(results_dir=results_dir, baselines_dir=baselines_dir)
+    with pytest.raises(ValueError, match="package versions"):
+        regression.check_regressions("base", "ode", ["roadrunner"], **kwargs)
+    write({"m1": [2.0, 2.2, 1.8, 2.1, 1.9]}, "2.0.5")
+    with pytest.raises(ValueError, match="package versions"):
+        regression.check_regressions("base", "ode", ["roadrunner"], **kwargs)
+
+    write({"m1": [2.0, 2.2, 1.8, 2.1, 1.9]}, "2.1.0")
+    assert regression.check_regressions("base", "ode", ["roadrunner"], **kwargs) == 1
+
+
+def test_regression_report_refuses_baseline_copy(tmp_path):
+    results_dir = tmp_path / "results"
+    (results_dir / "ode").mkdir(parents=True)
+    _write_results(results_dir / "ode" / "biomodels_copasi.tsv",
+                   {"m1": [1.0, 1.1, 0.9, 1.05, 0.95]})
+    regression.save_baseline("base", "ode", ["copasi"], results_dir=results_dir,
+                             baselines_dir=tmp_path / "baselines")
+    with pytest.raises(ValueError, match="package versions"):
+        regression.regression_report("base", "ode", ["copasi"], results_dir=results_dir,
+                                     baselines_dir=tmp_path / "baselines")
+
+
+def _permutation_p_value(x, y):
+    """Two-sided p-value of U by brute force over all assignments of the ranks."""
+    n1, n2 = len(x), len(y)
+    u = sum((xi > yi) + 0.5 * (xi == yi) for xi in x for yi in y)
+    us = [sum(ranks) - n1 * (n1 + 1) / 2
+          for ranks in itertools.combinations(range(1, n1 + n2 + 1), n1)]
+    low = sum(v <= u for v in us) / len(us)
+    high = sum(v >= u for v in us) / len(us)
+    return u, min(1.0, 2 * min(low, high))
+
+
+@pytest.mark.parametrize("n1, n2", [(1, 1), (2, 3), (4, 4), (3, 7), (6, 5)])
+def test_u_distribution(n1, n2):
+    counts = np.zeros(n1 * n2 + 1)
+    for ranks in itertools.combinations(range(1, n1 + n2 + 1), n1):
+        counts[int(sum(ranks) - n1 * (n1 + 1) / 2)] += 1
+    np.testing.assert_array_equal(regression._u_distribution(n1, n2), counts)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_mann_whitney_u_exact(seed):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(0.0, 1.0, size=rng.integers(2, 7))
+    y = rng.normal(0.8, 1.0, size=rng.integers(2, 7))
+    u, p_value = regression.mann_whitney_u(x, y)
+    expected_u, expected_p = _permutation_p_value(x, y)
+    assert u == expected_u
+    assert p_value == pytest.approx(expected_p, rel=1e-12)
+
+
+def test_mann_whitney_u_known_values():
+    # complete separation, 2 of 20 rank assignments are as extreme
+    assert regression.mann_whitney_u([1, 2, 3], [4, 5, 6]) == (0.0, pytest.approx(0.1))
+    assert regression.mann_whitney_u([4, 5, 6], [1, 2, 3]) == (9.0, pytest.approx(0.1))
+    # ties: ranks of x 1 + 3 + 3 + 5.5, U = 2.5, sigma^2 = 16/12 * (9 - 30/56) = 79/7
+    u, p_value = regression.mann_whitney_u([1, 2, 2, 3], [2, 3, 4, 5])
+    assert u == 2.5
+    assert p_value == pytest.approx(math.erfc(5.0 / math.sqrt(2 * 79 / 7)))
+    assert regression.mann_whitney_u([1.0, 1.0], [1.0, 1.0]) == (2.0, 1.0)
+    assert all(math.isnan(v) for v in regression.mann_whitney_u([], [1.0]))
+
+
+def test_bootstrap_ratio_ci():
+    # medians of resamples of [1, 3]: 1, 2, 3 with probability 1/4, 1/2, 1/4
+    low, high = regression.bootstrap_ratio_ci([1.0, 3.0], [2.0], n_bootstrap=20000)
+    assert (low, high) == (pytest.approx(2 / 3), pytest.approx(2.0))
+    assert regression.bootstrap_ratio_ci([1.0] * 5, [2.0] * 3) == (2.0, 2.0)
+    assert all(math.isnan(v) for v in regression.bootstrap_ratio_ci([1.0], []))
+
+    rng = np.random.default_rng(3)
+    x = rng.lognormal(0.0, 0.2, size=30)
+    y = 1.5 * rng.lognormal(0.0, 0.2, size=30)
+    low, high = regression.bootstrap_ratio_ci(x, y)
+    assert low < np.median(y) / np.median(x) < high
+    assert regression.bootstrap_ratio_ci(x, y) == (low, high)
+    low_50, high_50 = regression.bootstrap_ratio_ci(x, y, confidence=0.5)
+    assert low < low_50 < high_50 < high
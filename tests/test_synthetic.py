@@ -0,0 +1,37 @@
+"""
+Tests of the synthetic model generators.
+"""
+import pytest
+
+from code.comparisonpy.synthetic import KINDS, generate_model, synthetic_kind
+
+libsbml = pytest.importorskip("libsbml")
+
+
+@pytest.mark.parametrize("kind", KINDS)
+@pytest.mark.parametrize("size", [10, 100])
+def test_generate_model_is_valid(kind, size, tmp_path):
+    path = generate_model(kind, size, output_dir=tmp_path)
+    assert synthetic_kind(path.stem) == kind
+
+    doc = libsbml.readSBMLFromFile(str(path))
+    doc.checkConsistency()
+    errors = doc.getNumErrors(libsbml.LIBSBML_SEV_ERROR) + doc.getNumErrors(
+        libsbml.LIBSBML_SEV_FATAL
+    )
+    assert errors == 0, doc.getErrorLog().toString()
+    model = doc.getModel()
+    assert model.getNumReactions() == size
+    assert (model.getPlugin("fbc") is not None) == (kind == "fba")
+
+
+@pytest.mark.parametrize("size", [10, 100])
+def test_fba_network_conserves_mass(size, tmp_path):
+    doc = libsbml.readSBMLFromFile(str(generate_model("fba", size, output_dir=tmp_path)))
+    model = doc.getModel()
+    for reaction in model.getListOfReactions():
+        n_reactants, n_products = reaction.getNumReactants(), reaction.getNumProducts()
+        if reaction.getId() in ("EX_M0", "BIOMASS"):
+            assert (n_reactants, n_products) == (1, 0)
+        else:
+            assert (n_reactants, n_products) == (1, 1)
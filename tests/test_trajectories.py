@@ -0,0 +1,70 @@
+"""
+Tests of the columnar trajectory storage.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from code.comparisonpy import trajectories
+
+pytest.importorskip("pyarrow")
+
+COLUMNS = ["time", "[S1]", "[S2]"]
+
+
+def _data(n=11):
+    rng = np.random.default_rng(0)
+    t = np.linspace(0, 10, n)
+    # values without exact decimal representation
+    return np.column_stack([t, np.exp(-t / 3), rng.random(n) / 7])
+
+
+@pytest.mark.parametrize("fmt", trajectories.TRAJECTORY_FORMATS)
+def test_trajectory_round_trip(fmt, tmp_path):
+    data = _data()
+    path = trajectories.write_trajectory(data, COLUMNS, model_id="m1", simulator="copasi",
+                                         repeat=2, fmt=fmt, trajectory_dir=tmp_path)
+    assert path == tmp_path / "model=m1" / "simulator=copasi" / "repeat=2" / f"part-0.{fmt}"
+
+    values, columns = trajectories.read_trajectory_array(
+        "m1", "copasi", repeat=2, fmt=fmt, trajectory_dir=tmp_path
+    )
+    assert columns == COLUMNS
+    assert values.dtype == np.float64
+    # float64 is stored without loss
+    np.testing.assert_array_equal(values, data)
+
+    # existing partitions are overwritten
+    df = pd.DataFrame(data[:3], columns=COLUMNS)
+    trajectories.write_trajectory_df(df, model_id="m1", simulator="copasi", repeat=2,
+                                     fmt=fmt, trajectory_dir=tmp_path)
+    pd.testing.assert_frame_equal(
+        trajectories.read_trajectory("m1", "copasi", repeat=2, fmt=fmt,
+                                     trajectory_dir=tmp_path),
+        df,
+    )
+
+
+def test_list_trajectories(tmp_path):
+    for model, simulator, repeat in [("m2", "copasi", 1), ("m1", "roadrunner", 2),
+                                     ("m1", "roadrunner", 1)]:
+        trajectories.write_trajectory(_data(3), COLUMNS, model_id=model, simulator=simulator,
+                                      repeat=repeat, trajectory_dir=tmp_path)
+    trajectories.write_trajectory(_data(3), COLUMNS, model_id="m3", simulator="copasi",
+                                  repeat=1, fmt="parquet", trajectory_dir=tmp_path)
+
+    df = trajectories.list_trajectories(trajectory_dir=tmp_path)
+    assert list(zip(df.model, df.simulator, df.repeat)) == [
+        ("m1", "roadrunner", 1), ("m1", "roadrunner", 2), ("m2", "copasi", 1)
+    ]
+    assert list(trajectories.list_trajectories(fmt="parquet", trajectory_dir=tmp_path).model) == [
+        "m3"
+    ]
+    assert trajectories.list_trajectories(trajectory_dir=tmp_path / "missing").empty
+
+
+def test_trajectory_format(tmp_path):
+    with pytest.raises(ValueError, match="csv"):
+        trajectories.trajectory_path("m1", "copasi", 1, fmt="csv", trajectory_dir=tmp_path)
+    with pytest.raises(FileNotFoundError):
+        trajectories.read_trajectory_array("m1", "copasi", trajectory_dir=tmp_path)